@@ -1,11 +1,49 @@
+import asyncio
+import os
+import shutil
+import tempfile
 import allure
 import pytest
+from autotests.services.users.endpoints import API_TRANSPORT, url
+
+if API_TRANSPORT == 'asgi':
+    # Адрес базы читается при импорте database, поэтому временная база задается до импортов ниже.
+    # У каждого воркера pytest-xdist свой процесс и своя база
+    DATABASE_DIRECTORY = tempfile.mkdtemp(prefix='curve-tests-')
+    os.environ['DATABASE_URL'] = f"sqlite+aiosqlite:///{DATABASE_DIRECTORY}/users.db"
+
+from sqlalchemy.ext.asyncio import async_sessionmaker
+from database import create_engine
+from migrations import migrate
 from requests import JSONDecodeError
-from autotests.services.users.api_users import User
+from autotests.services.users.api_users import User, mount_asgi
 from autotests.services.users.models.user_validation import ResponseValidator
 from autotests.services.utils.fake_data import FakeUser
 
 
+def pytest_collection_modifyitems(config, items):
+    # Воркеры pytest-xdist работают с одним сервером: сброс базы посреди прогона ломает тесты других воркеров
+    if API_TRANSPORT == 'http' and int(os.environ.get('PYTEST_XDIST_WORKER_COUNT', '1')) > 1:
+        skip = pytest.mark.skip(reason='Меняет общее состояние сервера, запускается без pytest-xdist')
+        for item in items:
+            if item.get_closest_marker('serial'):
+                item.add_marker(skip)
+
+
+@pytest.fixture(scope='session', autouse=True)
+def asgi_app():
+    """В режиме API_TRANSPORT=asgi запускает main.app с lifespan на временной базе на всю сессию"""
+    if API_TRANSPORT != 'asgi':
+        yield None
+        return
+    from starlette.testclient import TestClient
+    import main
+
+    with TestClient(main.app, base_url=url, raise_server_exceptions=False, follow_redirects=False) as client:
+        mount_asgi(client)
+        yield client
+    shutil.rmtree(DATABASE_DIRECTORY, ignore_errors=True)
+
 
 @pytest.fixture()
 def user():
@@ -74,4 +112,17 @@ def create_user(user, response_validator, random_user):
                       attachment_type=allure.attachment_type.JSON)
         assert response.status_code == 200, response_validator.validate_positive_requests(response.json(),
                                                                                           'GetUserByNickname')
-    return response.json()
\ No newline at end of file
+    return response.json()
+
+
+@pytest.fixture()
+def session_factory(tmp_path):
+    engine = create_engine(f"sqlite+aiosqlite:///{tmp_path / 'users.db'}")
+
+    async def setup():
+        async with engine.begin() as connection:
+            await migrate(connection)
+
+    asyncio.run(setup())
+    yield async_sessionmaker(engine, expire_on_commit=False)
+    asyncio.run(engine.dispose())
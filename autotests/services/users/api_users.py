@@ -1,47 +1,127 @@
-from autotests.services.users.endpoints import UserEndpoints
+from autotests.services.users.endpoints import UserEndpoints, url
 from autotests.services.users.payloads import UserPayLoad
 from requests import Response
+from requests.adapters import HTTPAdapter
 import requests
+import httpx
 import allure
 
+POOL_SIZE = 32
+
+# Одна сессия на процесс (и на каждый воркер pytest-xdist): шаги тестов переиспользуют keep-alive соединения
+session = requests.Session()
+session.mount('http://', HTTPAdapter(pool_connections=1, pool_maxsize=POOL_SIZE))
+async_transport = None
+
+
+def mount_asgi(client):
+    """Переключает клиентов на приложение внутри процесса: client - запущенный starlette TestClient"""
+    from autotests.services.utils.asgi_transport import ASGIAdapter, AsyncASGITransport
+    global async_transport
+    session.mount(url, ASGIAdapter(client))
+    async_transport = AsyncASGITransport(client)
+
+
 class User:
     
     def __init__(self):
         self.payload = UserPayLoad
         self.endpoint = UserEndpoints
+        self.session = session
+
+    @staticmethod
+    def async_client() -> httpx.AsyncClient:
+        """Асинхронный клиент для одновременных запросов внутри одного теста"""
+        return httpx.AsyncClient(transport=async_transport, base_url=url,
+                                 limits=httpx.Limits(max_connections=POOL_SIZE, max_keepalive_connections=POOL_SIZE))
     
     @allure.step('Post request to setup and clear db')
     def post_setup_db_users(self) -> Response:
-        response = requests.post(
+        response = self.session.post(
             url=self.endpoint.setup_database()
         )
         return response
         
+    @allure.step('Get request for user cache stats')
+    def get_cache_stats(self) -> Response:
+        response = self.session.get(
+            url=self.endpoint.get_cache_stats()
+        )
+        return response
+
+    @allure.step('Get request for OpenAPI schema')
+    def get_openapi(self, etag: str = None, accept_encoding: str = None) -> Response:
+        headers = {}
+        if etag:
+            headers['If-None-Match'] = etag
+        if accept_encoding:
+            headers['Accept-Encoding'] = accept_encoding
+        response = self.session.get(
+            url=self.endpoint.get_openapi(),
+            headers=headers
+        )
+        return response
+
+    @allure.step('Get request for metrics')
+    def get_metrics(self) -> Response:
+        response = self.session.get(
+            url=self.endpoint.get_metrics()
+        )
+        return response
+
+    @allure.step('Get request to export all data')
+    def get_export(self, gzip: bool = None, snapshot: bool = None) -> Response:
+        response = self.session.get(
+            url=self.endpoint.get_export(),
+            params={'gzip': gzip, 'snapshot': snapshot}
+        )
+        return response
+
     @allure.step('Get request for all users')
-    def get_all_users(self) -> Response:
-        response = requests.get(
-            url=self.endpoint.get_users()
+    def get_all_users(self, after: str = None, limit: int = None, stream: bool = None,
+                      accept_encoding: str = None) -> Response:
+        response = self.session.get(
+            url=self.endpoint.get_users(),
+            params={'after': after, 'limit': limit, 'stream': stream},
+            headers={'Accept-Encoding': accept_encoding} if accept_encoding else None
         )
         return response
     
     @allure.step('Post request to create user')
     def post_create_user(self, **kwargs) -> Response:
-        response = requests.post(
+        response = self.session.post(
             url=self.endpoint.get_users(),
             json=self.payload.post_user_payload(**kwargs)
         )
         return response
     
+    @allure.step('Post request to create users in bulk')
+    def post_create_users_bulk(self, users: list, ndjson: bool = False) -> Response:
+        response = self.session.post(
+            url=self.endpoint.post_users_bulk(),
+            **self.payload.bulk_payload(users, ndjson)
+        )
+        return response
+
+    @allure.step('Post request to get users by nicknames')
+    def post_users_batch_get(self, nicknames, include_information: bool = None) -> Response:
+        response = self.session.post(
+            url=self.endpoint.post_users_batch_get(),
+            json=self.payload.post_users_batch_get_payload(nicknames, include_information)
+        )
+        return response
+
     @allure.step('Get request for user by nickname')
-    def get_user_by_nickname(self, nickname: str) -> Response:
-        response = requests.get(
-            url=self.endpoint.get_user_by_nickname(nickname)
+    def get_user_by_nickname(self, nickname: str, etag: str = None) -> Response:
+        response = self.session.get(
+            url=self.endpoint.get_user_by_nickname(nickname),
+            headers={'If-None-Match': etag} if etag else None
         )
         return response
 
     @allure.step('Put request to update user age and job')
     def put_user_age_and_job(self, nickname: str, age: int, job: str) -> Response:
-        response = requests.put(
+        response = self.session.put(
             url = self.endpoint.put_user(nickname),
             json = self.payload.put_user_payload(age,job)
         )
@@ -49,29 +129,68 @@ class User:
 
     @allure.step('Delete request to Delete user')
     def delete_user(self, nickname: str) -> Response:
-        response = requests.delete(
+        response = self.session.delete(
             url = self.endpoint.delete_user(nickname)
         )
         return response
 
     @allure.step('Post request to create user information')
     def post_create_user_info(self, nickname: str, information, explanation) -> Response:
-        response = requests.post(
+        response = self.session.post(
             url=self.endpoint.post_user_info(nickname),
             json=self.payload.post_user_info_payload(information, explanation)
         )
         return response
 
+    @allure.step('Post request to create user information in bulk')
+    def post_create_user_info_bulk(self, nickname: str, information: list, ndjson: bool = False) -> Response:
+        response = self.session.post(
+            url=self.endpoint.post_user_info_bulk(nickname),
+            **self.payload.bulk_payload(information, ndjson)
+        )
+        return response
+
     @allure.step('Get request to get user info by nickname')
-    def get_user_info(self, nickname: str) -> Response:
-        response = requests.get(
-            url=self.endpoint.get_user_info(nickname)
+    def get_user_info(self, nickname: str, etag: str = None, accept_encoding: str = None, **params) -> Response:
+        headers = {}
+        if etag:
+            headers['If-None-Match'] = etag
+        if accept_encoding:
+            headers['Accept-Encoding'] = accept_encoding
+        response = self.session.get(
+            url=self.endpoint.get_user_info(nickname),
+            params=params,
+            headers=headers
+        )
+        return response
+
+    @allure.step('Get request to get user info due for review')
+    def get_user_due(self, nickname: str, on: str = None) -> Response:
+        response = self.session.get(
+            url=self.endpoint.get_user_due(nickname),
+            params={'on': on}
+        )
+        return response
+
+    @allure.step('Get request to search user info')
+    def get_user_info_search(self, nickname: str, q: str, limit: int = None) -> Response:
+        response = self.session.get(
+            url=self.endpoint.get_user_info_search(nickname),
+            params={'q': q, 'limit': limit}
+        )
+        return response
+
+    @allure.step('Post request to review user info')
+    def post_user_info_review(self, nickname: str, information_id: int, grade) -> Response:
+        response = self.session.post(
+            url=self.endpoint.post_user_info_review(nickname, information_id),
+            json=self.payload.post_review_payload(grade)
         )
         return response
 
     @allure.step('Delete request to delete user info')
     def delete_user_info(self, nickname: str, information_id: int) -> Response:
-        response = requests.delete(
+        response = self.session.delete(
             url=self.endpoint.delete_user_info(nickname, information_id)
         )
         return response
@@ -1,4 +1,8 @@
-url = 'http://127.0.0.1:8000/'
+import os
+
+# http - запросы к запущенному серверу по API_URL, asgi - напрямую в main.app внутри процесса pytest
+API_TRANSPORT = os.getenv('API_TRANSPORT', 'http')
+url = 'http://testserver' if API_TRANSPORT == 'asgi' else os.getenv('API_URL', 'http://127.0.0.1:8000')
 
 
 class UserEndpoints:
@@ -7,10 +11,34 @@ class UserEndpoints:
     def setup_database():
         return f'{url}/setup_database'
 
+    @staticmethod
+    def get_cache_stats():
+        return f'{url}/cache/stats'
+
+    @staticmethod
+    def get_openapi():
+        return f'{url}/openapi.json'
+
+    @staticmethod
+    def get_metrics():
+        return f'{url}/metrics'
+
+    @staticmethod
+    def get_export():
+        return f'{url}/export'
+
     @staticmethod
     def get_users():
         return f'{url}/users'
 
+    @staticmethod
+    def post_users_bulk():
+        return f'{url}/users:bulk'
+
+    @staticmethod
+    def post_users_batch_get():
+        return f'{url}/users:batch-get'
+
     @staticmethod
     def get_user_by_nickname(nickname: str) -> str:
         return f'{url}/users/{nickname}'
@@ -32,6 +60,22 @@ class UserEndpoints:
     def post_user_info(nickname: str) -> str:
         return f'{url}/users/{nickname}/information'
 
+    @staticmethod
+    def post_user_info_bulk(nickname: str) -> str:
+        return f'{url}/users/{nickname}/information:bulk'
+
+    @staticmethod
+    def get_user_due(nickname: str) -> str:
+        return f'{url}/users/{nickname}/due'
+
+    @staticmethod
+    def get_user_info_search(nickname: str) -> str:
+        return f'{url}/users/{nickname}/information/search'
+
+    @staticmethod
+    def post_user_info_review(nickname: str, information_id: int) -> str:
+        return f'{url}/users/{nickname}/information/{information_id}/review'
+
     @staticmethod
     def delete_user_info(nickname: str, information_id: int) -> str:
-        return f'{url}/{nickname}/information/{information_id}'
+        return f'{url}/users/{nickname}/information/{information_id}'
@@ -1,4 +1,4 @@
-from autotests.services.users.models.users_models import InformationGetSchema, InformationPostSchema, StatusSchema, UserGetSchema, UserPostSchema, UserPutSchema, UserValidationError, HTTPValidationError
+from autotests.services.users.models.users_models import BulkResultSchema, InformationGetSchema, InformationPostSchema, ReviewStateSchema, StatusSchema, UserGetSchema, UserPostSchema, UserPutSchema, UsersBatchGetResultSchema, UserValidationError, HTTPValidationError
 from pydantic import ValidationError
 
 class ResponseValidator:
@@ -6,17 +6,27 @@ class ResponseValidator:
         self.APIRequestsSuccess = {
             'PostCreateUser': lambda response_json: StatusSchema(**response_json),
             'GetUserByNickname': lambda response_json: UserGetSchema(**response_json),
+            'GetAllUsers': lambda response_json: [UserGetSchema(**user) for user in response_json],
             'PutUserByNickname': lambda response_json: StatusSchema(**response_json),
             'DeleteUserByNickname': lambda response_json: UserGetSchema(**response_json),
             'PostCreateUserInfo': lambda response_json: StatusSchema(**response_json),
             'GetUserInfo': lambda response_json: StatusSchema(**response_json),
+            'GetUserDue': lambda response_json: [InformationGetSchema(**item) for item in response_json],
+            'PostCreateUsersBulk': lambda response_json: BulkResultSchema(**response_json),
+            'PostUsersBatchGet': lambda response_json: UsersBatchGetResultSchema(**response_json),
+            'PostCreateUserInfoBulk': lambda response_json: BulkResultSchema(**response_json),
             'DeleteUserInfo': lambda response_json: StatusSchema(**response_json),
+            'PostReviewUserInfo': lambda response_json: ReviewStateSchema(**response_json),
         }
 
         self.APIRequestsFailure = {
             'PostCreateUser': lambda response_json: HTTPValidationError(**response_json),
+            'GetAllUsers': lambda response_json: HTTPValidationError(**response_json),
             'DeleteUserByNickname': lambda response_json: HTTPValidationError(**response_json),
-            'PostCreateUserInfo': lambda response_json: HTTPValidationError(**response_json)
+            'PostCreateUserInfo': lambda response_json: HTTPValidationError(**response_json),
+            'GetUserDue': lambda response_json: HTTPValidationError(**response_json),
+            'PostUsersBatchGet': lambda response_json: HTTPValidationError(**response_json),
+            'PostReviewUserInfo': lambda response_json: HTTPValidationError(**response_json),
         }
 
     def validate_user(self, create_and_delete_user):
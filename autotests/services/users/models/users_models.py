@@ -1,5 +1,5 @@
 from pydantic import BaseModel, Field
-from typing import List, Literal, Union
+from typing import List, Literal, Optional, Union
 
 
 
@@ -35,6 +35,13 @@ class UserPostSchema(BaseModel):
     age: int = Field(ge=1, le=99)
     job: str = Field(min_length=1, max_length=100)
 
+class UserWithInformationSchema(UserGetSchema):
+    information: Optional[List[InformationGetSchema]] = None
+
+class UsersBatchGetResultSchema(BaseModel):
+    users: List[UserWithInformationSchema]
+    missing: List[str]
+
 class UserPutSchema(BaseModel):
     age: int = Field(ge=1, le=99)
     job: str = Field(min_length=1, max_length=100)
@@ -45,3 +52,22 @@ class UserValidationError(BaseModel):
 
 class HTTPValidationError(BaseModel):
     detail: List[UserValidationError]
+
+class ReviewStateSchema(BaseModel):
+    information_id: int
+    ease: float = Field(ge=1.3)
+    interval: int = Field(ge=1)
+    repetitions: int = Field(ge=0)
+    lapses: int = Field(ge=0)
+    reviews: int = Field(ge=1)
+    last_review: str
+    due_date: str
+
+class BulkRowErrorSchema(BaseModel):
+    row: int
+    detail: Union[str, List[UserValidationError]]
+
+class BulkResultSchema(BaseModel):
+    inserted: int
+    failed: int
+    errors: List[BulkRowErrorSchema]
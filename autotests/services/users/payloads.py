@@ -1,3 +1,6 @@
+import json
+
+
 class UserPayLoad:
     @staticmethod
     def post_user_payload(nickname: str, first_name: str, last_name: str, age: int, job: str):
@@ -28,5 +31,31 @@ class UserPayLoad:
             "explanation": explanation
         }
         return data
-    
-    
\ No newline at end of file
+
+    @staticmethod
+    def post_users_batch_get_payload(nicknames, include_information: bool = None):
+
+        data = {
+            "nicknames": nicknames
+        }
+        if include_information is not None:
+            data["include_information"] = include_information
+        return data
+
+    @staticmethod
+    def post_review_payload(grade: int):
+
+        data = {
+            "grade": grade
+        }
+        return data
+
+    @staticmethod
+    def bulk_payload(rows: list, ndjson: bool = False):
+
+        if not ndjson:
+            return {'json': rows}
+        return {
+            'data': ''.join(json.dumps(row) + '\n' for row in rows),
+            'headers': {'Content-Type': 'application/x-ndjson'}
+        }
@@ -0,0 +1,56 @@
+import asyncio
+import httpx
+import requests
+from requests.adapters import BaseAdapter
+from requests.structures import CaseInsensitiveDict
+from requests.utils import get_encoding_from_headers
+from starlette.testclient import TestClient
+
+# Тело уже распаковано TestClient, поэтому эти заголовки не передаются дальше, чтобы не распаковывать его повторно
+DECODED_HEADERS = {'content-encoding', 'content-length', 'transfer-encoding'}
+
+
+def asgi_request(client: TestClient, method: str, url: str, content, headers) -> httpx.Response:
+    return client.request(method, url, content=content, headers=headers)
+
+
+class ASGIAdapter(BaseAdapter):
+    """Адаптер requests, который передает запросы сессии напрямую в приложение через TestClient без сети"""
+
+    def __init__(self, client: TestClient):
+        super().__init__()
+        self.client = client
+
+    def send(self, request: requests.PreparedRequest, stream=False, timeout=None, verify=True, cert=None,
+             proxies=None) -> requests.Response:
+        response = asgi_request(self.client, request.method, request.url, request.body, dict(request.headers))
+        result = requests.Response()
+        result.status_code = response.status_code
+        result.headers = CaseInsensitiveDict(response.headers)
+        result.encoding = get_encoding_from_headers(result.headers)
+        result.reason = response.reason_phrase
+        result.url = request.url
+        result.request = request
+        result.connection = self
+        result._content = response.content
+        return result
+
+    def close(self):
+        pass
+
+
+class AsyncASGITransport(httpx.AsyncBaseTransport):
+    """
+    Транспорт httpx.AsyncClient поверх того же TestClient. Приложение работает в event loop TestClient,
+    а запросы из event loop теста передаются туда из потоков, поэтому соединения базы не переходят между loop
+    """
+
+    def __init__(self, client: TestClient):
+        self.client = client
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        content = await request.aread()
+        response = await asyncio.to_thread(asgi_request, self.client, request.method, str(request.url), content,
+                                           request.headers)
+        headers = [(key, value) for key, value in response.headers.multi_items() if key not in DECODED_HEADERS]
+        return httpx.Response(response.status_code, headers=headers, content=response.content)
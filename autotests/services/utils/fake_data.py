@@ -1,6 +1,10 @@
 from faker import Faker
+import os
 import random
 
+# Под pytest-xdist у каждого воркера свое пространство никнеймов, чтобы параллельные тесты не пересекались
+NICKNAME_PREFIX = f"{os.environ['PYTEST_XDIST_WORKER']}_" if 'PYTEST_XDIST_WORKER' in os.environ else ""
+
 
 class FakeUser:
     def __init__(self):
@@ -9,7 +13,7 @@ class FakeUser:
     def valid_user(self) -> dict:
         """Генерация валидного пользователя"""
         return {
-            "nickname": self.fake.user_name()[:20],
+            "nickname": (NICKNAME_PREFIX + self.fake.user_name())[:20],
             "first_name": self.fake.first_name()[:20],
             "last_name": self.fake.last_name()[:20],
             "age": self.fake.random_int(min=1, max=99),
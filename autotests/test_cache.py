@@ -0,0 +1,33 @@
+import allure
+import pytest
+from cache import LRUCache
+
+
+@allure.feature('User cache')
+class TestLRUCache:
+
+    @allure.story('Hits, misses and evictions are counted')
+    @pytest.mark.api_positive
+    def test_counters(self):
+        cache = LRUCache(maxsize=2, ttl=60)
+        for key in ['first', 'second', 'third']:
+            cache.set(key, key.upper(), cache.token())
+        assert cache.get('first') is None
+        assert cache.get('third') == 'THIRD'
+        assert cache.stats() == {'size': 2, 'maxsize': 2, 'hits': 1, 'misses': 1, 'evictions': 1}
+
+    @allure.story('Expired values are not returned')
+    @pytest.mark.api_positive
+    def test_ttl(self):
+        cache = LRUCache(maxsize=2, ttl=0)
+        cache.set('first', 'FIRST', cache.token())
+        assert cache.get('first') is None
+
+    @allure.story('Value read before invalidation is not cached')
+    @pytest.mark.api_negative
+    def test_stale_fill(self):
+        cache = LRUCache(maxsize=2, ttl=60)
+        token = cache.token()
+        cache.invalidate('first')
+        cache.set('first', 'STALE', token)
+        assert cache.get('first') is None
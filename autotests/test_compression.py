@@ -0,0 +1,82 @@
+import asyncio
+import gzip
+import allure
+import brotli
+import pytest
+from compression import CompressionMiddleware, choose_encoding
+
+
+def run_app(body_chunks, accept_encoding='gzip, br', content_type=b'application/x-ndjson', headers=(), status=200,
+            **options):
+    """Прогоняет ответ из частей body_chunks через middleware и возвращает (заголовки, части тела)"""
+
+    async def app(scope, receive, send):
+        await send({'type': 'http.response.start', 'status': status,
+                    'headers': [(b'content-type', content_type), *headers]})
+        for index, chunk in enumerate(body_chunks):
+            await send({'type': 'http.response.body', 'body': chunk, 'more_body': index < len(body_chunks) - 1})
+
+    messages = []
+
+    async def send(message):
+        messages.append(message)
+
+    scope = {'type': 'http', 'headers': [(b'accept-encoding', accept_encoding.encode())]}
+    asyncio.run(CompressionMiddleware(app, **options)(scope, None, send))
+    start, *bodies = messages
+    return dict(start['headers']), [message['body'] for message in bodies]
+
+
+@allure.feature('Response compression')
+class TestCompression:
+
+    @allure.story('Encoding is chosen by Accept-Encoding quality and server preference')
+    @pytest.mark.api_positive
+    @pytest.mark.parametrize('case, accept_encoding, expected', [
+        ("Both accepted", 'gzip, deflate, br', 'br'),
+        ("Only gzip", 'gzip', 'gzip'),
+        ("Quality", 'br;q=0.2, gzip;q=0.8', 'gzip'),
+        ("Rejected", 'br;q=0, gzip;q=0', None),
+        ("Wildcard", '*', 'br'),
+        ("Wildcard with rejected br", 'br;q=0, *;q=0.5', 'gzip'),
+        ("Missing header", None, None),
+    ])
+    def test_choose_encoding(self, case, accept_encoding, expected):
+        assert choose_encoding(accept_encoding, ['br', 'gzip']) == expected
+
+    @allure.story('Stream is compressed by chunks after threshold')
+    @pytest.mark.api_positive
+    @pytest.mark.parametrize('case, accept_encoding, decompress', [
+        ("Gzip", 'gzip', gzip.decompress),
+        ("Brotli", 'br', brotli.decompress),
+    ])
+    def test_stream(self, case, accept_encoding, decompress):
+        chunks = [b'{"nickname": "user%d"}\n' % i * 20 for i in range(5)]
+        headers, bodies = run_app(chunks, accept_encoding, min_size=800)
+        assert headers[b'content-encoding'] == accept_encoding.encode()
+        assert headers[b'vary'] == b'Accept-Encoding'
+        # Первые две части копятся до порога, дальше каждая часть отправляется сразу
+        assert len(bodies) == 4
+        assert decompress(b''.join(bodies)) == b''.join(chunks)
+
+    @allure.story('Responses are sent as is below threshold or already encoded')
+    @pytest.mark.api_negative
+    @pytest.mark.parametrize('case, chunks, content_type, headers, status', [
+        ("Short stream", [b'a' * 100, b'b' * 100], b'application/x-ndjson', (), 200),
+        ("Binary content", [b'a' * 2000], b'application/gzip', (), 200),
+        ("Already encoded", [b'a' * 2000], b'application/json', ((b'content-encoding', b'gzip'),), 200),
+        ("Client error", [b'a' * 2000], b'application/json', (), 422),
+        ("Server error", [b'a' * 2000], b'application/json', (), 500),
+    ])
+    def test_not_compressed(self, case, chunks, content_type, headers, status):
+        response_headers, bodies = run_app(chunks, content_type=content_type, headers=headers, status=status,
+                                           min_size=1000)
+        assert response_headers.get(b'content-encoding') in (None, b'gzip')
+        assert b'vary' not in response_headers
+        assert b''.join(bodies) == b''.join(chunks)
+
+    @allure.story('Unknown encoding is rejected')
+    @pytest.mark.api_negative
+    def test_unsupported_encoding(self):
+        with pytest.raises(ValueError):
+            CompressionMiddleware(None, encodings=['zstd'])
@@ -0,0 +1,37 @@
+import allure
+import pytest
+from metrics import Counter, Histogram
+
+
+@allure.feature('Metrics')
+class TestMetrics:
+
+    @allure.story('Histogram buckets are cumulative')
+    @pytest.mark.api_positive
+    def test_histogram(self):
+        histogram = Histogram('request_seconds', 'Request time', ('route',), buckets=(0.1, 1.0))
+        for value in (0.05, 0.1, 0.5, 3.0):
+            histogram.observe(value, ('/users',))
+        assert histogram.render() == [
+            '# HELP request_seconds Request time',
+            '# TYPE request_seconds histogram',
+            'request_seconds_bucket{route="/users",le="0.1"} 2',
+            'request_seconds_bucket{route="/users",le="1.0"} 3',
+            'request_seconds_bucket{route="/users",le="+Inf"} 4',
+            'request_seconds_sum{route="/users"} 3.65',
+            'request_seconds_count{route="/users"} 4',
+        ]
+
+    @allure.story('Counter escapes label values')
+    @pytest.mark.api_positive
+    @pytest.mark.parametrize('case, value, rendered', [
+        ("Plain value", '/users', '/users'),
+        ("Quote", 'a"b', 'a\\"b'),
+        ("Backslash", 'a\\b', 'a\\\\b'),
+        ("New line", 'a\nb', 'a\\nb'),
+    ])
+    def test_counter_labels(self, case, value, rendered):
+        counter = Counter('requests_total', 'Requests', ('route',))
+        counter.inc((value,))
+        counter.inc((value,))
+        assert counter.render()[-1] == f'requests_total{{route="{rendered}"}} 2'
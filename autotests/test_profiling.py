@@ -0,0 +1,64 @@
+import asyncio
+import json
+import pstats
+import allure
+import httpx
+import pytest
+from fastapi import FastAPI
+from sqlalchemy import select, func
+import profiling
+from schemas import UserModel
+
+
+def make_app(session_factory, directory, token=None) -> FastAPI:
+    app = FastAPI()
+    app.add_middleware(profiling.ProfilingMiddleware, directory=str(directory), token=token)
+    profiling.instrument_engine(session_factory.kw['bind'])
+
+    @app.get('/users/{nickname}')
+    async def get_user(nickname: str):
+        async with session_factory() as session:
+            return {'users': await session.scalar(select(func.count()).select_from(UserModel))}
+
+    return app
+
+
+def get(app: FastAPI, headers: dict = None) -> httpx.Response:
+    async def run():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url='http://test') as client:
+            return await client.get('/users/nickname', headers=headers)
+    return asyncio.run(run())
+
+
+@allure.feature('Profiling')
+class TestProfiling:
+
+    @allure.story('Request with X-Profile writes profile and SQL statements')
+    @pytest.mark.api_positive
+    def test_profile(self, session_factory, tmp_path):
+        response = get(make_app(session_factory, tmp_path), {'X-Profile': '1'})
+        assert response.json() == {'users': 0}
+        profile_id = response.headers['X-Profile-Id']
+        functions = pstats.Stats(str(tmp_path / f'{profile_id}.prof')).stats
+        assert 'get_user' in {name for _, _, name in functions}
+
+        report = json.loads((tmp_path / f'{profile_id}.json').read_text(encoding='utf-8'))
+        assert report['route'] == '/users/{nickname}'
+        assert report['status'] == 200
+        assert [item['statement'] for item in report['statements']] == [
+            'SELECT count(*) AS count_1 \nFROM users'
+        ]
+        assert 'function calls' in report['functions']
+
+    @allure.story('Request without header or with wrong token is not profiled')
+    @pytest.mark.api_negative
+    @pytest.mark.parametrize('case, token, headers', [
+        ("No header", None, None),
+        ("Wrong token", 'secret', {'X-Profile': '1'}),
+    ])
+    def test_not_profiled(self, session_factory, tmp_path, case, token, headers):
+        response = get(make_app(session_factory, tmp_path, token), headers)
+        assert response.status_code == 200
+        assert 'X-Profile-Id' not in response.headers
+        assert list(tmp_path.glob('*.json')) == []
@@ -0,0 +1,115 @@
+import asyncio
+import re
+import sqlite3
+import allure
+import httpx
+import pytest
+from datetime import date
+from sqlalchemy import event
+from schemas import Base
+from scheduler import ReviewDispatcher, QueueSink
+from autotests.services.users.api_users import User
+
+# "SCAN users" - полный проход по таблице, "SCAN users USING INDEX ..." - проход по индексу с LIMIT,
+# AUTOMATIC INDEX - временный индекс, который SQLite строит проходом по таблице на каждый запрос.
+# "SCAN information_fts VIRTUAL TABLE INDEX 0:M..." - поиск MATCH по индексу FTS5, а не проход по строкам
+TABLE_SCAN = re.compile(r'^SCAN (?!CONSTANT ROW)(?!.*USING)(?!.*VIRTUAL TABLE INDEX \d+:M)|AUTOMATIC')
+
+
+@pytest.fixture()
+def app_statements(tmp_path, monkeypatch, asgi_app):
+    """Прогоняет все эндпоинты main.py на пустой базе и возвращает выполненные SQL запросы с параметрами"""
+    monkeypatch.chdir(tmp_path)
+    import main
+
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        if not executemany and statement.lstrip().upper().startswith(('SELECT', 'UPDATE', 'DELETE', 'INSERT')):
+            statements.append((statement, parameters))
+
+    def new_client() -> httpx.AsyncClient:
+        if asgi_app is not None:
+            # Приложение сессии уже запущено с lifespan в event loop TestClient: запросы идут туда же,
+            # иначе очередь записи и соединения базы оказываются в чужом loop
+            return User.async_client()
+        return httpx.AsyncClient(transport=httpx.ASGITransport(app=main.app), base_url='http://test')
+
+    async def dispatch():
+        dispatcher = ReviewDispatcher(main.new_session, QueueSink())
+        if asgi_app is None:
+            await dispatcher.run_once()
+        else:
+            await asyncio.to_thread(asgi_app.portal.call, dispatcher.run_once)
+
+    async def exercise():
+        async with new_client() as client:
+            assert (await client.post('/setup_database')).status_code == 200
+            # GET-эндпоинты читают через отдельный движок только для чтения
+            for engine in {main.engine, main.read_engine}:
+                event.listen(engine.sync_engine, 'before_cursor_execute', record)
+
+            for nickname in ['first', 'second']:
+                await client.post('/users', json={'nickname': nickname, 'first_name': 'Name',
+                                                  'last_name': 'Surname', 'age': 30, 'job': 'QA'})
+                await client.post(f'/users/{nickname}/information',
+                                  json={'information': 'What is QA', 'explanation': 'Quality Assurance'})
+            await client.get('/users', params={'limit': 1})
+            await client.get('/users', params={'after': 'first', 'limit': 1})
+            await client.get('/users', params={'stream': True, 'after': 'first'})
+            await client.get('/users/first')
+            await client.post('/users:batch-get', json={'nicknames': ['first', 'second', 'third'],
+                                                        'include_information': True})
+            await client.get('/export')
+            await client.put('/users/first', json={'age': 31, 'job': 'Dev'})
+            await client.get('/users/first/information')
+            await client.get('/users/first/information', params={'due_from': date.today().isoformat(),
+                                                                 'sort': '-information', 'limit': 1, 'offset': 1,
+                                                                 'fields': 'information'})
+            await client.get('/users/first/information/search', params={'q': 'quality'})
+            await client.get('/users/first/due', params={'on': date.today().isoformat()})
+            information_id = (await client.get('/users/first/information')).json()[0]['id']
+            await client.post(f'/users/first/information/{information_id}/review', json={'grade': 4})
+            await client.delete(f'/users/first/information/{information_id}')
+            await client.delete('/users/first/information/0')
+            await client.delete('/users/second')
+            await dispatch()
+
+            for engine in {main.engine, main.read_engine}:
+                event.remove(engine.sync_engine, 'before_cursor_execute', record)
+                # Движками сессии API_TRANSPORT=asgi владеет lifespan приложения
+                if asgi_app is None:
+                    await engine.dispose()
+
+    asyncio.run(exercise())
+    # В режиме API_TRANSPORT=asgi main уже импортирован с временной базой сессии, а не с users.db в tmp_path
+    connection = sqlite3.connect(main.engine.url.database)
+    yield connection, statements
+    connection.close()
+
+
+@allure.feature('Database schema')
+class TestQueryPlans:
+
+    @allure.story('No full table scans in queries')
+    @pytest.mark.api_positive
+    def test_no_table_scans(self, app_statements):
+        connection, statements = app_statements
+        assert statements
+        for statement, parameters in statements:
+            plan = connection.execute(f'EXPLAIN QUERY PLAN {statement}', parameters).fetchall()
+            with allure.step(statement):
+                allure.attach('\n'.join(row[3] for row in plan), name='Query plan',
+                              attachment_type=allure.attachment_type.TEXT)
+                scans = [row[3] for row in plan if TABLE_SCAN.search(row[3])]
+                assert not scans, f'{statement}\n{scans}'
+
+    @allure.story('Foreign keys are indexed')
+    @pytest.mark.api_positive
+    def test_foreign_keys_indexed(self):
+        # EXPLAIN не показывает ON DELETE CASCADE, поэтому колонки внешних ключей проверяются по схеме
+        for table in Base.metadata.sorted_tables:
+            leading_columns = {index.columns[0].name for index in table.indexes}
+            leading_columns |= {table.primary_key.columns[0].name}
+            for foreign_key in table.foreign_keys:
+                assert foreign_key.parent.name in leading_columns, f'{table.name}.{foreign_key.parent.name}'
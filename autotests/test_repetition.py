@@ -0,0 +1,105 @@
+import asyncio
+import allure
+import numpy as np
+import pytest
+from datetime import date, timedelta
+from sqlalchemy import select
+from schemas import ReviewStateModel, ReviewScheduleModel, UserModel
+from repetition import SM2Parameters, new_state, review, effective_interval, due_dates, reschedule
+from versions import etag_matches, version_etag
+from autotests.test_scheduler import add_information
+
+TODAY = date(2024, 1, 1)
+
+
+def review_grades(grades: list) -> list:
+    state, states = new_state(), []
+    for grade in grades:
+        state = review(state, grade, TODAY)
+        states.append(state)
+    return states
+
+
+@allure.feature('Spaced repetition')
+class TestSM2:
+
+    @allure.story('Intervals grow with good grades')
+    @pytest.mark.api_positive
+    def test_intervals(self):
+        states = review_grades([5, 5, 4, 3])
+        assert [state.interval for state in states] == [1, 6, 16, 43]
+        assert [state.ease for state in states] == [2.6, 2.7, 2.7, 2.56]
+        assert states[-1].due_date == TODAY + timedelta(days=43)
+        assert states[-1].reviews == 4
+
+    @allure.story('Bad grade starts repetitions again')
+    @pytest.mark.api_positive
+    def test_lapse(self):
+        state = review_grades([5, 5, 5, 2])[-1]
+        assert (state.repetitions, state.interval, state.lapses, state.ease) == (0, 1, 1, 2.8)
+        assert state.due_date == TODAY + timedelta(days=1)
+
+    @allure.story('Ease does not fall below minimum')
+    @pytest.mark.api_positive
+    def test_min_ease(self):
+        assert review_grades([3] * 10)[-1].ease == SM2Parameters().min_ease
+
+    @allure.story('Vectorized due dates match single review')
+    @pytest.mark.api_positive
+    @pytest.mark.parametrize('case, parameters', [
+        ("Default", SM2Parameters()),
+        ("Shorter intervals", SM2Parameters(interval_modifier=0.8)),
+        ("Max interval", SM2Parameters(interval_modifier=1.5, max_interval=30)),
+    ])
+    def test_due_dates(self, case, parameters):
+        intervals = np.arange(0, 200)
+        due = due_dates(np.full(len(intervals), TODAY, dtype='datetime64[D]'), intervals, parameters)
+        assert [due_date.item() for due_date in due] == [
+            TODAY + timedelta(days=effective_interval(int(interval), parameters)) for interval in intervals]
+
+
+@allure.feature('Spaced repetition')
+class TestReschedule:
+
+    @allure.story('Future reviews are moved after parameters change')
+    @pytest.mark.api_positive
+    def test_reschedule(self, session_factory):
+        today = date.today()
+        add_information(session_factory, 'first', [today + timedelta(days=10), today])
+
+        async def add_states():
+            async with session_factory() as session:
+                schedule = (await session.scalars(select(ReviewScheduleModel).order_by(ReviewScheduleModel.id))).all()
+                for item, last_review, interval in zip(schedule, [today - timedelta(days=5), today], [15, 1]):
+                    session.add(ReviewStateModel(information_id=item.information_id, ease=2.5, interval=interval,
+                                                 repetitions=3, lapses=0, reviews=3, last_review=last_review,
+                                                 due_date=item.due_date, schedule_id=item.id))
+                await session.commit()
+
+        async def due_dates_of(model):
+            async with session_factory() as session:
+                return (await session.scalars(select(model.due_date).order_by(model.due_date))).all()
+
+        async def etag():
+            async with session_factory() as session:
+                return version_etag(await session.scalar(select(UserModel.version)))
+
+        asyncio.run(add_states())
+        with allure.step('Unchanged parameters move nothing'):
+            old_etag = asyncio.run(etag())
+            assert asyncio.run(reschedule(session_factory, SM2Parameters(interval_modifier=1.0))) == 0
+            assert etag_matches(old_etag, asyncio.run(etag()))
+
+        with allure.step('Future review is moved, due review is kept'):
+            parameters = SM2Parameters(interval_modifier=0.6)
+            assert asyncio.run(reschedule(session_factory, parameters, chunk_size=1)) == 1
+            expected = [today, today - timedelta(days=5) + timedelta(days=9)]
+            assert asyncio.run(due_dates_of(ReviewStateModel)) == expected
+            assert asyncio.run(due_dates_of(ReviewScheduleModel)) == expected
+
+        with allure.step('Moved review changes ETag of its user'):
+            assert not etag_matches(old_etag, asyncio.run(etag()))
+
+        with allure.step('Moved review does not get earlier than tomorrow'):
+            assert asyncio.run(reschedule(session_factory, SM2Parameters(interval_modifier=0.1))) == 1
+            assert asyncio.run(due_dates_of(ReviewStateModel)) == [today, today + timedelta(days=1)]
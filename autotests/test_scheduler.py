@@ -0,0 +1,154 @@
+import asyncio
+import json
+import allure
+import pytest
+from datetime import date, datetime, timedelta
+from sqlalchemy import delete
+from migrations import migrate
+from schemas import UserModel, InformationalModel, ReviewScheduleModel
+from scheduler import ReviewDispatcher, ReviewSink, QueueSink, FileSink
+
+
+def add_information(session_factory, nickname: str, due_dates: list):
+    async def add():
+        async with session_factory() as session:
+            session.add(UserModel(nickname=nickname, first_name='Name', last_name='Surname', age=30, job='QA'))
+            for due_date in due_dates:
+                session.add(InformationalModel(
+                    information=f'{nickname} {due_date}', explanation='explanation',
+                    repeat_date_1=due_date, repeat_date_2=due_date, repeat_date_3=due_date,
+                    repeat_date_4=due_date, repeat_date_5=due_date, user_nickname=nickname,
+                    review_schedule=[ReviewScheduleModel(user_nickname=nickname, repetition=1, due_date=due_date)]
+                ))
+            await session.commit()
+
+    asyncio.run(add())
+
+
+def drain(queue: asyncio.Queue) -> list:
+    items = []
+    while not queue.empty():
+        items.append(queue.get_nowait())
+    return items
+
+
+@allure.feature('Review dispatch')
+class TestReviewDispatcher:
+
+    @allure.story('Dispatch due items of all users in batches')
+    @pytest.mark.api_positive
+    def test_run_once(self, session_factory):
+        today = date.today()
+        add_information(session_factory, 'first', [today, today + timedelta(days=1)])
+        add_information(session_factory, 'second', [today, today, today - timedelta(days=1)])
+        sink = QueueSink()
+        dispatcher = ReviewDispatcher(session_factory, sink, batch_size=2)
+
+        with allure.step('Dispatch items due today'):
+            midnight = datetime.combine(today, datetime.min.time())
+            assert asyncio.run(dispatcher.run_once()) == 3
+            # Задержка записана при отправке и не растет после нее
+            lag = dispatcher.stats.lag_seconds
+            assert 0 < lag <= (datetime.now() - midnight).total_seconds()
+            assert dispatcher.stats.lag_seconds == lag
+            items = drain(sink.queue)
+            assert [item['due_date'] for item in items] == [today] * 3
+            assert [item['id'] for item in items] == sorted(item['id'] for item in items)
+            assert {item['user_nickname'] for item in items} == {'first', 'second'}
+            assert dispatcher.stats.batches == 2
+            assert dispatcher.stats.throughput > 0
+
+        with allure.step('Nothing is dispatched twice'):
+            assert asyncio.run(dispatcher.run_once()) == 0
+            assert dispatcher.stats.lag_seconds == 0
+
+    @allure.story('Dispatch continues from persistent checkpoint')
+    @pytest.mark.api_positive
+    def test_checkpoint(self, session_factory):
+        today = date.today()
+        add_information(session_factory, 'first', [today])
+        asyncio.run(ReviewDispatcher(session_factory, QueueSink()).run_once())
+
+        with allure.step('New dispatcher skips already dispatched items'):
+            add_information(session_factory, 'second', [today])
+            sink = QueueSink()
+            assert asyncio.run(ReviewDispatcher(session_factory, sink).run_once()) == 1
+            assert [item['user_nickname'] for item in drain(sink.queue)] == ['second']
+
+    @allure.story('Item added after deleting the last dispatched rows is dispatched')
+    @pytest.mark.api_positive
+    def test_deleted_then_inserted(self, session_factory):
+        today = date.today()
+        add_information(session_factory, 'first', [today])
+        add_information(session_factory, 'second', [today])
+        dispatcher = ReviewDispatcher(session_factory, QueueSink())
+        assert asyncio.run(dispatcher.run_once()) == 2
+
+        async def delete_user():
+            async with session_factory() as session:
+                await session.execute(delete(UserModel).where(UserModel.nickname == 'second'))
+                await session.commit()
+
+        with allure.step('Delete user with the highest schedule id and add new item due today'):
+            asyncio.run(delete_user())
+            add_information(session_factory, 'third', [today])
+            sink = QueueSink()
+            dispatcher.sink = sink
+            assert asyncio.run(dispatcher.run_once()) == 1
+            assert [item['user_nickname'] for item in drain(sink.queue)] == ['third']
+
+    @allure.story('Existing schedule table is migrated to AUTOINCREMENT')
+    @pytest.mark.api_positive
+    def test_autoincrement_migration(self, session_factory):
+        add_information(session_factory, 'first', [date.today(), date.today()])
+        engine = session_factory.kw['bind']
+
+        async def schedule_table():
+            async with engine.connect() as connection:
+                sql = (await connection.exec_driver_sql(
+                    "SELECT sql FROM sqlite_master WHERE name = 'review_schedule'")).scalar()
+                ids = (await connection.exec_driver_sql("SELECT id FROM review_schedule ORDER BY id")).scalars().all()
+                return sql, ids
+
+        async def recreate_without_autoincrement(sql: str):
+            async with engine.begin() as connection:
+                await connection.exec_driver_sql("ALTER TABLE review_schedule RENAME TO review_schedule_copy")
+                await connection.exec_driver_sql(sql.replace(" AUTOINCREMENT", ""))
+                await connection.exec_driver_sql("INSERT INTO review_schedule SELECT * FROM review_schedule_copy")
+                await connection.exec_driver_sql("DROP TABLE review_schedule_copy")
+
+        async def run_migrate():
+            async with engine.begin() as connection:
+                await migrate(connection)
+
+        sql, ids = asyncio.run(schedule_table())
+        asyncio.run(recreate_without_autoincrement(sql))
+        assert 'AUTOINCREMENT' not in asyncio.run(schedule_table())[0]
+        asyncio.run(run_migrate())
+        assert asyncio.run(schedule_table()) == (sql, ids)
+
+    @allure.story('Batches of several shards are written to one file without interleaving')
+    @pytest.mark.api_positive
+    def test_file_sink_concurrent(self, tmp_path):
+        sink = FileSink(str(tmp_path / 'dispatch.ndjson'))
+        batches = [[{'batch': batch, 'item': item, 'information': 'x' * 100} for item in range(200)]
+                   for batch in range(8)]
+
+        async def send_all():
+            await asyncio.gather(*[sink.send(items) for items in batches])
+
+        asyncio.run(send_all())
+        lines = [json.loads(line) for line in (tmp_path / 'dispatch.ndjson').read_text().splitlines()]
+        assert len(lines) == 8 * 200
+        # Каждая пачка больше буфера записи и лежит в файле подряд
+        for start in range(0, len(lines), 200):
+            assert lines[start:start + 200] == batches[lines[start]['batch']]
+
+    @allure.story('Sink without send is rejected when created')
+    @pytest.mark.api_negative
+    def test_sink_without_send(self):
+        class IncompleteSink(ReviewSink):
+            pass
+
+        with pytest.raises(TypeError):
+            IncompleteSink()
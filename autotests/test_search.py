@@ -0,0 +1,75 @@
+import asyncio
+import sqlite3
+import allure
+import pytest
+from datetime import date
+from sqlalchemy import update, delete
+from database import create_engine
+from migrations import migrate
+from schemas import UserModel, InformationalModel
+from search import match_query
+from autotests.test_scheduler import add_information
+
+
+def search(database, q: str) -> list:
+    connection = sqlite3.connect(database)
+    try:
+        return [row[0] for row in connection.execute(
+            'SELECT rowid FROM information_fts WHERE information_fts MATCH ? ORDER BY rowid', (match_query(q),))]
+    finally:
+        connection.close()
+
+
+@allure.feature('Information search')
+class TestSearchIndex:
+
+    @allure.story('Index follows inserts, updates and deletes')
+    @pytest.mark.api_positive
+    def test_triggers(self, session_factory, tmp_path):
+        database = tmp_path / 'users.db'
+        add_information(session_factory, 'first', [date(2024, 1, 1)])
+        add_information(session_factory, 'second', [date(2024, 1, 1)])
+        assert search(database, 'first') == [1]
+
+        async def change():
+            async with session_factory() as session:
+                await session.execute(update(InformationalModel).where(InformationalModel.id == 1)
+                                      .values(information='renamed'))
+                await session.execute(delete(UserModel).where(UserModel.nickname == 'second'))
+                await session.commit()
+
+        asyncio.run(change())
+        with allure.step('Updated text is found by new words only'):
+            assert search(database, 'first') == []
+            assert search(database, 'renamed') == [1]
+        with allure.step('Information of deleted user is removed from index'):
+            assert search(database, 'second') == []
+
+    @allure.story('Migration backfills index of existing database')
+    @pytest.mark.api_positive
+    def test_backfill(self, session_factory, tmp_path):
+        database = tmp_path / 'users.db'
+        add_information(session_factory, 'first', [date(2024, 1, 1)])
+        connection = sqlite3.connect(database)
+        connection.execute('DROP TABLE information_fts')
+        connection.close()
+
+        async def migrate_database():
+            engine = create_engine(f'sqlite+aiosqlite:///{database}')
+            async with engine.begin() as connection:
+                await migrate(connection)
+            await engine.dispose()
+
+        asyncio.run(migrate_database())
+        assert search(database, 'first') == [1]
+
+    @allure.story('User query is escaped')
+    @pytest.mark.api_positive
+    @pytest.mark.parametrize('case, q, expected', [
+        ("Words", 'what is', '"what" "is"*'),
+        ("FTS5 operators", 'qa OR -x NEAR(', '"qa" "OR" "x" "NEAR"*'),
+        ("Quotes", '"qa', '"qa"*'),
+        ("No words", '"-()', None),
+    ])
+    def test_match_query(self, case, q, expected):
+        assert match_query(q) == expected
@@ -0,0 +1,89 @@
+import asyncio
+import json
+import allure
+import pytest
+from database import create_engine, shard_urls
+from export import export_users, merged_export_lines
+from migrations import migrate
+from schemas import UserModel
+from sharding import ShardRouter, merge_batches
+
+
+async def batches(*items):
+    for batch in items:
+        yield list(batch)
+
+
+async def collect(iterator) -> list:
+    return [item async for item in iterator]
+
+
+@pytest.fixture()
+def router(tmp_path):
+    engines = [create_engine(url) for url in shard_urls(f"sqlite+aiosqlite:///{tmp_path / 'users.db'}", 3)]
+
+    async def setup():
+        for engine in engines:
+            async with engine.begin() as connection:
+                await migrate(connection)
+
+    asyncio.run(setup())
+    yield ShardRouter(engines)
+
+    async def dispose():
+        for engine in engines:
+            await engine.dispose()
+
+    asyncio.run(dispose())
+
+
+@allure.feature('Sharding')
+class TestSharding:
+
+    @allure.story('Shard files are derived from the database url')
+    @pytest.mark.api_positive
+    @pytest.mark.parametrize('case, url, shards, expected', [
+        ("Single shard", 'sqlite+aiosqlite:///users.db', 1, ['sqlite+aiosqlite:///users.db']),
+        ("File", 'sqlite+aiosqlite:///data/users.db', 2,
+         ['sqlite+aiosqlite:///data/users-0.db', 'sqlite+aiosqlite:///data/users-1.db']),
+        ("In memory", 'sqlite+aiosqlite:///:memory:', 2,
+         ['sqlite+aiosqlite:///:memory:', 'sqlite+aiosqlite:///:memory:']),
+    ])
+    def test_shard_urls(self, case, url, shards, expected):
+        assert shard_urls(url, shards) == expected
+
+    @allure.story('Nickname is routed to the same shard in every process')
+    @pytest.mark.api_positive
+    def test_router(self, router):
+        nicknames = [f'user{i}' for i in range(300)]
+        groups = router.group(nicknames, str)
+        assert sorted(groups) == [0, 1, 2]
+        assert sorted(sum(groups.values(), [])) == sorted(nicknames)
+        for shard, shard_nicknames in groups.items():
+            assert all(router.shard(nickname) == shard for nickname in shard_nicknames)
+        # crc32 не зависит от PYTHONHASHSEED
+        assert router.shard('user0') == 2
+
+    @allure.story('Sorted batches of several shards are merged in order')
+    @pytest.mark.api_positive
+    def test_merge_batches(self):
+        sources = [batches('ad', 'g'), batches(), batches('b', 'cef')]
+        merged = asyncio.run(collect(merge_batches(sources, key=str, batch_size=3)))
+        assert merged == [['a', 'b', 'c'], ['d', 'e', 'f'], ['g']]
+
+    @allure.story('Export of several shards is ordered by nickname')
+    @pytest.mark.api_positive
+    def test_sharded_export(self, router):
+        nicknames = [f'user{i:02}' for i in range(20)]
+
+        async def run():
+            for shard, shard_nicknames in router.group(nicknames, str).items():
+                async with router.session_factories[shard]() as session:
+                    session.add_all(UserModel(nickname=nickname, first_name='Name', last_name='Surname',
+                                              age=30, job='QA') for nickname in shard_nicknames)
+                    await session.commit()
+            sources = [export_users(session_factory) for session_factory in router.session_factories]
+            return await collect(merged_export_lines(sources))
+
+        lines = "".join(asyncio.run(run())).splitlines()
+        assert [json.loads(line)['nickname'] for line in lines] == nicknames
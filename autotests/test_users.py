@@ -1,5 +1,9 @@
+import asyncio
+import gzip
+import json
 import allure
 import pytest
+from datetime import date, timedelta
 from autotests.basetest import BaseTest
 from autotests.services.utils.fake_data import FakeUser
 
@@ -9,6 +13,7 @@ class TestUsers(BaseTest):
 
     @allure.story('Setup Database')
     @pytest.mark.api_positive
+    @pytest.mark.serial
     def test_setup_db(self, user):
         with allure.step('Clear all db'):
             response = user.post_setup_db_users()
@@ -68,6 +73,93 @@ class TestUsers(BaseTest):
                           attachment_type=allure.attachment_type.JSON)
             assert response.status_code == 404, response.json()
 
+    @allure.story('Get users page')
+    @pytest.mark.api_positive
+    def test_get_all_users_pagination(self, create_and_delete_user, user, response_validator):
+        with allure.step('Get first page of users'):
+            response = user.get_all_users(limit=1)
+            allure.attach(str(response.json()), name="First page of users",
+                          attachment_type=allure.attachment_type.JSON)
+            assert response.status_code == 200, response.json()
+            assert len(response.json()) == 1
+            assert response_validator.validate_positive_requests(response.json(), 'GetAllUsers')
+
+        with allure.step('Walk all pages by cursor'):
+            nicknames = [response.json()[0]['nickname']]
+            while 'X-Next-Cursor' in response.headers:
+                assert response.headers['X-Next-Cursor'] == nicknames[-1]
+                response = user.get_all_users(after=response.headers['X-Next-Cursor'], limit=50)
+                assert response.status_code == 200, response.json()
+                nicknames += [item['nickname'] for item in response.json()]
+            assert nicknames == sorted(set(nicknames))
+            assert create_and_delete_user['nickname'] in nicknames
+
+    @allure.story('Get users stream')
+    @pytest.mark.api_positive
+    def test_get_all_users_stream(self, create_and_delete_user, user, response_validator):
+        with allure.step('Get users as NDJSON stream'):
+            response = user.get_all_users(stream=True)
+            assert response.status_code == 200, response.text
+            assert response.headers['content-type'].startswith('application/x-ndjson')
+        with allure.step('Validate every streamed user'):
+            users = [json.loads(line) for line in response.text.splitlines()]
+            assert response_validator.validate_positive_requests(users, 'GetAllUsers')
+            assert create_and_delete_user in users
+
+    @allure.story('Get users page negative')
+    @pytest.mark.api_negative
+    @pytest.mark.parametrize('case, limit', [
+        ("Zero limit", 0),
+        ("Limit more than max", 1001),
+        ("Limit is not int", 'ten'),
+    ])
+    def test_get_all_users_negative(self, user, response_validator, case, limit):
+        with allure.step(f'Try to get users page: {case}'):
+            response = user.get_all_users(limit=limit)
+            assert response.status_code == 400, response.json()
+        with allure.step('Validate response'):
+            assert response_validator.validate_negative_requests(response.json(), 'GetAllUsers')
+
+    @allure.story('Batch get users')
+    @pytest.mark.api_positive
+    def test_post_users_batch_get(self, create_and_delete_user, user, response_validator):
+        create_user = self.user_generator.valid_user()
+        first, second = create_and_delete_user['nickname'], create_user['nickname']
+        missing = f'{first}_missing'
+        info = self.user_generator.post_user_info()
+        assert user.post_create_user(**create_user).status_code == 200
+        assert user.post_create_user_info(second, **info).status_code == 200
+
+        with allure.step('Get users without information'):
+            response = user.post_users_batch_get([second, missing, first, second])
+            assert response.status_code == 200, response.json()
+            assert response_validator.validate_positive_requests(response.json(), 'PostUsersBatchGet')
+            assert response.json() == {'users': [create_user, create_and_delete_user], 'missing': [missing]}
+
+        with allure.step('Get users with information'):
+            response = user.post_users_batch_get([first, second], include_information=True)
+            assert response.status_code == 200, response.json()
+            assert response_validator.validate_positive_requests(response.json(), 'PostUsersBatchGet')
+            users = response.json()['users']
+            assert users[0]['information'] == []
+            assert users[1]['information'] == user.get_user_info(second).json()
+            assert [item['information'] for item in users[1]['information']] == [info['information']]
+        user.delete_user(second)
+
+    @allure.story('Batch get users negative')
+    @pytest.mark.api_negative
+    @pytest.mark.parametrize('case, nicknames', [
+        ("Empty list", []),
+        ("More than max", [f'user{i}' for i in range(1001)]),
+        ("Not a list", 'nickname'),
+    ])
+    def test_post_users_batch_get_negative(self, user, response_validator, case, nicknames):
+        with allure.step(f'Try to get users: {case}'):
+            response = user.post_users_batch_get(nicknames)
+            assert response.status_code == 400, response.json()
+        with allure.step('Validate response'):
+            assert response_validator.validate_negative_requests(response.json(), 'PostUsersBatchGet')
+
     @allure.story('Put user positive')
     @pytest.mark.api_positive
     @pytest.mark.parametrize('case, data', [
@@ -207,14 +299,526 @@ class TestUsers(BaseTest):
                           attachment_type=allure.attachment_type.JSON)
             assert response.status_code == 200, response.json()
             information_id = response.json()[0]['id']
-        # Тест падает
-        # with allure.step('Delete user info: '):
-        #     response = user.delete_user_info(create_and_delete_user['nickname'], information_id)
-        #     print(f'Delete user info: {response.json()}\n')
-        #     assert response.status_code == 200, response.json()
-        #
-        # with allure.step('Try to get user info: '):
-        #     response = user.get_user_info(create_and_delete_user['nickname'])
-        #     allure.attach(str(response.json()), name="Get user info",
-        #                   attachment_type=allure.attachment_type.JSON)
-        #     assert response.status_code == 404, response.json()
+
+        with allure.step('Delete user info: '):
+            response = user.delete_user_info(create_and_delete_user['nickname'], information_id)
+            assert response.status_code == 200, response.json()
+            assert response_validator.validate_positive_requests(response.json(), 'DeleteUserInfo')
+
+        with allure.step('Try to get user info: '):
+            response = user.get_user_info(create_and_delete_user['nickname'])
+            allure.attach(str(response.json()), name="Get user info",
+                          attachment_type=allure.attachment_type.JSON)
+            assert response.status_code == 200, response.json()
+            assert information_id not in [item['id'] for item in response.json()]
+
+        with allure.step('Try to delete user info again: '):
+            response = user.delete_user_info(create_and_delete_user['nickname'], information_id)
+            assert response.status_code == 404, response.json()
+            assert response.json()['detail'] == 'Information not found'
+
+    @allure.story('User info of unknown user')
+    @pytest.mark.api_negative
+    def test_user_info_unknown_user(self, create_and_delete_user, user):
+        nickname = create_and_delete_user['nickname'] * 2
+        with allure.step('Try to create user info'):
+            response = user.post_create_user_info(nickname, **self.user_generator.post_user_info())
+            assert response.status_code == 404, response.json()
+        with allure.step('Try to get user info'):
+            response = user.get_user_info(nickname)
+            assert response.status_code == 404, response.json()
+        with allure.step('Try to review user info'):
+            response = user.post_user_info_review(nickname, 1, 5)
+            assert response.status_code == 404, response.json()
+            assert response.json()['detail'] == 'User not found'
+        with allure.step('Try to delete user info'):
+            response = user.delete_user_info(nickname, 1)
+            assert response.status_code == 404, response.json()
+            assert response.json()['detail'] == 'User not found'
+
+    @allure.story('Get empty user info')
+    @pytest.mark.api_positive
+    def test_get_user_info_empty(self, create_and_delete_user, user):
+        with allure.step('Get user info of user without info'):
+            response = user.get_user_info(create_and_delete_user['nickname'])
+            assert response.status_code == 200, response.json()
+            assert response.json() == []
+
+    @allure.story('Filter, sort, paginate and project user info')
+    @pytest.mark.api_positive
+    @pytest.mark.parametrize('case, params, expected', [
+        ("Sort descending", {'sort': '-information'}, ['c', 'b', 'a']),
+        ("Limit and offset", {'sort': 'information', 'limit': 1, 'offset': 1}, ['b']),
+        ("Offset past the end", {'offset': 10}, []),
+        ("Due in range", {'due_from': 4, 'due_to': 4}, ['b', 'a', 'c']),
+        ("Not due in range", {'due_from': 2, 'due_to': 3}, []),
+    ])
+    def test_get_user_info_query(self, create_and_delete_user, user, case, params, expected):
+        nickname = create_and_delete_user['nickname']
+        with allure.step('Create user info'):
+            response = user.post_create_user_info_bulk(
+                nickname, [{'information': information, 'explanation': 'explanation'} for information in 'bac'])
+            assert response.json()['inserted'] == 3, response.json()
+
+        with allure.step('Get user info with query parameters'):
+            for key in ('due_from', 'due_to'):
+                if key in params:
+                    params[key] = (date.today() + timedelta(days=params[key])).isoformat()
+            response = user.get_user_info(nickname, fields='information', **params)
+            assert response.status_code == 200, response.json()
+            assert response.json() == [{'information': information} for information in expected]
+
+    @allure.story('Project user info fields')
+    @pytest.mark.api_positive
+    def test_get_user_info_fields(self, create_and_delete_user, user):
+        nickname = create_and_delete_user['nickname']
+        assert user.post_create_user_info(nickname, **self.user_generator.post_user_info()).status_code == 200
+        response = user.get_user_info(nickname, fields='id, repeat_date_5')
+        assert response.status_code == 200, response.json()
+        assert list(response.json()[0]) == ['id', 'repeat_date_5']
+        assert response.json()[0]['repeat_date_5'] == (date.today() + timedelta(days=30)).isoformat()
+
+    @allure.story('Get user info with invalid query parameters')
+    @pytest.mark.api_negative
+    @pytest.mark.parametrize('case, params, status_code', [
+        ("Unknown field", {'fields': 'id,secret'}, 400),
+        ("Empty fields", {'fields': ','}, 400),
+        ("Unknown sort", {'sort': 'explanation'}, 400),
+        ("Zero limit", {'limit': 0}, 400),
+        ("Negative offset", {'offset': -1}, 400),
+        ("Unknown user with offset", {'offset': 1, 'nickname': 'unknown'}, 404),
+    ])
+    def test_get_user_info_query_negative(self, create_and_delete_user, user, case, params, status_code):
+        nickname = params.pop('nickname', create_and_delete_user['nickname'])
+        response = user.get_user_info(nickname, **params)
+        assert response.status_code == status_code, response.json()
+
+    @allure.story('Project user info fields negative')
+    @pytest.mark.api_negative
+    @pytest.mark.parametrize('case, fields, message', [
+        ("Only comma", ',', 'fields must name at least one field'),
+        ("Only space", ' ', 'fields must name at least one field'),
+        ("Unknown field", 'id,secret', 'Unknown fields: secret'),
+    ])
+    def test_get_user_info_fields_negative(self, create_and_delete_user, user, case, fields, message):
+        response = user.get_user_info(create_and_delete_user['nickname'], fields=fields)
+        assert response.status_code == 400, response.json()
+        assert response.json()['detail'][0]['msg'] == message
+
+    @allure.story('Search user info')
+    @pytest.mark.api_positive
+    @pytest.mark.parametrize('case, q, expected', [
+        ("Word in information", 'assurance', ['What is quality assurance']),
+        ("Word in explanation", 'defects', ['What is testing']),
+        ("Word prefix", 'qual', ['What is quality assurance', 'What is testing']),
+        ("All words required", 'testing quality', ['What is testing']),
+        ("Nothing found", 'unknown', []),
+    ])
+    def test_search_user_info(self, create_and_delete_user, user, case, q, expected):
+        nickname = create_and_delete_user['nickname']
+        with allure.step('Create user info'):
+            response = user.post_create_user_info_bulk(nickname, [
+                {'information': 'What is quality assurance', 'explanation': 'Process control'},
+                {'information': 'What is testing', 'explanation': 'Finding defects to improve quality'},
+            ])
+            assert response.json()['inserted'] == 2, response.json()
+
+        with allure.step('Search user info'):
+            response = user.get_user_info_search(nickname, q)
+            assert response.status_code == 200, response.json()
+            assert [item['information'] for item in response.json()] == expected
+            for item in response.json():
+                assert '<b>' in item['snippet']
+
+    @allure.story('Search user info with invalid parameters')
+    @pytest.mark.api_negative
+    @pytest.mark.parametrize('case, q, limit, status_code', [
+        ("Empty query", '', None, 400),
+        ("Query without words", '"()', None, 400),
+        ("Zero limit", 'qa', 0, 400),
+        ("Unknown user", 'qa', None, 404),
+    ])
+    def test_search_user_info_negative(self, create_and_delete_user, user, case, q, limit, status_code):
+        nickname = create_and_delete_user['nickname'] * (2 if status_code == 404 else 1)
+        response = user.get_user_info_search(nickname, q, limit)
+        assert response.status_code == status_code, response.json()
+
+    @allure.story('Review user info')
+    @pytest.mark.api_positive
+    def test_review_user_info(self, create_and_delete_user, user, response_validator):
+        nickname = create_and_delete_user['nickname']
+        assert user.post_create_user_info(nickname, **self.user_generator.post_user_info()).status_code == 200
+        information_id = user.get_user_info(nickname).json()[0]['id']
+        today = date.today()
+        due_from = (today + timedelta(days=30)).isoformat()
+        response = user.get_user_info(nickname, due_from=due_from)
+        assert [item['id'] for item in response.json()] == [information_id]
+        info_etag = response.headers['ETag']
+
+        with allure.step('Good grades grow interval'):
+            for grade, interval in [(5, 1), (5, 6), (4, 16)]:
+                response = user.post_user_info_review(nickname, information_id, grade)
+                assert response.status_code == 200, response.json()
+                assert response_validator.validate_positive_requests(response.json(), 'PostReviewUserInfo')
+                assert response.json()['interval'] == interval
+            assert response.json()['due_date'] == (today + timedelta(days=16)).isoformat()
+
+        with allure.step('Item is due on SM-2 date instead of initial schedule'):
+            due = user.get_user_due(nickname, on=(today + timedelta(days=16)).isoformat()).json()
+            assert [item['id'] for item in due] == [information_id]
+            assert user.get_user_due(nickname, on=(today + timedelta(days=4)).isoformat()).json() == []
+
+        with allure.step('Review changes ETag of user info filtered by due date'):
+            response = user.get_user_info(nickname, etag=info_etag, due_from=due_from)
+            assert response.status_code == 200, response.text
+            assert response.json() == []
+
+        with allure.step('Bad grade starts repetitions again'):
+            response = user.post_user_info_review(nickname, information_id, 1)
+            assert response.status_code == 200, response.json()
+            assert (response.json()['repetitions'], response.json()['lapses']) == (0, 1)
+            assert response.json()['due_date'] == (today + timedelta(days=1)).isoformat()
+
+    @allure.story('Review user info with invalid data')
+    @pytest.mark.api_negative
+    @pytest.mark.parametrize('case, grade, information_id, status_code, detail', [
+        ("Grade above 5", 6, None, 400, None),
+        ("Negative grade", -1, None, 400, None),
+        ("Grade is not a number", 'good', None, 400, None),
+        ("Unknown information", 5, 0, 404, 'Information not found'),
+    ])
+    def test_review_user_info_negative(self, create_and_delete_user, user, response_validator, case, grade,
+                                       information_id, status_code, detail):
+        nickname = create_and_delete_user['nickname']
+        assert user.post_create_user_info(nickname, **self.user_generator.post_user_info()).status_code == 200
+        if information_id is None:
+            information_id = user.get_user_info(nickname).json()[0]['id']
+        response = user.post_user_info_review(nickname, information_id, grade)
+        assert response.status_code == status_code, response.json()
+        if detail:
+            assert response.json()['detail'] == detail
+        else:
+            assert response_validator.validate_negative_requests(response.json(), 'PostReviewUserInfo')
+
+    @allure.story('Get user info due for review')
+    @pytest.mark.api_positive
+    @pytest.mark.parametrize('case, days, is_due', [
+        ("Due today", 0, True),
+        ("Due in 4 days", 4, True),
+        ("Due in 30 days", 30, True),
+        ("Not due in 2 days", 2, False),
+    ])
+    def test_get_user_due(self, create_and_delete_user, user, response_validator, case, days, is_due):
+        with allure.step('Create user info'):
+            response = user.post_create_user_info(create_and_delete_user['nickname'],
+                                                  **self.user_generator.post_user_info())
+            assert response.status_code == 200, response.json()
+
+        with allure.step(f'Get user info due for review: {case}'):
+            on = (date.today() + timedelta(days=days)).isoformat()
+            response = user.get_user_due(create_and_delete_user['nickname'], on)
+            allure.attach(str(response.json()), name="Get user due info",
+                          attachment_type=allure.attachment_type.JSON)
+            assert response.status_code == 200, response.json()
+
+        with allure.step('Validate response'):
+            if is_due:
+                assert response_validator.validate_positive_requests(response.json(), 'GetUserDue')
+                assert len(response.json()) == 1
+            else:
+                assert response.json() == []
+
+    @allure.story('Get user info due for review negative')
+    @pytest.mark.api_negative
+    def test_get_user_due_negative(self, create_and_delete_user, user, response_validator):
+        with allure.step('Try to get due info with invalid date'):
+            response = user.get_user_due(create_and_delete_user['nickname'], 'tomorrow')
+            assert response.status_code == 400, response.json()
+            assert response_validator.validate_negative_requests(response.json(), 'GetUserDue')
+
+        with allure.step('Try to get due info of unknown user'):
+            response = user.get_user_due(create_and_delete_user['nickname'] * 2)
+            assert response.status_code == 404, response.json()
+
+    @allure.story('Create users in bulk')
+    @pytest.mark.api_positive
+    @pytest.mark.parametrize('case, ndjson', [
+        ("JSON array", False),
+        ("NDJSON stream", True),
+    ])
+    def test_post_create_users_bulk(self, user, response_validator, case, ndjson):
+        users = [self.user_generator.valid_user() for _ in range(3)]
+        rows = users + [self.user_generator.invalid_user_wrong_age(), users[0]]
+        try:
+            with allure.step(f'Create users in bulk: {case}'):
+                response = user.post_create_users_bulk(rows, ndjson=ndjson)
+                allure.attach(str(response.json()), name="Bulk create users",
+                              attachment_type=allure.attachment_type.JSON)
+                assert response.status_code == 200, response.json()
+            with allure.step('Validate per-row results'):
+                assert response_validator.validate_positive_requests(response.json(), 'PostCreateUsersBulk')
+                assert response.json()['inserted'] == 3
+                assert [error['row'] for error in response.json()['errors']] == [3, 4]
+                assert response.json()['errors'][1]['detail'] == 'User already exists'
+            with allure.step('Check for created users'):
+                for created_user in users:
+                    assert user.get_user_by_nickname(created_user['nickname']).json() == created_user
+        finally:
+            for created_user in users:
+                user.delete_user(created_user['nickname'])
+
+    @allure.story('Create users in bulk negative')
+    @pytest.mark.api_negative
+    def test_post_create_users_bulk_negative(self, user):
+        with allure.step('Try to create users from object instead of array'):
+            response = user.post_create_users_bulk(self.user_generator.valid_user())
+            assert response.status_code == 400, response.json()
+
+    @allure.story('Create user info in bulk')
+    @pytest.mark.api_positive
+    @pytest.mark.parametrize('case, ndjson', [
+        ("JSON array", False),
+        ("NDJSON stream", True),
+    ])
+    def test_post_create_user_info_bulk(self, create_and_delete_user, user, response_validator, case, ndjson):
+        nickname = create_and_delete_user['nickname']
+        rows = [self.user_generator.post_user_info() for _ in range(5)]
+        rows.insert(2, self.user_generator.post_user_info_empty_strings())
+        with allure.step(f'Create user info in bulk: {case}'):
+            response = user.post_create_user_info_bulk(nickname, rows, ndjson=ndjson)
+            allure.attach(str(response.json()), name="Bulk create user info",
+                          attachment_type=allure.attachment_type.JSON)
+            assert response.status_code == 200, response.json()
+        with allure.step('Validate per-row results'):
+            assert response_validator.validate_positive_requests(response.json(), 'PostCreateUserInfoBulk')
+            assert response.json()['inserted'] == 5
+            assert [error['row'] for error in response.json()['errors']] == [2]
+        with allure.step('Check for created user info and its review schedule'):
+            assert len(user.get_user_info(nickname).json()) == 5
+            assert len(user.get_user_due(nickname).json()) == 5
+
+        with allure.step('Try to create user info of unknown user'):
+            response = user.post_create_user_info_bulk(nickname * 2, rows, ndjson=ndjson)
+            assert response.status_code == 404, response.json()
+
+    @allure.story('Export all data')
+    @pytest.mark.api_positive
+    @pytest.mark.parametrize('case, compressed, snapshot', [
+        ("NDJSON", False, False),
+        ("Gzip", True, False),
+        ("Snapshot", False, True),
+    ])
+    def test_get_export(self, create_and_delete_user, user, case, compressed, snapshot):
+        nickname = create_and_delete_user['nickname']
+        with allure.step('Create user info'):
+            for _ in range(2):
+                response = user.post_create_user_info(nickname, **self.user_generator.post_user_info())
+                assert response.status_code == 200, response.json()
+
+        with allure.step(f'Export all data: {case}'):
+            response = user.get_export(gzip=compressed, snapshot=snapshot)
+            assert response.status_code == 200, response.text
+            content = gzip.decompress(response.content) if compressed else response.content
+
+        with allure.step('Check for exported user with info'):
+            users = [json.loads(line) for line in content.decode().splitlines()]
+            assert [item['nickname'] for item in users] == sorted(item['nickname'] for item in users)
+            exported = next(item for item in users if item['nickname'] == nickname)
+            assert {key: exported[key] for key in create_and_delete_user} == create_and_delete_user
+            assert exported['information'] == [
+                {key: value for key, value in item.items() if key != 'user_nickname'}
+                for item in user.get_user_info(nickname).json()
+            ]
+
+    @allure.story('Large responses are compressed')
+    @pytest.mark.api_positive
+    @pytest.mark.parametrize('case, accept_encoding, encoding', [
+        ("Brotli", 'br', 'br'),
+        ("Gzip", 'gzip', 'gzip'),
+        ("Gzip preferred by quality", 'br;q=0.5, gzip', 'gzip'),
+        ("Identity", 'identity', None),
+    ])
+    def test_response_compression(self, create_and_delete_user, user, case, accept_encoding, encoding):
+        nickname = create_and_delete_user['nickname']
+        with allure.step('Create user info'):
+            rows = [self.user_generator.post_user_info() for _ in range(20)]
+            assert user.post_create_user_info_bulk(nickname, rows).status_code == 200
+
+        with allure.step(f'Get user info: {case}'):
+            response = user.get_user_info(nickname, accept_encoding=accept_encoding)
+            assert response.status_code == 200, response.text
+            assert response.headers.get('Content-Encoding') == encoding
+            assert len(response.json()) == 20
+        with allure.step('Response shorter than threshold is not compressed'):
+            response = user.get_user_info(nickname, accept_encoding=accept_encoding, limit=1)
+            assert response.status_code == 200, response.text
+            assert 'Content-Encoding' not in response.headers
+
+    @allure.story('Streamed users are compressed')
+    @pytest.mark.api_positive
+    def test_stream_compression(self, user):
+        users = [self.user_generator.valid_user() for _ in range(20)]
+        try:
+            with allure.step('Create users'):
+                assert user.post_create_users_bulk(users).json()['inserted'] == 20
+            with allure.step('Get users as compressed NDJSON stream'):
+                response = user.get_all_users(stream=True, accept_encoding='gzip')
+                assert response.status_code == 200, response.text
+                assert response.headers['Content-Encoding'] == 'gzip'
+                streamed = {json.loads(line)['nickname'] for line in response.text.splitlines()}
+                assert {created_user['nickname'] for created_user in users} <= streamed
+        finally:
+            for created_user in users:
+                user.delete_user(created_user['nickname'])
+
+    @allure.story('Cached user is invalidated by update and delete')
+    @pytest.mark.api_positive
+    def test_user_cache_invalidation(self, create_user, user):
+        nickname = create_user['nickname']
+        with allure.step('Get user twice to fill the cache'):
+            hits = user.get_cache_stats().json()['hits']
+            for _ in range(2):
+                assert user.get_user_by_nickname(nickname).json() == create_user
+            assert user.get_cache_stats().json()['hits'] > hits
+
+        with allure.step('Updated user is returned after update'):
+            data = self.user_generator.put_user_valid()
+            assert user.put_user_age_and_job(nickname, data['age'], data['job']).status_code == 200
+            assert user.get_user_by_nickname(nickname).json() == {**create_user, **data}
+
+        with allure.step('Deleted user is not returned after delete'):
+            assert user.delete_user(nickname).status_code == 200
+            assert user.get_user_by_nickname(nickname).status_code == 404
+
+    @allure.story('Concurrent user info creation')
+    @pytest.mark.api_positive
+    def test_concurrent_post_user_info(self, create_and_delete_user, user):
+        nickname = create_and_delete_user['nickname']
+        items = [self.user_generator.post_user_info() for _ in range(20)]
+
+        async def post_all():
+            async with user.async_client() as client:
+                return await asyncio.gather(*[
+                    client.post(user.endpoint.post_user_info(nickname),
+                                json=user.payload.post_user_info_payload(**item))
+                    for item in items
+                ])
+
+        with allure.step('Post user info concurrently'):
+            responses = asyncio.run(post_all())
+            assert [response.status_code for response in responses] == [200] * len(items)
+
+        with allure.step('All user info is saved once'):
+            response = user.get_user_info(nickname)
+            assert sorted(item['information'] for item in response.json()) == \
+                sorted(item['information'] for item in items)
+
+    @allure.story('OpenAPI schema is served compressed with ETag')
+    @pytest.mark.api_positive
+    def test_openapi(self, user):
+        with allure.step('Get compressed schema'):
+            response = user.get_openapi()
+            assert response.status_code == 200
+            assert response.headers['Content-Encoding'] == 'gzip'
+            schema = response.json()
+            assert '/users:batch-get' in schema['paths']
+            assert all('422' not in method['responses']
+                       for path in schema['paths'].values() for method in path.values())
+
+        with allure.step('Unchanged schema is not sent again'):
+            response = user.get_openapi(etag=response.headers['ETag'])
+            assert response.status_code == 304
+
+    @allure.story('OpenAPI schema is not gzipped for clients rejecting gzip')
+    @pytest.mark.api_negative
+    @pytest.mark.parametrize('case, accept_encoding', [
+        ("Rejected gzip", 'gzip;q=0'),
+        ("Identity", 'identity'),
+        ("Similar name", 'x-notgzip'),
+    ])
+    def test_openapi_not_gzipped(self, user, case, accept_encoding):
+        response = user.get_openapi(accept_encoding=accept_encoding)
+        assert response.status_code == 200
+        assert 'Content-Encoding' not in response.headers
+        assert '/users:batch-get' in response.json()['paths']
+
+    @allure.story('Requests are counted in metrics by route template')
+    @pytest.mark.api_positive
+    def test_metrics(self, create_user, user):
+        nickname = create_user['nickname']
+        with allure.step('Get user and unknown path'):
+            assert user.get_user_by_nickname(nickname).status_code == 200
+            assert user.get_user_by_nickname(f'{nickname}/unknown/path').status_code == 404
+
+        with allure.step('Metrics contain route templates, not nicknames'):
+            response = user.get_metrics()
+            assert response.status_code == 200
+            assert response.headers['content-type'].startswith('text/plain')
+            assert 'http_requests_total{method="GET",route="/users/{nickname}",status="200"}' in response.text
+            assert 'http_requests_total{method="GET",route="unmatched",status="404"}' in response.text
+            assert 'http_request_db_queries_bucket{method="POST",route="/users",le="+Inf"}' in response.text
+            assert nickname not in response.text
+
+        with allure.step('Read and write pools are measured separately'):
+            assert 'db_pool_checkout_seconds_count{pool="read"}' in response.text
+            assert 'db_pool_checkout_seconds_count{pool="write"}' in response.text
+
+    @allure.story('Conditional get of user and user info')
+    @pytest.mark.api_positive
+    def test_conditional_get(self, create_user, user):
+        nickname = create_user['nickname']
+        with allure.step('Unchanged user and user info return 304'):
+            user_etag = user.get_user_by_nickname(nickname).headers['ETag']
+            info_etag = user.get_user_info(nickname).headers['ETag']
+            response = user.get_user_by_nickname(nickname, etag=user_etag)
+            assert response.status_code == 304
+            assert response.headers['ETag'] == user_etag
+            assert user.get_user_info(nickname, etag=info_etag).status_code == 304
+
+        with allure.step('Created user info changes ETag'):
+            assert user.post_create_user_info(nickname, **self.user_generator.post_user_info()).status_code == 200
+            response = user.get_user_info(nickname, etag=info_etag)
+            assert response.status_code == 200, response.json()
+            assert len(response.json()) == 1
+            info_etag = response.headers['ETag']
+
+        with allure.step('Bulk created user info changes ETag'):
+            items = [self.user_generator.post_user_info() for _ in range(2)]
+            assert user.post_create_user_info_bulk(nickname, items).json()['inserted'] == 2
+            response = user.get_user_info(nickname, etag=info_etag)
+            assert response.status_code == 200, response.text
+            assert len(response.json()) == 3
+            assert response.headers['ETag'] != info_etag
+            info_etag = response.headers['ETag']
+
+        with allure.step('Deleted user info changes ETag'):
+            assert user.delete_user_info(nickname, response.json()[0]['id']).status_code == 200
+            response = user.get_user_info(nickname, etag=info_etag)
+            assert response.status_code == 200, response.json()
+            assert len(response.json()) == 2
+
+        with allure.step('Updated user changes ETag'):
+            data = self.user_generator.put_user_valid()
+            assert user.put_user_age_and_job(nickname, data['age'], data['job']).status_code == 200
+            response = user.get_user_by_nickname(nickname, etag=user_etag)
+            assert response.status_code == 200, response.json()
+            assert response.json() == {**create_user, **data}
+
+        with allure.step('Deleted user is not returned as not modified'):
+            user_etag = response.headers['ETag']
+            assert user.delete_user(nickname).status_code == 200
+            assert user.get_user_by_nickname(nickname, etag=user_etag).status_code == 404
+
+    @allure.story('Any ETag of unknown user')
+    @pytest.mark.api_negative
+    def test_conditional_get_unknown_user(self, create_and_delete_user, user):
+        nickname = create_and_delete_user['nickname']
+        with allure.step('Existing user matches any ETag'):
+            assert user.get_user_by_nickname(nickname, etag='*').status_code == 304
+            assert user.get_user_info(nickname, etag='*').status_code == 304
+
+        with allure.step('Unknown user is not found with any ETag'):
+            response = user.get_user_by_nickname(nickname * 2, etag='*')
+            assert response.status_code == 404, response.text
+            response = user.get_user_info(nickname * 2, etag='*')
+            assert response.status_code == 404, response.text
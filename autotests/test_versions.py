@@ -0,0 +1,30 @@
+import allure
+import pytest
+from versions import etag_matches, new_version, version_etag
+
+
+@allure.feature('Conditional get')
+class TestVersions:
+
+    @allure.story('Version of a recreated user does not repeat the previous one')
+    @pytest.mark.api_positive
+    def test_new_version(self):
+        versions = {new_version() for _ in range(100)}
+        assert len(versions) == 100
+        assert all(0 <= version < 2 ** 62 for version in versions)
+        assert version_etag(5) == 'W/"5"'
+        assert etag_matches(version_etag(5), version_etag(5))
+        assert not etag_matches(version_etag(5), version_etag(6))
+
+    @allure.story('If-None-Match is compared weakly')
+    @pytest.mark.api_positive
+    @pytest.mark.parametrize('case, if_none_match, matches', [
+        ("Same weak tag", 'W/"abc-1"', True),
+        ("Strong tag", '"abc-1"', True),
+        ("Tag in list", '"other", W/"abc-1"', True),
+        ("Any tag", '*', True),
+        ("Other version", 'W/"abc-2"', False),
+        ("No header", None, False),
+    ])
+    def test_etag_matches(self, case, if_none_match, matches):
+        assert etag_matches(if_none_match, 'W/"abc-1"') is matches
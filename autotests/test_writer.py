@@ -0,0 +1,59 @@
+import asyncio
+import allure
+import pytest
+from sqlalchemy import select, func
+from sqlalchemy.exc import IntegrityError
+from schemas import UserModel
+from writer import WriteQueue
+
+
+def insert_user(nickname: str):
+    async def operation(session):
+        session.add(UserModel(nickname=nickname, first_name='Name', last_name='Surname', age=30, job='QA'))
+        return nickname
+    return operation
+
+
+async def count_users(session_factory) -> int:
+    async with session_factory() as session:
+        return await session.scalar(select(func.count()).select_from(UserModel))
+
+
+@allure.feature('Write queue')
+class TestWriteQueue:
+
+    @allure.story('Concurrent writes are committed in batches')
+    @pytest.mark.api_positive
+    def test_group_commit(self, session_factory):
+        async def run():
+            queue = WriteQueue(session_factory, max_batch=50)
+            queue.start()
+            results = await asyncio.gather(*[queue.submit(insert_user(f'user{i}')) for i in range(200)])
+            await queue.stop()
+            return queue, results
+
+        queue, results = asyncio.run(run())
+        assert results == [f'user{i}' for i in range(200)]
+        assert queue.operations == 200
+        assert queue.batches < 200
+        assert asyncio.run(count_users(session_factory)) == 200
+
+    @allure.story('Failed write affects only its caller')
+    @pytest.mark.api_negative
+    def test_failure_isolation(self, session_factory):
+        async def run():
+            queue = WriteQueue(session_factory)
+            queue.start()
+            results = await asyncio.gather(
+                queue.submit(insert_user('first')),
+                queue.submit(insert_user('first')),
+                queue.submit(insert_user('second')),
+                return_exceptions=True
+            )
+            await queue.stop()
+            return results
+
+        first, duplicate, second = asyncio.run(run())
+        assert (first, second) == ('first', 'second')
+        assert isinstance(duplicate, IntegrityError)
+        assert asyncio.run(count_users(session_factory)) == 2
@@ -0,0 +1,225 @@
+"""
+Нагрузочный прогон всех эндпоинтов API с отчетом в JSON: RPS и задержки p50/p95/p99 по каждому сценарию.
+Данные генерируются FakeUser с фиксированным seed, поэтому прогоны разных коммитов сравнимы между собой.
+
+    python benchmarks/bench_api.py --mode inprocess --users 200 --items 20 --requests 1000 --concurrency 32 \\
+        --output before.json
+    python benchmarks/bench_api.py --mode uvicorn --output after.json
+    python benchmarks/bench_api.py --compare before.json after.json --threshold 0.2
+
+В режиме inprocess запросы идут в приложение через httpx.ASGITransport без сети, в режиме uvicorn
+приложение запускается отдельным процессом на свободном порту. --compare завершается с кодом 1,
+если p95 какого-либо сценария выросла или RPS упал больше чем на threshold.
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+import httpx
+from common import ROOT, git_commit, load_app, run_load
+
+sys.path.insert(0, ROOT)
+from autotests.services.utils.fake_data import FakeUser  # noqa: E402
+
+SEED = 0
+BATCH_SIZE = 100
+
+
+def make_dataset(users: int, items: int) -> dict:
+    generator = FakeUser()
+    generator.fake.seed_instance(SEED)
+    nicknames, dataset = set(), {"users": [], "information": [], "new_users": []}
+    while len(dataset["users"]) + len(dataset["new_users"]) < users * 2:
+        user = generator.valid_user()
+        if user["nickname"] in nicknames:
+            continue
+        nicknames.add(user["nickname"])
+        # Половина пользователей создается заранее, вторая половина - в сценарии create_user
+        target = "users" if len(dataset["users"]) < users else "new_users"
+        dataset[target].append(user)
+    dataset["information"] = [generator.post_user_info() for _ in range(items)]
+    return dataset
+
+
+async def seed(client: httpx.AsyncClient, dataset: dict) -> dict:
+    assert (await client.post("/setup_database")).status_code == 200
+    response = await client.post("/users:bulk", json=dataset["users"])
+    assert response.json()["failed"] == 0, response.json()
+    information_ids = []
+    for user in dataset["users"]:
+        nickname = user["nickname"]
+        await client.post(f"/users/{nickname}/information:bulk", json=dataset["information"])
+        response = await client.get(f"/users/{nickname}/information", params={"fields": "id"})
+        information_ids += [(nickname, item["id"]) for item in response.json()]
+    random.Random(SEED).shuffle(information_ids)
+    return {"nicknames": [user["nickname"] for user in dataset["users"]], "information_ids": information_ids}
+
+
+def scenarios(client: httpx.AsyncClient, dataset: dict, state: dict) -> dict:
+    """Сценарии по одному на эндпоинт: i - номер запроса. Изменяющие сценарии идут после читающих"""
+    nicknames = state["nicknames"]
+    information_ids = state["information_ids"]
+    words = [item["information"].split()[0] for item in dataset["information"]]
+    due = (date.today() + timedelta(days=4)).isoformat()
+
+    def nickname(i):
+        return nicknames[i % len(nicknames)]
+
+    def batch(i):
+        return [nickname(i * BATCH_SIZE + j) for j in range(BATCH_SIZE)]
+
+    return {
+        "get_users": lambda i: client.get("/users", params={"limit": 100}),
+        "get_users_stream": lambda i: client.get("/users", params={"stream": True, "limit": 1000}),
+        "get_user": lambda i: client.get(f"/users/{nickname(i)}"),
+        "batch_get_users": lambda i: client.post("/users:batch-get",
+                                                 json={"nicknames": batch(i), "include_information": True}),
+        "get_user_information": lambda i: client.get(f"/users/{nickname(i)}/information"),
+        "get_user_information_projected": lambda i: client.get(
+            f"/users/{nickname(i)}/information", params={"fields": "id,information", "limit": 10}),
+        "search_user_information": lambda i: client.get(
+            f"/users/{nickname(i)}/information/search", params={"q": words[i % len(words)]}),
+        "get_user_due": lambda i: client.get(f"/users/{nickname(i)}/due", params={"on": due}),
+        "export": lambda i: client.get("/export"),
+        # Каждый четвертый запрос - запись: чтение под нагрузкой записи в ту же базу
+        "read_write_mix": lambda i: (client.put(f"/users/{nickname(i)}", json={"age": i % 99 + 1, "job": "QA"})
+                                     if i % 4 == 0 else client.get(f"/users/{nickname(i)}/information")),
+        "create_user": lambda i: client.post("/users", json=dataset["new_users"][i % len(dataset["new_users"])]),
+        "update_user": lambda i: client.put(f"/users/{nickname(i)}", json={"age": i % 99 + 1, "job": "QA"}),
+        "create_information": lambda i: client.post(f"/users/{nickname(i)}/information",
+                                                    json=dataset["information"][i % len(dataset["information"])]),
+        "review_information": lambda i: client.post(
+            "/users/{}/information/{}/review".format(*information_ids[i % len(information_ids)]),
+            json={"grade": i % 6}),
+        "delete_information": lambda i: client.delete(
+            "/users/{}/information/{}".format(*information_ids[i % len(information_ids)])),
+        "delete_user": lambda i: client.delete(f"/users/{nickname(i)}"),
+    }
+
+
+# Сценарии, которые не повторяются для одного и того же объекта: число запросов ограничено данными
+LIMITS = {
+    "create_user": lambda dataset, state: len(dataset["new_users"]),
+    "delete_information": lambda dataset, state: len(state["information_ids"]),
+    "delete_user": lambda dataset, state: len(state["nicknames"]),
+    "export": lambda dataset, state: 20,
+    "get_users_stream": lambda dataset, state: 100,
+}
+
+
+async def run_scenarios(client: httpx.AsyncClient, args) -> dict:
+    dataset = make_dataset(args.users, args.items)
+    state = await seed(client, dataset)
+    results = {}
+    for name, make_request in scenarios(client, dataset, state).items():
+        if args.scenario and name not in args.scenario:
+            continue
+        requests = min(args.requests, LIMITS[name](dataset, state)) if name in LIMITS else args.requests
+        results[name] = await run_load(make_request, requests, args.concurrency)
+    return results
+
+
+async def run_inprocess(args) -> dict:
+    main_module = load_app()
+    transport = httpx.ASGITransport(app=main_module.app, raise_app_exceptions=False)
+    async with main_module.app.router.lifespan_context(main_module.app):
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+            return await run_scenarios(client, args)
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+async def run_uvicorn(args) -> dict:
+    port = free_port()
+    directory = tempfile.mkdtemp(prefix="curve-bench-")
+    # Временная база важнее DATABASE_URL из окружения: сценарии очищают базу
+    environment = {**os.environ, "DATABASE_URL": f"sqlite+aiosqlite:///{directory}/users.db"}
+    server = subprocess.Popen([sys.executable, "-m", "uvicorn", "main:app", "--port", str(port), "--log-level",
+                               "warning", "--workers", str(args.workers)], cwd=ROOT, env=environment)
+    try:
+        limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+        async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{port}", limits=limits, timeout=None) as client:
+            for _ in range(100):
+                try:
+                    await client.get("/cache/stats")
+                    break
+                except httpx.TransportError:
+                    await asyncio.sleep(0.1)
+            return await run_scenarios(client, args)
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def compare(before: dict, after: dict, threshold: float) -> dict:
+    """Относительные изменения RPS и p95 по общим сценариям и список регрессий больше threshold"""
+    report, regressions = {}, []
+    for name in before["results"].keys() & after["results"].keys():
+        old, new = before["results"][name], after["results"][name]
+        rps = new["rps"] / old["rps"] - 1 if old["rps"] else 0.0
+        p95 = new["p95_ms"] / old["p95_ms"] - 1 if old["p95_ms"] else 0.0
+        report[name] = {"rps_change": round(rps, 3), "p95_change": round(p95, 3)}
+        if rps < -threshold or p95 > threshold:
+            regressions.append(name)
+    return {"before": before["meta"], "after": after["meta"], "scenarios": report,
+            "regressions": sorted(regressions)}
+
+
+def main(args):
+    if args.compare:
+        reports = []
+        for path in args.compare:
+            with open(path) as file:
+                reports.append(json.load(file))
+        before, after = reports
+        report = compare(before, after, args.threshold)
+        print(json.dumps(report, indent=2))
+        sys.exit(1 if report["regressions"] else 0)
+
+    started = time.perf_counter()
+    results = asyncio.run(run_inprocess(args) if args.mode == "inprocess" else run_uvicorn(args))
+    report = {
+        "meta": {
+            "commit": git_commit(),
+            "mode": args.mode,
+            "users": args.users,
+            "items": args.items,
+            "requests": args.requests,
+            "concurrency": args.concurrency,
+            "python": platform.python_version(),
+            "seconds": round(time.perf_counter() - started, 1),
+        },
+        "results": results,
+    }
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as file:
+            file.write(output)
+    print(output)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--mode", choices=["inprocess", "uvicorn"], default="inprocess")
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--items", type=int, default=20)
+    parser.add_argument("--requests", type=int, default=1000)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--workers", type=int, default=1, help="Количество процессов uvicorn")
+    parser.add_argument("--scenario", action="append", help="Запустить только этот сценарий (можно несколько раз)")
+    parser.add_argument("--output", help="Файл для отчета JSON")
+    parser.add_argument("--compare", nargs=2, metavar=("BEFORE", "AFTER"), help="Сравнить два отчета")
+    parser.add_argument("--threshold", type=float, default=0.2)
+    main(parser.parse_args())
@@ -0,0 +1,77 @@
+"""
+Скорость массового импорта через POST /users:bulk и POST /users/{nickname}/information:bulk (NDJSON)
+и обратной выгрузки через GET /export.
+
+    python benchmarks/bench_bulk_import.py --users 1000000 --items 100000
+"""
+import argparse
+import asyncio
+import json
+import time
+import httpx
+from common import load_app
+
+CHUNK_ROWS = 10000
+
+
+def users_ndjson(count: int):
+    for start in range(0, count, CHUNK_ROWS):
+        yield "".join(
+            json.dumps({"nickname": f"user{i}", "first_name": "Name", "last_name": "Surname", "age": 30,
+                        "job": "QA"}) + "\n"
+            for i in range(start, min(start + CHUNK_ROWS, count))
+        ).encode()
+
+
+def information_ndjson(count: int):
+    for start in range(0, count, CHUNK_ROWS):
+        yield "".join(
+            json.dumps({"information": f"Item {i}", "explanation": "Explanation " * 10}) + "\n"
+            for i in range(start, min(start + CHUNK_ROWS, count))
+        ).encode()
+
+
+async def import_rows(client: httpx.AsyncClient, url: str, content, count: int) -> dict:
+    async def body():
+        for chunk in content:
+            yield chunk
+
+    started = time.perf_counter()
+    response = await client.post(url, content=body(), headers={"Content-Type": "application/x-ndjson"},
+                                 timeout=None)
+    elapsed = time.perf_counter() - started
+    result = response.json()
+    return {"rows": count, "inserted": result["inserted"], "failed": result["failed"],
+            "seconds": round(elapsed, 3), "rows_per_second": round(count / elapsed, 1)}
+
+
+async def export_rows(client: httpx.AsyncClient, params: dict) -> dict:
+    started = time.perf_counter()
+    size = 0
+    async with client.stream("GET", "/export", params=params, timeout=None) as response:
+        async for chunk in response.aiter_raw():
+            size += len(chunk)
+    elapsed = time.perf_counter() - started
+    return {"bytes": size, "seconds": round(elapsed, 3), "megabytes_per_second": round(size / elapsed / 2 ** 20, 1)}
+
+
+async def main(args):
+    main_module = load_app()
+    transport = httpx.ASGITransport(app=main_module.app)
+    async with main_module.app.router.lifespan_context(main_module.app):
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            results = {
+                "users": await import_rows(client, "/users:bulk", users_ndjson(args.users), args.users),
+                "information": await import_rows(client, "/users/user0/information:bulk",
+                                                 information_ndjson(args.items), args.items),
+            }
+            results["export"] = await export_rows(client, {})
+            results["export_gzip_snapshot"] = await export_rows(client, {"gzip": True, "snapshot": True})
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--users", type=int, default=1000000)
+    parser.add_argument("--items", type=int, default=100000)
+    asyncio.run(main(parser.parse_args()))
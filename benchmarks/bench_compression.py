@@ -0,0 +1,95 @@
+"""
+Сжатие ответов: сколько байт уходит клиенту и сколько времени сервера стоит сжатие при разных кодировках и уровнях.
+Данные генерируются FakeUser с фиксированным seed. Кроме времени ответа считается оценка полной доставки
+на медленном канале: время ответа + размер / --bandwidth (кбит/с).
+
+    python benchmarks/bench_compression.py --users 2000 --items 500 --requests 50 --bandwidth 1000
+
+Без --profile запускает каждую кодировку и уровень в отдельном процессе.
+"""
+import argparse
+import asyncio
+import json
+import statistics
+import sys
+import time
+import httpx
+from common import ROOT, load_app, run_profiles
+
+sys.path.insert(0, ROOT)
+from autotests.services.utils.fake_data import FakeUser  # noqa: E402
+
+SEED = 0
+PROFILES = {
+    "identity": {"COMPRESSION_ENCODINGS": ""},
+    **{f"gzip-{level}": {"COMPRESSION_ENCODINGS": "gzip", "COMPRESSION_GZIP_LEVEL": str(level)}
+       for level in (1, 6, 9)},
+    **{f"br-{quality}": {"COMPRESSION_ENCODINGS": "br", "COMPRESSION_BROTLI_QUALITY": str(quality)}
+       for quality in (1, 4, 6, 11)},
+}
+
+
+def make_dataset(users: int, items: int) -> dict:
+    generator = FakeUser()
+    generator.fake.seed_instance(SEED)
+    dataset = {}
+    while len(dataset) < users:
+        user = generator.valid_user()
+        dataset.setdefault(user["nickname"], user)
+    return {"users": list(dataset.values()), "information": [generator.post_user_info() for _ in range(items)]}
+
+
+async def run_profile(args):
+    main_module = load_app()
+    transport = httpx.ASGITransport(app=main_module.app, raise_app_exceptions=False)
+    dataset = make_dataset(args.users, args.items)
+    nickname = dataset["users"][0]["nickname"]
+
+    async with main_module.app.router.lifespan_context(main_module.app):
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None,
+                                     headers={"Accept-Encoding": "br, gzip"}) as client:
+            assert (await client.post("/users:bulk", json=dataset["users"])).json()["failed"] == 0
+            await client.post(f"/users/{nickname}/information:bulk", json=dataset["information"])
+
+            payloads = {
+                "users_page": ("/users", {"limit": 1000}),
+                "users_stream": ("/users", {"stream": True}),
+                "information": (f"/users/{nickname}/information", {}),
+            }
+            results = {}
+            for name, (path, params) in payloads.items():
+                latencies = []
+                for _ in range(args.requests):
+                    started = time.perf_counter()
+                    response = await client.get(path, params=params)
+                    latencies.append(time.perf_counter() - started)
+                    assert response.status_code == 200, response.text
+                milliseconds = statistics.median(latencies) * 1000
+                results[name] = {
+                    "bytes": len(response.content),
+                    "wire_bytes": response.num_bytes_downloaded,
+                    "ratio": round(len(response.content) / response.num_bytes_downloaded, 2),
+                    "p50_ms": round(milliseconds, 3),
+                    "delivery_ms": round(milliseconds + response.num_bytes_downloaded * 8 / args.bandwidth, 1),
+                }
+    return results
+
+
+def main(args):
+    if args.profile:
+        print(json.dumps(asyncio.run(run_profile(args))))
+        return
+
+    argv = ["--users", str(args.users), "--items", str(args.items), "--requests", str(args.requests),
+            "--bandwidth", str(args.bandwidth)]
+    print(json.dumps(run_profiles(__file__, PROFILES, argv), indent=2))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--profile", choices=sorted(PROFILES))
+    parser.add_argument("--users", type=int, default=2000)
+    parser.add_argument("--items", type=int, default=500)
+    parser.add_argument("--requests", type=int, default=50)
+    parser.add_argument("--bandwidth", type=float, default=1000, help="Скорость канала в кбит/с")
+    main(parser.parse_args())
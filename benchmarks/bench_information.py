@@ -0,0 +1,66 @@
+"""
+Нагрузочный бенчмарк эндпоинтов /users/{nickname}/information*.
+
+    python benchmarks/bench_information.py --users 50 --items 20 --requests 2000 --concurrency 32
+"""
+import argparse
+import asyncio
+import json
+import httpx
+from common import load_app, setup_database, run_load
+
+
+async def main(args):
+    main_module = load_app()
+    await setup_database(main_module)
+    transport = httpx.ASGITransport(app=main_module.app, raise_app_exceptions=False)
+    nicknames = [f"user{i}" for i in range(args.users)]
+
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        for nickname in nicknames:
+            await client.post("/users", json={"nickname": nickname, "first_name": "Name", "last_name": "Surname",
+                                              "age": 30, "job": "QA"})
+            for i in range(args.items):
+                await client.post(f"/users/{nickname}/information",
+                                  json={"information": f"Item {i}", "explanation": "Explanation " * 10})
+
+        async def get_information(i):
+            return await client.get(f"/users/{nicknames[i % len(nicknames)]}/information")
+
+        async def create_information(i):
+            return await client.post(f"/users/{nicknames[i % len(nicknames)]}/information",
+                                     json={"information": "Bench", "explanation": "Bench"})
+
+        information_ids, etags = [], {}
+        for nickname in nicknames:
+            response = await client.get(f"/users/{nickname}/information")
+            information_ids += [(nickname, item["id"]) for item in response.json()[:args.items]]
+            etags[nickname] = response.headers["ETag"]
+
+        async def get_information_not_modified(i):
+            nickname = nicknames[i % len(nicknames)]
+            return await client.get(f"/users/{nickname}/information", headers={"If-None-Match": etags[nickname]})
+
+        async def delete_information(i):
+            nickname, information_id = information_ids[i]
+            return await client.delete(f"/users/{nickname}/information/{information_id}")
+
+        results = {
+            "get_information": await run_load(get_information, args.requests, args.concurrency),
+            "get_information_not_modified": await run_load(get_information_not_modified, args.requests,
+                                                           args.concurrency),
+            "create_information": await run_load(create_information, args.requests, args.concurrency),
+            "delete_information": await run_load(delete_information,
+                                                 min(args.requests, len(information_ids)), args.concurrency),
+        }
+    await main_module.engine.dispose()
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--items", type=int, default=20)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=32)
+    asyncio.run(main(parser.parse_args()))
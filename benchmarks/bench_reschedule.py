@@ -0,0 +1,59 @@
+"""
+Пересчет дат повторений repetition.reschedule после изменения interval_modifier.
+База заполняется напрямую через sqlite3, чтобы подготовка миллионов состояний не занимала минуты.
+
+    python benchmarks/bench_reschedule.py --items 1000000
+"""
+import argparse
+import asyncio
+import json
+import random
+import sqlite3
+import time
+from datetime import date, timedelta
+from common import load_app, setup_database
+
+
+def fill(database: str, items: int):
+    today = date.today()
+    random_generator = random.Random(0)
+    connection = sqlite3.connect(database)
+    connection.execute("INSERT INTO users VALUES ('bench', 'Name', 'Surname', 30, 'QA', 0)")
+    connection.executemany(
+        "INSERT INTO information VALUES (?, 'Bench', 'Bench', ?, ?, ?, ?, ?, 'bench')",
+        ((i, *[today.isoformat()] * 5) for i in range(1, items + 1))
+    )
+    states, schedule = [], []
+    for i in range(1, items + 1):
+        interval = random_generator.randint(1, 300)
+        last_review = today - timedelta(days=random_generator.randint(0, interval - 1))
+        due_date = (last_review + timedelta(days=interval)).isoformat()
+        states.append((i, 2.5, interval, 3, 0, 3, last_review.isoformat(), due_date, i))
+        schedule.append((i, i, "bench", 4, due_date))
+    connection.executemany("INSERT INTO review_schedule VALUES (?, ?, ?, ?, ?)", schedule)
+    connection.executemany("INSERT INTO review_state VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", states)
+    connection.commit()
+    connection.close()
+
+
+async def main(args):
+    main_module = load_app()
+    from sqlalchemy.engine import make_url
+    from repetition import SM2Parameters, reschedule
+
+    await setup_database(main_module)
+    await asyncio.to_thread(fill, make_url(main_module.DATABASE_URL).database, args.items)
+
+    started = time.perf_counter()
+    moved = await reschedule(main_module.new_session, SM2Parameters(interval_modifier=args.interval_modifier))
+    elapsed = time.perf_counter() - started
+    await main_module.engine.dispose()
+    print(json.dumps({"items": args.items, "moved": moved, "seconds": round(elapsed, 3),
+                      "items_per_second": round(args.items / elapsed, 1)}, indent=2))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--items", type=int, default=1000000)
+    parser.add_argument("--interval-modifier", type=float, default=0.8)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,71 @@
+"""
+Смешанная нагрузка чтение/запись для сравнения настроек SQLite.
+
+    python benchmarks/bench_sqlite_profile.py --requests 2000 --concurrency 32 --write-ratio 0.2
+
+Без --profile запускает себя для каждого профиля в отдельном процессе и печатает результаты рядом.
+"""
+import argparse
+import asyncio
+import json
+import httpx
+from common import load_app, setup_database, run_load, run_profiles
+
+# Профиль legacy повторяет настройки по умолчанию sqlite3: rollback journal, synchronous=FULL, без mmap
+PROFILES = {
+    "legacy": {"SQLITE_JOURNAL_MODE": "DELETE", "SQLITE_SYNCHRONOUS": "FULL", "SQLITE_CACHE_SIZE": "-2000",
+               "SQLITE_MMAP_SIZE": "0", "DB_POOL_SIZE": "5", "DB_MAX_OVERFLOW": "10"},
+    "production": {},
+}
+
+
+async def run_profile(args):
+    main_module = load_app()
+    await setup_database(main_module)
+    transport = httpx.ASGITransport(app=main_module.app, raise_app_exceptions=False)
+    nicknames = [f"user{i}" for i in range(args.users)]
+    write_every = max(int(round(1 / args.write_ratio)), 1) if args.write_ratio else 0
+
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        for nickname in nicknames:
+            await client.post("/users", json={"nickname": nickname, "first_name": "Name", "last_name": "Surname",
+                                              "age": 30, "job": "QA"})
+            for i in range(args.items):
+                await client.post(f"/users/{nickname}/information",
+                                  json={"information": f"Item {i}", "explanation": "Explanation " * 10})
+
+        async def mixed(i):
+            nickname = nicknames[i % len(nicknames)]
+            if write_every and i % write_every == 0:
+                if i % (2 * write_every) == 0:
+                    return await client.put(f"/users/{nickname}", json={"age": 31, "job": "Dev"})
+                return await client.post(f"/users/{nickname}/information",
+                                         json={"information": "Bench", "explanation": "Bench"})
+            if i % 2:
+                return await client.get(f"/users/{nickname}")
+            return await client.get(f"/users/{nickname}/information")
+
+        result = await run_load(mixed, args.requests, args.concurrency)
+    await main_module.engine.dispose()
+    return result
+
+
+def main(args):
+    if args.profile:
+        print(json.dumps(asyncio.run(run_profile(args))))
+        return
+
+    argv = ["--users", str(args.users), "--items", str(args.items), "--requests", str(args.requests),
+            "--concurrency", str(args.concurrency), "--write-ratio", str(args.write_ratio)]
+    print(json.dumps(run_profiles(__file__, PROFILES, argv), indent=2))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--profile", choices=sorted(PROFILES))
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--items", type=int, default=20)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--write-ratio", type=float, default=0.2)
+    main(parser.parse_args())
@@ -0,0 +1,131 @@
+"""
+Время холодного старта: импорт main (с разбивкой по модулям из python -X importtime), запуск lifespan
+и первый запрос /openapi.json. Каждый замер - отдельный процесс, в отчет идут медианы по --repeat замерам,
+поэтому отчеты разных коммитов сравнимы между собой.
+
+    python benchmarks/bench_startup.py --repeat 10 --output before.json
+    python benchmarks/bench_startup.py --compare before.json after.json --threshold 0.1
+
+--compare завершается с кодом 1, если какое-либо время выросло больше чем на threshold.
+"""
+import argparse
+import json
+import os
+import platform
+import re
+import statistics
+import subprocess
+import sys
+import time
+from common import ROOT, git_commit, load_app
+
+TIMINGS = ("import_ms", "startup_ms", "first_openapi_ms", "openapi_ms")
+TOP_MODULES = 10
+MEMORY_DATABASE_URL = "sqlite+aiosqlite:///:memory:"
+IMPORT_LINE = re.compile(r"^import time:\s+\d+ \|\s+(\d+) \|( *)(\S+)$")
+
+
+def child():
+    """Один замер в чистом процессе. Печатает JSON последней строкой"""
+    started = time.perf_counter()
+    main = load_app(MEMORY_DATABASE_URL)
+    timings = {"import_ms": time.perf_counter() - started}
+
+    import asyncio
+    import httpx
+
+    async def run():
+        transport = httpx.ASGITransport(app=main.app)
+        started = time.perf_counter()
+        async with main.app.router.lifespan_context(main.app):
+            timings["startup_ms"] = time.perf_counter() - started
+            async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+                for name in ("first_openapi_ms", "openapi_ms"):
+                    started = time.perf_counter()
+                    assert (await client.get("/openapi.json")).status_code == 200
+                    timings[name] = time.perf_counter() - started
+
+    asyncio.run(run())
+    print(json.dumps({name: round(seconds * 1000, 3) for name, seconds in timings.items()}))
+
+
+def main_modules(importtime: str) -> dict:
+    """Накопительное время импорта модулей, которые импортирует сам main, в миллисекундах"""
+    lines = [match.groups() for match in map(IMPORT_LINE.match, importtime.splitlines()) if match]
+    end = next(index for index, (_, _, name) in enumerate(lines) if name == "main")
+    depth = len(lines[end][1])
+    modules = {}
+    # Подмодули печатаются перед модулем, который их импортировал, поэтому дерево main идет перед его строкой
+    for cumulative, indent, name in reversed(lines[:end]):
+        if len(indent) <= depth:
+            break
+        if len(indent) == depth + 2:
+            modules[name] = int(cumulative) / 1000
+    return modules
+
+
+def measure(repeat: int) -> dict:
+    environment = {**os.environ, "DATABASE_URL": MEMORY_DATABASE_URL}
+    samples, modules = [], {}
+    for _ in range(repeat):
+        # Время считается без -X importtime, который сам замедляет импорт, разбивка по модулям - отдельным процессом
+        result = subprocess.run([sys.executable, __file__, "--child"], cwd=ROOT, env=environment,
+                                check=True, capture_output=True, text=True)
+        samples.append(json.loads(result.stdout.splitlines()[-1]))
+        result = subprocess.run([sys.executable, "-X", "importtime", "-c", "import main"], cwd=ROOT, env=environment,
+                                check=True, capture_output=True, text=True)
+        for name, milliseconds in main_modules(result.stderr).items():
+            modules.setdefault(name, []).append(milliseconds)
+
+    results = {name: round(statistics.median(sample[name] for sample in samples), 3) for name in TIMINGS}
+    medians = {name: round(statistics.median(values), 3) for name, values in modules.items()}
+    results["modules"] = dict(sorted(medians.items(), key=lambda item: -item[1])[:TOP_MODULES])
+    return results
+
+
+def compare(before: dict, after: dict, threshold: float) -> dict:
+    report, regressions = {}, []
+    for name in TIMINGS:
+        old, new = before["results"].get(name), after["results"].get(name)
+        if not old or new is None:
+            continue
+        change = new / old - 1
+        report[name] = {"before": old, "after": new, "change": round(change, 3)}
+        if change > threshold:
+            regressions.append(name)
+    return {"before": before["meta"], "after": after["meta"], "timings": report, "regressions": regressions}
+
+
+def main(args):
+    if args.compare:
+        reports = []
+        for path in args.compare:
+            with open(path) as file:
+                reports.append(json.load(file))
+        report = compare(*reports, args.threshold)
+        print(json.dumps(report, indent=2))
+        sys.exit(1 if report["regressions"] else 0)
+
+    report = {
+        "meta": {"commit": git_commit(), "repeat": args.repeat, "python": platform.python_version()},
+        "results": measure(args.repeat),
+    }
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as file:
+            file.write(output)
+    print(output)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--output", help="Файл для отчета JSON")
+    parser.add_argument("--compare", nargs=2, metavar=("BEFORE", "AFTER"), help="Сравнить два отчета")
+    parser.add_argument("--threshold", type=float, default=0.1)
+    arguments = parser.parse_args()
+    if arguments.child:
+        child()
+    else:
+        main(arguments)
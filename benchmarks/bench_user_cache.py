@@ -0,0 +1,56 @@
+"""
+GET /users/{nickname} по небольшому горячему набору пользователей с кэшем и без него.
+
+    python benchmarks/bench_user_cache.py --users 1000 --hot 50 --requests 5000 --concurrency 32
+"""
+import argparse
+import asyncio
+import json
+import random
+import httpx
+from common import load_app, setup_database, run_load, run_profiles
+
+PROFILES = {
+    "no_cache": {"USER_CACHE_SIZE": "0"},
+    "cache": {"USER_CACHE_SIZE": "10000", "USER_CACHE_TTL": "60"},
+}
+
+
+async def run_profile(args):
+    main_module = load_app()
+    await setup_database(main_module)
+    transport = httpx.ASGITransport(app=main_module.app, raise_app_exceptions=False)
+    nicknames = [f"user{i}" for i in range(args.users)]
+    hot = random.Random(0).sample(nicknames, args.hot)
+
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        await client.post("/users:bulk", json=[{"nickname": nickname, "first_name": "Name", "last_name": "Surname",
+                                                "age": 30, "job": "QA"} for nickname in nicknames])
+
+        async def get_user(i):
+            return await client.get(f"/users/{hot[i % len(hot)]}")
+
+        result = await run_load(get_user, args.requests, args.concurrency)
+        result["cache"] = (await client.get("/cache/stats")).json()
+    await main_module.engine.dispose()
+    return result
+
+
+def main(args):
+    if args.profile:
+        print(json.dumps(asyncio.run(run_profile(args))))
+        return
+
+    argv = ["--users", str(args.users), "--hot", str(args.hot), "--requests", str(args.requests),
+            "--concurrency", str(args.concurrency)]
+    print(json.dumps(run_profiles(__file__, PROFILES, argv), indent=2))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--profile", choices=sorted(PROFILES))
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--hot", type=int, default=50)
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--concurrency", type=int, default=32)
+    main(parser.parse_args())
@@ -0,0 +1,71 @@
+"""
+Пропускная способность записи с очередью group commit и без нее, в том числе с несколькими шардами.
+
+    python benchmarks/bench_write_queue.py --requests 3000 --concurrency 64 --synchronous FULL --shards 1 2 4
+
+Без --profile запускает оба режима для каждого числа шардов в отдельных процессах с одинаковым SQLITE_SYNCHRONOUS.
+"""
+import argparse
+import asyncio
+import json
+import httpx
+from common import load_app, run_load, run_profiles
+
+PROFILES = {
+    "direct": {"WRITE_QUEUE_ENABLED": "0"},
+    "write_queue": {"WRITE_QUEUE_ENABLED": "1"},
+}
+
+
+async def run_profile(args):
+    main_module = load_app()
+    transport = httpx.ASGITransport(app=main_module.app, raise_app_exceptions=False)
+    nicknames = [f"user{i}" for i in range(args.users)]
+
+    # lifespan_context выполняет миграции и запускает писателя так же, как uvicorn
+    async with main_module.app.router.lifespan_context(main_module.app):
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            async def create_user(i):
+                return await client.post("/users", json={"nickname": f"bulk{i}", "first_name": "Name",
+                                                         "last_name": "Surname", "age": 30, "job": "QA"})
+
+            async def create_information(i):
+                return await client.post(f"/users/{nicknames[i % len(nicknames)]}/information",
+                                         json={"information": "Bench", "explanation": "Bench"})
+
+            for nickname in nicknames:
+                await client.post("/users", json={"nickname": nickname, "first_name": "Name",
+                                                  "last_name": "Surname", "age": 30, "job": "QA"})
+            results = {
+                "create_user": await run_load(create_user, args.requests, args.concurrency),
+                "create_information": await run_load(create_information, args.requests, args.concurrency),
+            }
+            write_queues = main_module.app.state.write_queues
+            if write_queues:
+                results["batches"] = sum(write_queue.batches for write_queue in write_queues)
+                results["operations"] = sum(write_queue.operations for write_queue in write_queues)
+    return results
+
+
+def main(args):
+    if args.profile:
+        print(json.dumps(asyncio.run(run_profile(args))))
+        return
+
+    argv = ["--users", str(args.users), "--requests", str(args.requests), "--concurrency", str(args.concurrency)]
+    profiles = {f"{name}/shards={shards}": {**environment, "SQLITE_SYNCHRONOUS": args.synchronous,
+                                            "DB_SHARDS": str(shards)}
+                for shards in args.shards for name, environment in PROFILES.items()}
+    print(json.dumps(run_profiles(__file__, profiles, argv), indent=2))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    # Имя профиля передается дочернему процессу только для отчета, настройки приходят через окружение
+    parser.add_argument("--profile")
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--requests", type=int, default=3000)
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--synchronous", default="FULL")
+    parser.add_argument("--shards", type=int, nargs="+", default=[1])
+    main(parser.parse_args())
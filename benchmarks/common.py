@@ -0,0 +1,91 @@
+import asyncio
+import importlib
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Awaitable, Callable, List, Optional
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def load_app(database_url: Optional[str] = None):
+    """
+    Импортирует main с базой database_url, по умолчанию - с пустой базой во временной директории.
+    DATABASE_URL из окружения не используется: бенчмарки очищают базу и не должны трогать рабочую
+    """
+    if database_url is None:
+        database_url = f"sqlite+aiosqlite:///{tempfile.mkdtemp(prefix='curve-bench-')}/users.db"
+    os.environ["DATABASE_URL"] = database_url
+    sys.path.insert(0, ROOT)
+    return importlib.import_module("main")
+
+
+async def setup_database(main):
+    from migrations import migrate
+
+    for engine in main.engines:
+        async with engine.begin() as connection:
+            await connection.run_sync(main.Base.metadata.drop_all)
+            await migrate(connection)
+
+
+def git_commit() -> str:
+    result = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True)
+    return result.stdout.strip() or "unknown"
+
+
+def percentile(samples: List[float], q: float) -> float:
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    index = min(int(round(q / 100 * (len(ordered) - 1))), len(ordered) - 1)
+    return ordered[index]
+
+
+def summarize(latencies: List[float], elapsed: float, errors: int = 0) -> dict:
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "rps": round(len(latencies) / elapsed, 1) if elapsed else 0.0,
+        "mean_ms": round(statistics.fmean(latencies) * 1000, 3) if latencies else 0.0,
+        "p50_ms": round(percentile(latencies, 50) * 1000, 3),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 3),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 3),
+    }
+
+
+async def run_load(make_request: Callable[[int], Awaitable], requests: int, concurrency: int) -> dict:
+    """
+    Выполняет requests вызовов make_request(i) не более чем concurrency одновременно.
+    make_request возвращает httpx.Response, ответы с кодом >= 400 считаются ошибками.
+    """
+    latencies = []
+    errors = 0
+    counter = iter(range(requests))
+
+    async def worker():
+        nonlocal errors
+        for i in counter:
+            started = time.perf_counter()
+            response = await make_request(i)
+            latencies.append(time.perf_counter() - started)
+            if response.status_code >= 400:
+                errors += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*[worker() for _ in range(concurrency)])
+    return summarize(latencies, time.perf_counter() - started, errors)
+
+
+def run_profiles(script: str, profiles: dict, argv: list) -> dict:
+    """Запускает script --profile <name> в отдельном процессе с переменными окружения каждого профиля"""
+    results = {}
+    for profile, environment in profiles.items():
+        output = subprocess.run([sys.executable, script, "--profile", profile, *argv],
+                                env={**os.environ, **environment}, check=True, capture_output=True, text=True).stdout
+        results[profile] = json.loads(output.splitlines()[-1])
+    return results
@@ -0,0 +1,75 @@
+import json
+from typing import AsyncIterator, List, Tuple, Type, Union
+from fastapi import HTTPException, Request
+from pydantic import BaseModel, ValidationError
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+
+
+async def read_rows(request: Request) -> AsyncIterator[Union[bytes, dict]]:
+    """
+    Отдает строки тела запроса: JSON-массив разбирается целиком, NDJSON читается потоком по строкам,
+    чтобы большой импорт не держал все тело в памяти
+    """
+    if request.headers.get("content-type", "").startswith(NDJSON_MEDIA_TYPE):
+        buffer = b""
+        async for chunk in request.stream():
+            buffer += chunk
+            *lines, buffer = buffer.split(b"\n")
+            for line in lines:
+                if line.strip():
+                    yield line
+        if buffer.strip():
+            yield buffer
+        return
+
+    try:
+        rows = json.loads(await request.body())
+    except ValueError:
+        raise HTTPException(status_code=400, detail=[{"loc": ["body"], "msg": "Invalid JSON"}])
+    if not isinstance(rows, list):
+        raise HTTPException(status_code=400, detail=[{"loc": ["body"], "msg": "Input should be a valid list"}])
+    for row in rows:
+        yield row
+
+
+async def validate_chunks(request: Request, schema: Type[BaseModel], chunk_size: int) \
+        -> AsyncIterator[Tuple[List[Tuple[int, BaseModel]], List[dict]]]:
+    """Отдает пачки по chunk_size строк: (валидные строки с номерами, ошибки невалидных строк)"""
+    valid, errors = [], []
+    row_number = 0
+    async for row in read_rows(request):
+        try:
+            if isinstance(row, bytes):
+                valid.append((row_number, schema.model_validate_json(row)))
+            else:
+                valid.append((row_number, schema.model_validate(row)))
+        except ValidationError as e:
+            errors.append(row_error(row_number, [{"loc": error["loc"], "msg": error["msg"]} for error in e.errors()]))
+        row_number += 1
+        if len(valid) + len(errors) >= chunk_size:
+            yield valid, errors
+            valid, errors = [], []
+    if valid or errors:
+        yield valid, errors
+
+
+def row_error(row: int, detail: Union[str, List[dict]]) -> dict:
+    return {"row": row, "detail": detail}
+
+
+def bulk_openapi(schema: Type[BaseModel]) -> dict:
+    """Описание тела запроса для openapi_extra, так как эндпоинты читают тело сами"""
+    return {
+        "requestBody": {
+            "required": True,
+            "content": {
+                "application/json": {
+                    "schema": {"type": "array", "items": {"$ref": f"#/components/schemas/{schema.__name__}"}}
+                },
+                NDJSON_MEDIA_TYPE: {
+                    "schema": {"$ref": f"#/components/schemas/{schema.__name__}"}
+                }
+            }
+        }
+    }
@@ -0,0 +1,63 @@
+import time
+from collections import OrderedDict
+from typing import Any, Hashable, Optional
+
+
+class LRUCache:
+    """
+    Ограниченный LRU-кэш с TTL для одного процесса. Значения должны быть неизменяемыми.
+    Заполнение после чтения из базы передает token(), полученный до чтения: если за время чтения
+    произошла инвалидация, устаревшее значение не попадет в кэш
+    """
+
+    def __init__(self, maxsize: int = 10000, ttl: float = 5.0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._items: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._invalidations = 0
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        item = self._items.get(key)
+        if item is None:
+            self.misses += 1
+            return None
+        value, expires_at = item
+        if expires_at < time.monotonic():
+            del self._items[key]
+            self.misses += 1
+            return None
+        self._items.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def token(self) -> int:
+        return self._invalidations
+
+    def set(self, key: Hashable, value: Any, token: int):
+        if self.maxsize <= 0 or token != self._invalidations:
+            return
+        self._items[key] = (value, time.monotonic() + self.ttl)
+        self._items.move_to_end(key)
+        while len(self._items) > self.maxsize:
+            self._items.popitem(last=False)
+            self.evictions += 1
+
+    def invalidate(self, key: Hashable):
+        self._invalidations += 1
+        self._items.pop(key, None)
+
+    def clear(self):
+        self._invalidations += 1
+        self._items.clear()
+
+    def stats(self) -> dict:
+        return {
+            "size": len(self._items),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
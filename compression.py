@@ -0,0 +1,155 @@
+import zlib
+from functools import partial
+from typing import Callable, Optional, Sequence
+import brotli
+from starlette.datastructures import MutableHeaders
+from headers import header_value
+
+# Сжимаются только текстовые ответы: выгрузка с gzip=true и схема OpenAPI приходят уже сжатыми
+COMPRESSIBLE_TYPES = ("application/json", "application/x-ndjson", "text/")
+ENCODINGS = ("br", "gzip")
+
+
+class GzipCompressor:
+    def __init__(self, level: int):
+        self.compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+
+    def compress(self, data: bytes, flush: bool = False) -> bytes:
+        chunk = self.compressor.compress(data)
+        return chunk + self.compressor.flush(zlib.Z_SYNC_FLUSH) if flush else chunk
+
+    def finish(self) -> bytes:
+        return self.compressor.flush()
+
+
+class BrotliCompressor:
+    def __init__(self, quality: int):
+        self.compressor = brotli.Compressor(mode=brotli.MODE_TEXT, quality=quality)
+
+    def compress(self, data: bytes, flush: bool = False) -> bytes:
+        chunk = self.compressor.process(data)
+        return chunk + self.compressor.flush() if flush else chunk
+
+    def finish(self) -> bytes:
+        return self.compressor.finish()
+
+
+def choose_encoding(accept_encoding: Optional[str], encodings: Sequence[str]) -> Optional[str]:
+    """Кодировка с наибольшим q из Accept-Encoding, при равных q - первая в encodings. None - без сжатия"""
+    weights = {}
+    for item in (accept_encoding or "").split(","):
+        name, _, parameters = item.partition(";")
+        weight = 1.0
+        parameters = parameters.strip()
+        if parameters.startswith("q="):
+            try:
+                weight = float(parameters[2:])
+            except ValueError:
+                weight = 0.0
+        weights[name.strip().lower()] = weight
+
+    chosen, chosen_weight = None, 0.0
+    for encoding in encodings:
+        weight = weights.get(encoding, weights.get("*", 0.0))
+        if weight > chosen_weight:
+            chosen, chosen_weight = encoding, weight
+    return chosen
+
+
+class CompressionMiddleware:
+    """
+    ASGI middleware: сжимает ответы от min_size байт кодировкой из encodings, которую принимает клиент.
+    Начало ответа копится до min_size, поэтому короткие ответы, в том числе потоковые, уходят без сжатия.
+    Потоковый ответ сжимается по частям со сбросом буфера компрессора после каждой части:
+    клиент получает строки сразу, а не после конца потока
+    """
+
+    def __init__(self, app, encodings: Sequence[str] = ENCODINGS, min_size: int = 1024, gzip_level: int = 6,
+                 brotli_quality: int = 4):
+        unsupported = set(encodings) - set(ENCODINGS)
+        if unsupported:
+            raise ValueError(f"Unsupported compression encodings: {', '.join(sorted(unsupported))}")
+        self.app = app
+        self.encodings = list(encodings)
+        self.min_size = min_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+
+    def compressor(self, encoding: str):
+        if encoding == "br":
+            return BrotliCompressor(self.brotli_quality)
+        return GzipCompressor(self.gzip_level)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        encoding = choose_encoding(header_value(scope, b"accept-encoding"), self.encodings)
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+        response = CompressedResponse(send, encoding, partial(self.compressor, encoding), self.min_size)
+        await self.app(scope, receive, response.send)
+
+
+class CompressedResponse:
+    """Состояние одного ответа: заголовки откладываются, пока не станет ясно, сжимать ли тело"""
+
+    def __init__(self, send, encoding: str, new_compressor: Callable, min_size: int):
+        self.downstream = send
+        self.encoding = encoding
+        self.new_compressor = new_compressor
+        self.min_size = min_size
+        self.start = None
+        self.buffer = bytearray()
+        self.compressor = None
+        self.passthrough = False
+
+    async def send(self, message):
+        if message["type"] == "http.response.start":
+            headers = MutableHeaders(raw=message["headers"])
+            content_type = headers.get("content-type", "")
+            # Сжимаются только успешные ответы с телом, ошибки уходят как есть
+            if (not 200 <= message["status"] < 300 or message["status"] == 204 or "content-encoding" in headers
+                    or not content_type.startswith(COMPRESSIBLE_TYPES)):
+                self.passthrough = True
+                await self.downstream(message)
+            else:
+                self.start = message
+            return
+        if self.passthrough or message["type"] != "http.response.body":
+            await self.downstream(message)
+            return
+
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+        if self.compressor is not None:
+            chunk = self.compressor.compress(body, flush=more_body)
+            if not more_body:
+                chunk += self.compressor.finish()
+            await self.downstream({"type": "http.response.body", "body": chunk, "more_body": more_body})
+            return
+
+        self.buffer += body
+        if len(self.buffer) < self.min_size:
+            if more_body:
+                return
+            # Ответ закончился раньше порога: отправляется как есть
+            await self.downstream(self.start)
+            await self.downstream({"type": "http.response.body", "body": bytes(self.buffer), "more_body": False})
+            return
+
+        self.compressor = self.new_compressor()
+        chunk = self.compressor.compress(bytes(self.buffer), flush=more_body)
+        if not more_body:
+            chunk += self.compressor.finish()
+        self.buffer = bytearray()
+        headers = MutableHeaders(raw=self.start["headers"])
+        headers["Content-Encoding"] = self.encoding
+        headers.add_vary_header("Accept-Encoding")
+        if more_body:
+            del headers["Content-Length"]
+        else:
+            headers["Content-Length"] = str(len(chunk))
+        await self.downstream(self.start)
+        await self.downstream({"type": "http.response.body", "body": chunk, "more_body": more_body})
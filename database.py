@@ -0,0 +1,100 @@
+import os
+from typing import List, Optional
+from urllib.parse import quote
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import create_async_engine, AsyncEngine
+
+DATABASE_URL = os.getenv("DATABASE_URL", "sqlite+aiosqlite:///users.db")
+# Пул пишущих соединений. SQLite выполняет записи по одной, поэтому большой пул только добавляет ожидание блокировки
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "4"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "4"))
+# Пул соединений только для чтения. В режиме WAL читатели не блокируют писателя и друг друга
+DB_READ_POOL_SIZE = int(os.getenv("DB_READ_POOL_SIZE", "10"))
+DB_READ_MAX_OVERFLOW = int(os.getenv("DB_READ_MAX_OVERFLOW", "10"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+# Количество файлов базы, между которыми пользователи распределяются по хэшу никнейма
+DB_SHARDS = int(os.getenv("DB_SHARDS", "1"))
+
+SQLITE_JOURNAL_MODE = os.getenv("SQLITE_JOURNAL_MODE", "WAL")
+SQLITE_SYNCHRONOUS = os.getenv("SQLITE_SYNCHRONOUS", "NORMAL")
+SQLITE_BUSY_TIMEOUT = int(os.getenv("SQLITE_BUSY_TIMEOUT", "5000"))
+# Отрицательное значение cache_size задается в KiB: 64 MiB кэша страниц на соединение
+SQLITE_CACHE_SIZE = int(os.getenv("SQLITE_CACHE_SIZE", "-65536"))
+SQLITE_MMAP_SIZE = int(os.getenv("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024)))
+
+
+def sqlite_pragmas(journal_mode: str = SQLITE_JOURNAL_MODE, synchronous: str = SQLITE_SYNCHRONOUS,
+                   busy_timeout: int = SQLITE_BUSY_TIMEOUT, cache_size: int = SQLITE_CACHE_SIZE,
+                   mmap_size: int = SQLITE_MMAP_SIZE) -> dict:
+    return {
+        # Без foreign_keys SQLite не проверяет внешние ключи и игнорирует ON DELETE CASCADE
+        "foreign_keys": "ON",
+        "journal_mode": journal_mode,
+        "synchronous": synchronous,
+        "busy_timeout": busy_timeout,
+        "cache_size": cache_size,
+        "mmap_size": mmap_size,
+    }
+
+
+def create_engine(url: str = DATABASE_URL, pragmas: dict = None, pool_size: int = DB_POOL_SIZE,
+                  max_overflow: int = DB_MAX_OVERFLOW, pool_timeout: float = DB_POOL_TIMEOUT,
+                  poolclass: type = None) -> AsyncEngine:
+    """Создает движок SQLite, который выставляет pragmas на каждом новом соединении пула"""
+    pragmas = sqlite_pragmas() if pragmas is None else pragmas
+    pool_options = {}
+    if make_url(url).database not in (None, "", ":memory:"):
+        # Для базы в памяти SQLAlchemy использует StaticPool, у которого нет размера
+        pool_options = {"pool_size": pool_size, "max_overflow": max_overflow, "pool_timeout": pool_timeout}
+        if poolclass is not None:
+            pool_options["poolclass"] = poolclass
+    engine = create_async_engine(url, **pool_options)
+
+    @event.listens_for(engine.sync_engine, "connect")
+    def set_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for name, value in pragmas.items():
+            cursor.execute(f"PRAGMA {name}={value}")
+        cursor.close()
+
+    return engine
+
+
+def read_only_pragmas() -> dict:
+    # journal_mode меняет файл базы, поэтому его выставляет только пишущее соединение, режим WAL сохраняется в файле
+    pragmas = sqlite_pragmas()
+    del pragmas["journal_mode"]
+    return {**pragmas, "query_only": "ON"}
+
+
+def create_read_engine(url: str = DATABASE_URL, pool_size: int = DB_READ_POOL_SIZE,
+                       max_overflow: int = DB_READ_MAX_OVERFLOW, pool_timeout: float = DB_POOL_TIMEOUT,
+                       poolclass: type = None) -> Optional[AsyncEngine]:
+    """
+    Создает движок, который открывает файл базы с mode=ro и query_only. Для базы в памяти возвращает None:
+    ее видят только соединения пишущего движка
+    """
+    parsed = make_url(url)
+    if parsed.database in (None, "", ":memory:"):
+        return None
+    read_url = parsed.set(database=f"file:{quote(parsed.database)}",
+                          query={**parsed.query, "mode": "ro", "uri": "true"})
+    return create_engine(read_url.render_as_string(hide_password=False), pragmas=read_only_pragmas(),
+                         pool_size=pool_size, max_overflow=max_overflow, pool_timeout=pool_timeout,
+                         poolclass=poolclass)
+
+
+def shard_urls(url: str = DATABASE_URL, shards: int = DB_SHARDS) -> List[str]:
+    """
+    Адреса файлов шардов: users.db -> users-0.db, users-1.db, ... С одним шардом адрес не меняется.
+    Каждый движок базы в памяти и так отдельная база, поэтому ее адрес повторяется
+    """
+    if shards == 1:
+        return [url]
+    parsed = make_url(url)
+    if parsed.database in (None, "", ":memory:"):
+        return [url] * shards
+    stem, suffix = os.path.splitext(parsed.database)
+    return [parsed.set(database=f"{stem}-{shard}{suffix}").render_as_string(hide_password=False)
+            for shard in range(shards)]
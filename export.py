@@ -0,0 +1,108 @@
+import asyncio
+import json
+import os
+import sqlite3
+import tempfile
+import zlib
+from itertools import groupby
+from operator import itemgetter
+from typing import AsyncIterator, List, Tuple
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import async_sessionmaker
+from database import create_engine
+from schemas import UserModel, InformationalModel
+from sharding import merge_batches
+
+EXPORT_CHUNK_SIZE = 1000
+USER_COLUMNS = ["nickname", "first_name", "last_name", "age", "job"]
+INFORMATION_COLUMNS = ["id", "information", "explanation", "repeat_date_1", "repeat_date_2", "repeat_date_3",
+                       "repeat_date_4", "repeat_date_5"]
+
+
+async def export_users(session_factory: async_sessionmaker) -> AsyncIterator[List[Tuple[str, str]]]:
+    """
+    Отдает пачки пар (никнейм, строка NDJSON) по пользователям вместе с их информацией. Один LEFT JOIN по индексу
+    (user_nickname, id) читается серверным курсором, поэтому в памяти одновременно только одна пачка строк
+    """
+    query = (
+        select(*[UserModel.__table__.c[name] for name in USER_COLUMNS],
+               *[InformationalModel.__table__.c[name].label(f"information_{name}") for name in INFORMATION_COLUMNS])
+        .outerjoin(InformationalModel, InformationalModel.user_nickname == UserModel.nickname)
+        .order_by(UserModel.nickname, InformationalModel.id)
+        .execution_options(yield_per=EXPORT_CHUNK_SIZE)
+    )
+    async with session_factory() as session:
+        result = await session.stream(query)
+        user, information = None, []
+        async for partition in result.mappings().partitions():
+            lines = []
+            for nickname, rows in groupby(partition, key=lambda row: row["nickname"]):
+                if user is not None and user["nickname"] != nickname:
+                    lines.append((user["nickname"], dump_user(user, information)))
+                    user, information = None, []
+                for row in rows:
+                    if user is None:
+                        user = {name: row[name] for name in USER_COLUMNS}
+                    if row["information_id"] is not None:
+                        information.append({name: row[f"information_{name}"] for name in INFORMATION_COLUMNS})
+            if lines:
+                yield lines
+        if user is not None:
+            yield [(user["nickname"], dump_user(user, information))]
+
+
+async def merged_export_lines(sources: List[AsyncIterator[List[Tuple[str, str]]]]) -> AsyncIterator[str]:
+    """Выгрузка из нескольких шардов одним потоком, отсортированным по никнейму"""
+    async for users in merge_batches(sources, key=itemgetter(0), batch_size=EXPORT_CHUNK_SIZE):
+        yield "".join(line for _, line in users)
+
+
+def dump_user(user: dict, information: list) -> str:
+    return json.dumps({**user, "information": information}, ensure_ascii=False, default=str) + "\n"
+
+
+async def gzip_stream(lines: AsyncIterator[str], level: int = 6) -> AsyncIterator[bytes]:
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    async for line in lines:
+        chunk = compressor.compress(line.encode())
+        if chunk:
+            yield chunk
+    yield compressor.flush()
+
+
+async def encode_stream(lines: AsyncIterator[str]) -> AsyncIterator[bytes]:
+    async for line in lines:
+        yield line.encode()
+
+
+def backup_database(source_path: str) -> str:
+    """
+    Копирует базу онлайн-бэкапом SQLite во временный файл. Копия делается за один шаг под читающей транзакцией:
+    в режиме WAL она не блокирует писателей, а пошаговый бэкап перезапускался бы при каждой записи в источник
+    """
+    descriptor, snapshot_path = tempfile.mkstemp(prefix="curve-snapshot-", suffix=".db")
+    os.close(descriptor)
+    source = sqlite3.connect(source_path)
+    target = sqlite3.connect(snapshot_path)
+    try:
+        source.backup(target)
+    finally:
+        target.close()
+        source.close()
+    return snapshot_path
+
+
+async def snapshot_export_users(source_path: str) -> AsyncIterator[List[Tuple[str, str]]]:
+    """Экспорт из согласованного снимка базы: длинная выгрузка не держит транзакцию на рабочей базе"""
+    snapshot_path = await asyncio.to_thread(backup_database, source_path)
+    engine = create_engine(f"sqlite+aiosqlite:///{snapshot_path}", pragmas={"query_only": "ON"},
+                           pool_size=1, max_overflow=0)
+    try:
+        async for users in export_users(async_sessionmaker(engine, expire_on_commit=False)):
+            yield users
+    finally:
+        await engine.dispose()
+        # Снимок базы в режиме WAL тоже открывается в WAL и создает файлы -wal и -shm
+        for suffix in ("", "-wal", "-shm"):
+            if os.path.exists(snapshot_path + suffix):
+                os.remove(snapshot_path + suffix)
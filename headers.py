@@ -0,0 +1,9 @@
+from typing import Optional
+
+
+def header_value(scope, name: bytes) -> Optional[str]:
+    """Значение заголовка запроса из ASGI scope, name - в нижнем регистре"""
+    for key, value in scope["headers"]:
+        if key == name:
+            return value.decode("latin-1")
+    return None
@@ -1,12 +1,73 @@
-from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
-from sqlalchemy import select
-from typing import Annotated, List
+from sqlalchemy.ext.asyncio import async_sessionmaker, AsyncSession
+from sqlalchemy import select, insert, update, delete, func, type_coerce, String, Date
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.exc import IntegrityError
+from typing import Annotated, List, Literal, NamedTuple, Optional, Tuple, Union
 from fastapi.exceptions import RequestValidationError
-from fastapi import FastAPI, Depends, HTTPException, Request
+from fastapi import FastAPI, Depends, HTTPException, Request, Query, Header, Response
+from fastapi.responses import StreamingResponse, ORJSONResponse, PlainTextResponse
 from schemas import Base, UserModel, UserGetSchema, UserPostSchema, UserPutSchema, InformationalModel, \
-    InformationPostSchema, InformationGetSchema, Status
+    InformationPostSchema, InformationGetSchema, InformationSearchSchema, ReviewScheduleModel, DispatchStatsSchema, \
+    BulkResultSchema, CacheStatsSchema, ReviewStateModel, ReviewPostSchema, ReviewStateSchema, UsersBatchGetSchema, \
+    UsersBatchGetResultSchema
+from bulk import validate_chunks, row_error, bulk_openapi
+from export import export_users, snapshot_export_users, merged_export_lines, gzip_stream, encode_stream
+from database import create_engine, create_read_engine, shard_urls, DATABASE_URL, DB_SHARDS
+from sharding import ShardRouter, merge_batches
+from migrations import migrate, insert_review_schedule
+from scheduler import ReviewDispatcher, FileSink
+from writer import WriteQueue, DirectWriter
+from cache import LRUCache
+from compression import CompressionMiddleware
+import metrics
+import profiling
+from repetition import ReviewState, new_state, review
+from search import information_fts, match_query, RANK, SNIPPET
+from versions import version_etag, etag_matches
+from openapi import OpenAPIDocument, build_openapi, SUCCESS, validation_error, error_response
+from contextlib import asynccontextmanager, AsyncExitStack
 from datetime import date, timedelta
-from fastapi.openapi.utils import get_openapi
+from fastapi.openapi.docs import get_swagger_ui_html, get_redoc_html
+import asyncio
+import heapq
+import json
+import os
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    for shard_engine in engines:
+        async with shard_engine.begin() as connection:
+            await migrate(connection)
+
+    # Писатель и рассылка работают на каждом шарде отдельно: у каждого файла своя блокировка записи
+    app.state.write_queues = []
+    if WRITE_QUEUE_ENABLED:
+        app.state.write_queues = [WriteQueue(session_factory, max_batch=WRITE_QUEUE_MAX_BATCH)
+                                  for session_factory in router.session_factories]
+        for write_queue in app.state.write_queues:
+            write_queue.start()
+
+    app.state.review_dispatchers = []
+    if REVIEW_DISPATCH_FILE:
+        sink = FileSink(REVIEW_DISPATCH_FILE)
+        app.state.review_dispatchers = [ReviewDispatcher(session_factory, sink, batch_size=REVIEW_DISPATCH_BATCH_SIZE,
+                                                         interval=REVIEW_DISPATCH_INTERVAL)
+                                        for session_factory in router.session_factories]
+        for review_dispatcher in app.state.review_dispatchers:
+            review_dispatcher.start()
+
+    # Схема строится до первого запроса, а не на первом /openapi.json
+    app.state.openapi_document = None
+    openapi_document()
+    yield
+    for review_dispatcher in app.state.review_dispatchers:
+        await review_dispatcher.stop()
+    for write_queue in app.state.write_queues:
+        await write_queue.stop()
+    for shard_engine in {*engines, *read_engines}:
+        await shard_engine.dispose()
+
 
 app = FastAPI(title="Forgetting-Curve API",
               description="Available API methods for Forgetting-Curve",
@@ -14,33 +75,119 @@ app = FastAPI(title="Forgetting-Curve API",
               openapi_tags=[
                   {"name": "Users", "description": "Операции с пользователями"},
                   {"name": "Users information", "description": "Операции с информацией пользователей"},
-              ])
-engine = create_async_engine("sqlite+aiosqlite:///users.db")
-new_session = async_sessionmaker(engine, expire_on_commit=False)
+              ],
+              lifespan=lifespan,
+              # Схема и страницы документации отдаются своими маршрутами: схема сериализуется и сжимается один раз
+              openapi_url=None, docs_url=None, redoc_url=None)
+# Сжатие ответов. Пустой COMPRESSION_ENCODINGS отключает middleware. Подключается первым, поэтому метрики
+# и профиль запроса включают время сжатия
+COMPRESSION_ENCODINGS = [encoding.strip() for encoding in os.getenv("COMPRESSION_ENCODINGS", "br,gzip").split(",")
+                         if encoding.strip()]
+if COMPRESSION_ENCODINGS:
+    app.add_middleware(CompressionMiddleware, encodings=COMPRESSION_ENCODINGS,
+                       min_size=int(os.getenv("COMPRESSION_MIN_SIZE", "1024")),
+                       gzip_level=int(os.getenv("COMPRESSION_GZIP_LEVEL", "6")),
+                       brotli_quality=int(os.getenv("COMPRESSION_BROTLI_QUALITY", "4")))
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "1") == "1"
+# По движку на шард. С DB_SHARDS=1 (по умолчанию) это один движок на DATABASE_URL
+engines = [create_engine(url, poolclass=metrics.TimedQueuePool if METRICS_ENABLED else None)
+           for url in shard_urls(DATABASE_URL, DB_SHARDS)]
+# GET-эндпоинты читают через отдельный пул соединений только для чтения и не занимают соединения писателей
+read_engines = [create_read_engine(url, poolclass=metrics.TimedReadQueuePool if METRICS_ENABLED else None) or engine
+                for url, engine in zip(shard_urls(DATABASE_URL, DB_SHARDS), engines)]
+if METRICS_ENABLED:
+    app.add_middleware(metrics.MetricsMiddleware)
+    for shard_engine in {*engines, *read_engines}:
+        metrics.instrument_engine(shard_engine)
+# Профилирование отдельных запросов по заголовку X-Profile. Выключено по умолчанию: без PROFILING_ENABLED=1
+# не подключаются ни middleware, ни события движка
+PROFILING_ENABLED = os.getenv("PROFILING_ENABLED", "0") == "1"
+if PROFILING_ENABLED:
+    app.add_middleware(profiling.ProfilingMiddleware, directory=os.getenv("PROFILE_DIR", "profiles"),
+                       token=os.getenv("PROFILE_TOKEN"))
+    for shard_engine in {*engines, *read_engines}:
+        profiling.instrument_engine(shard_engine)
+router = ShardRouter(engines, read_engines)
+# Первый шард, а без шардирования - вся база
+engine = engines[0]
+read_engine = read_engines[0]
+new_session = router.session_factories[0]
+
+USERS_PAGE_SIZE = 100
+USERS_PAGE_SIZE_MAX = 1000
+INFORMATION_PAGE_SIZE_MAX = 1000
+SEARCH_LIMIT = 20
+SEARCH_LIMIT_MAX = 100
+STREAM_CHUNK_SIZE = 1000
+# Никнеймов в одном IN (...): меньше лимита переменных SQLite, и 1000 никнеймов укладываются в два запроса
+BATCH_GET_CHUNK_SIZE = 500
+USER_CACHE_SIZE = int(os.getenv("USER_CACHE_SIZE", "10000"))
+USER_CACHE_TTL = float(os.getenv("USER_CACHE_TTL", "5"))
+BULK_CHUNK_SIZE = int(os.getenv("BULK_CHUNK_SIZE", "5000"))
+WRITE_QUEUE_ENABLED = os.getenv("WRITE_QUEUE_ENABLED", "0") == "1"
+WRITE_QUEUE_MAX_BATCH = int(os.getenv("WRITE_QUEUE_MAX_BATCH", "256"))
+REVIEW_DISPATCH_FILE = os.getenv("REVIEW_DISPATCH_FILE")
+REVIEW_DISPATCH_BATCH_SIZE = int(os.getenv("REVIEW_DISPATCH_BATCH_SIZE", "500"))
+REVIEW_DISPATCH_INTERVAL = float(os.getenv("REVIEW_DISPATCH_INTERVAL", "60"))
+# Начальное расписание до первой оценки: первое повторение в день создания, дальше действует SM-2
+REPEAT_INTERVALS = [timedelta(days=0), timedelta(days=1), timedelta(days=4), timedelta(days=15), timedelta(days=30)]
+
+# Колонки ответа GET /users/{nickname}/information в порядке полей схемы. SQLite хранит даты строками YYYY-MM-DD,
+# то есть уже в формате ответа, поэтому они читаются как строки без разбора в date и обратного форматирования
+INFORMATION_GET_FIELDS = list(InformationGetSchema.model_fields)
+INFORMATION_GET_COLUMNS = {
+    name: type_coerce(column, String) if isinstance(column.type, Date) else column
+    for name, column in ((name, InformationalModel.__table__.c[name]) for name in INFORMATION_GET_FIELDS)
+}
+INFORMATION_SORT_COLUMNS = {"id": InformationalModel.id, "information": InformationalModel.information}
+
+user_cache = LRUCache(maxsize=USER_CACHE_SIZE, ttl=USER_CACHE_TTL)
+
+
+class CachedUser(NamedTuple):
+    user: UserGetSchema
+    # users.version на момент чтения, из нее строится ETag пользователя
+    version: int
+
+
+def bump_version(nickname: str):
+    """Выполняется в транзакции изменения: новая версия видна всем процессам вместе с самим изменением"""
+    return update(UserModel).where(UserModel.nickname == nickname).values(version=UserModel.version + 1)
 
 
 def custom_openapi():
     if app.openapi_schema:
         return app.openapi_schema
-    openapi_schema = get_openapi(
-        title="Forgetting-Curve API",
-        version="1.0.4",
-        description="Available API methods for Forgetting-Curve",
-        routes=app.routes,
-    )
-    # Remove 422 responses
-    for path in openapi_schema["paths"].values():
-        for method in path.values():
-            if "422" in method["responses"]:
-                del method["responses"]["422"]
-
-    app.openapi_schema = openapi_schema
+    app.openapi_schema = build_openapi(app)
     return app.openapi_schema
 
 
 app.openapi = custom_openapi
 
 
+def openapi_document() -> OpenAPIDocument:
+    # Документ строится при старте приложения, здесь - только если lifespan не запускался
+    if getattr(app.state, "openapi_document", None) is None:
+        app.state.openapi_document = OpenAPIDocument(app.openapi())
+    return app.state.openapi_document
+
+
+@app.get("/openapi.json", include_in_schema=False)
+async def get_openapi_json(accept_encoding: Annotated[Optional[str], Header()] = None,
+                           if_none_match: Annotated[Optional[str], Header()] = None):
+    return openapi_document().response(accept_encoding, if_none_match)
+
+
+@app.get("/docs", include_in_schema=False)
+async def get_swagger_ui():
+    return get_swagger_ui_html(openapi_url="/openapi.json", title=f"{app.title} - Swagger UI")
+
+
+@app.get("/redoc", include_in_schema=False)
+async def get_redoc():
+    return get_redoc_html(openapi_url="/openapi.json", title=f"{app.title} - ReDoc")
+
+
 @app.exception_handler(RequestValidationError)
 async def validation_exception_handler(request: Request, exc: RequestValidationError):
     details = exc.errors()
@@ -49,55 +196,145 @@ async def validation_exception_handler(request: Request, exc: RequestValidationE
     raise HTTPException(status_code=400, detail=formatted_errors)
 
 
-async def get_session():
-    async with new_session() as session:
+async def get_session(request: Request):
+    # Сессия открывается в шарде пользователя из пути. Эндпоинты без никнейма в пути обходят шарды сами
+    async with router.session_factory(request.path_params.get("nickname", ""))() as session:
         yield session
 
 
 SessionDep = Annotated[AsyncSession, Depends(get_session)]
 
 
+async def get_read_session(request: Request):
+    # Соединение открыто только для чтения: запись через эту сессию завершится ошибкой SQLite
+    async with router.read_session_factory(request.path_params.get("nickname", ""))() as session:
+        yield session
+
+
+ReadSessionDep = Annotated[AsyncSession, Depends(get_read_session)]
+
+
+def get_writer(request: Request, session: SessionDep):
+    # При WRITE_QUEUE_ENABLED изменения выполняет писатель шарда пачками, иначе сессия запроса
+    write_queues = getattr(request.app.state, "write_queues", None)
+    if write_queues:
+        return write_queues[router.shard(request.path_params.get("nickname", ""))]
+    return DirectWriter(session)
+
+
+WriterDep = Annotated[Union[WriteQueue, DirectWriter], Depends(get_writer)]
+
+
+@asynccontextmanager
+async def shard_writer(request: Request, shard: int):
+    """Писатель шарда для эндпоинтов, у которых никнейм в теле запроса, а не в пути"""
+    write_queues = getattr(request.app.state, "write_queues", None)
+    if write_queues:
+        yield write_queues[shard]
+        return
+    async with router.session_factories[shard]() as session:
+        yield DirectWriter(session)
+
+
 @app.post("/setup_database", tags=["Options"], summary="Очистка и создание новой пустой базы данных")
 async def setup_database():
-    async with engine.begin() as connection:
-        await connection.run_sync(Base.metadata.drop_all)
-        await connection.run_sync(Base.metadata.create_all)
+    for shard_engine in engines:
+        async with shard_engine.begin() as connection:
+            await connection.run_sync(Base.metadata.drop_all)
+            await connection.run_sync(Base.metadata.create_all)
+    user_cache.clear()
     return {"status": "success"}
 
 
+@app.get("/review_dispatch/stats", response_model=DispatchStatsSchema, tags=["Options"],
+         summary="Статистика рассылки повторений",
+         description="Этот эндпоинт возвращает скорость и задержку рассылки повторений. "
+                     "Рассылка включается переменной окружения REVIEW_DISPATCH_FILE",
+         responses={
+             404: error_response("Review dispatch is disabled")
+         })
+async def get_review_dispatch_stats(request: Request):
+    dispatchers = request.app.state.review_dispatchers
+    if not dispatchers:
+        raise HTTPException(status_code=404, detail="Review dispatch is disabled")
+
+    # С шардами счетчики складываются, а задержка и позиция берутся у самого отстающего шарда
+    checkpoints = [dispatcher.stats.checkpoint for dispatcher in dispatchers if dispatcher.stats.checkpoint]
+    checkpoint_date, checkpoint_id = min(checkpoints) if len(checkpoints) == len(dispatchers) else (None, None)
+    return DispatchStatsSchema(
+        running=all(dispatcher.running for dispatcher in dispatchers),
+        dispatched=sum(dispatcher.stats.dispatched for dispatcher in dispatchers),
+        batches=sum(dispatcher.stats.batches for dispatcher in dispatchers),
+        throughput=sum(dispatcher.stats.throughput for dispatcher in dispatchers),
+        lag_seconds=max(dispatcher.stats.lag_seconds for dispatcher in dispatchers),
+        checkpoint_date=checkpoint_date,
+        checkpoint_id=checkpoint_id
+    )
+
+
+@app.get("/cache/stats", response_model=CacheStatsSchema, tags=["Options"],
+         summary="Статистика кэша пользователей",
+         description="Этот эндпоинт возвращает счетчики попаданий, промахов и вытеснений кэша пользователей")
+async def get_cache_stats():
+    return user_cache.stats()
+
+
+@app.get("/metrics", tags=["Options"], summary="Метрики в формате Prometheus",
+         description="Этот эндпоинт возвращает время запросов, время и количество SQL-запросов по маршрутам "
+                     "и время получения соединения из пула. Сбор отключается METRICS_ENABLED=0",
+         response_class=PlainTextResponse,
+         responses={
+             404: error_response("Metrics are disabled")
+         })
+async def get_metrics():
+    if not METRICS_ENABLED:
+        raise HTTPException(status_code=404, detail="Metrics are disabled")
+    return PlainTextResponse(metrics.render(), media_type=metrics.CONTENT_TYPE)
+
+
+@app.get("/export", tags=["Options"], summary="Выгрузка всех данных",
+         description="Этот эндпоинт выгружает всех пользователей вместе с их информацией потоком NDJSON, "
+                     "по строке на пользователя. С gzip=true поток сжимается, со snapshot=true выгрузка идет "
+                     "из согласованного снимка базы, сделанного онлайн-бэкапом SQLite",
+         responses={
+             200: {
+                 "description": "Успешный ответ. Возвращает поток NDJSON",
+                 "content": {
+                     "application/x-ndjson": {
+                         "example": '{"nickname": "string", "first_name": "string", "last_name": "string", '
+                                    '"age": 0, "job": "string", "information": []}'
+                     },
+                     "application/gzip": {}
+                 }
+             },
+             400: error_response("Snapshot is not supported for in-memory database")
+         })
+async def export_data(gzip: Annotated[bool, Query(description="Сжать выгрузку gzip")] = False,
+                      snapshot: Annotated[bool, Query(description="Выгрузить из снимка базы")] = False):
+    if snapshot:
+        databases = [shard_engine.url.database for shard_engine in engines]
+        if databases[0] in (None, "", ":memory:"):
+            raise HTTPException(status_code=400, detail="Snapshot is not supported for in-memory database")
+        # Снимок каждого шарда согласован сам по себе, общего снимка всех шардов нет
+        sources = [snapshot_export_users(database) for database in databases]
+    else:
+        sources = [export_users(session_factory) for session_factory in router.read_session_factories]
+    lines = merged_export_lines(sources)
+
+    if gzip:
+        return StreamingResponse(gzip_stream(lines), media_type="application/gzip",
+                                 headers={"Content-Disposition": 'attachment; filename="export.ndjson.gz"'})
+    return StreamingResponse(encode_stream(lines), media_type="application/x-ndjson")
+
+
 @app.post("/users", tags=["Users"], summary="Создание нового пользователя", response_model=None,
           description="Этот эндпоинт создает нового пользователя в базе данных",
           responses={
-              200: {
-                  "description": "Успешный ответ. Возвращает статус 'успех'",
-                  "model": Status,
-                  "content": {
-                      "application/json": {
-                          "example": {"status": "success"}
-                      }
-                  }
-              },
-              400: {
-                  "description": "Ошибка валидации",
-                  "content": {
-                      "application/json": {
-                          "example": {
-                              "detail": [
-                                  {
-                                      "loc": [
-                                          "body",
-                                          "field"
-                                      ],
-                                      "msg": "string"
-                                  }
-                              ]
-                          }
-                      }
-                  }
-              }
+              200: SUCCESS,
+              400: validation_error("body", "field")
           })
-async def create_user(data: UserPostSchema, session: SessionDep):
-    try:
+async def create_user(request: Request, data: UserPostSchema):
+    async def insert_user(session: AsyncSession):
         new_user = UserModel(
             nickname=data.nickname,
             first_name=data.first_name,
@@ -106,128 +343,288 @@ async def create_user(data: UserPostSchema, session: SessionDep):
             job=data.job
         )
         session.add(new_user)
-        await session.commit()
+
+    try:
+        async with shard_writer(request, router.shard(data.nickname)) as writer:
+            await writer.submit(insert_user)
         return {"status": "success"}
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
 
 
+@app.post("/users:bulk", response_model=BulkResultSchema, tags=["Users"],
+          summary="Массовое создание пользователей",
+          description="Этот эндпоинт создает пользователей из JSON-массива или потока NDJSON "
+                      "(Content-Type: application/x-ndjson). Каждая строка проверяется отдельно, "
+                      f"строки добавляются транзакциями по {BULK_CHUNK_SIZE}",
+          openapi_extra=bulk_openapi(UserPostSchema))
+async def create_users_bulk(request: Request):
+    inserted, errors = 0, []
+    async with AsyncExitStack() as stack:
+        writers = [await stack.enter_async_context(shard_writer(request, shard)) for shard in range(len(router))]
+        async for rows, row_errors in validate_chunks(request, UserPostSchema, BULK_CHUNK_SIZE):
+            errors += row_errors
+            # Пачка делится по шардам, части вставляются в свои базы одновременно
+            groups = router.group(rows, lambda row: row[1].nickname)
+            for chunk_inserted, chunk_errors in await asyncio.gather(
+                    *[writers[shard].submit(insert_users(shard_rows)) for shard, shard_rows in groups.items()]):
+                inserted += chunk_inserted
+                errors += chunk_errors
+    errors.sort(key=lambda error: error["row"])
+    return {"inserted": inserted, "failed": len(errors), "errors": errors}
+
+
+def insert_users(rows: List[Tuple[int, UserPostSchema]]):
+    async def operation(session: AsyncSession):
+        nicknames = [user.nickname for _, user in rows]
+        existing = set(await session.scalars(select(UserModel.nickname).where(UserModel.nickname.in_(nicknames))))
+        values, errors = [], []
+        for row, user in rows:
+            if user.nickname in existing:
+                errors.append(row_error(row, "User already exists"))
+                continue
+            existing.add(user.nickname)
+            values.append(user.model_dump())
+        if values:
+            # Вставка по таблице, а не по модели: обычный executemany без накладных расходов ORM bulk insert
+            await session.execute(sqlite_insert(UserModel.__table__).on_conflict_do_nothing(), values)
+        return len(values), errors
+
+    return operation
+
+
 @app.get("/users", response_model=List[UserGetSchema], tags=["Users"],
-         summary="Получение списка всех пользователей",
-         description="Этот эндпоинт возвращает список всех зарегистрированных пользователей",
+         summary="Получение списка пользователей",
+         description="Этот эндпоинт возвращает страницу пользователей, отсортированных по никнейму. "
+                     "Следующая страница запрашивается параметром after со значением из заголовка X-Next-Cursor. "
+                     "С параметром stream=true пользователи отдаются потоком в формате NDJSON",
          responses={
              200: {
-                 "nickname": "string",
-                 "first_name": "string",
-                 "last_name": "string",
-                 "age": 0,
-                 "job": "string"
-
+                 "description": "Успешный ответ. Возвращает страницу пользователей",
+                 "headers": {
+                     "X-Next-Cursor": {
+                         "description": "Никнейм для запроса следующей страницы. Отсутствует на последней странице",
+                         "schema": {"type": "string"}
+                     }
+                 },
+                 "content": {
+                     "application/json": {
+                         "example": [{
+                             "nickname": "string",
+                             "first_name": "string",
+                             "last_name": "string",
+                             "age": 0,
+                             "job": "string"
+                         }]
+                     },
+                     "application/x-ndjson": {
+                         "example": '{"nickname": "string", "first_name": "string", "last_name": "string", '
+                                    '"age": 0, "job": "string"}'
+                     }
+                 }
              }
          })
-async def get_list_of_users(session: SessionDep):
-    query = select(UserModel)
-    result = await session.execute(query)
-    return result.scalars().all()
+async def get_list_of_users(response: Response,
+                            after: Annotated[Optional[str], Query(
+                                description="Никнейм, после которого начинается страница")] = None,
+                            limit: Annotated[Optional[int], Query(
+                                ge=1, le=USERS_PAGE_SIZE_MAX,
+                                description=f"Размер страницы (по умолчанию {USERS_PAGE_SIZE}, "
+                                            f"в режиме stream без ограничения)")] = None,
+                            stream: Annotated[bool, Query(
+                                description="Отдать пользователей потоком в формате NDJSON")] = False):
+    query = select(UserModel).order_by(UserModel.nickname)
+    if after is not None:
+        query = query.where(UserModel.nickname > after)
+
+    if stream:
+        if limit is not None:
+            query = query.limit(limit)
+        return StreamingResponse(stream_users(query, limit), media_type="application/x-ndjson")
+
+    limit = limit or USERS_PAGE_SIZE
+    # Каждый шард отдает свою отсортированную страницу, общая страница - первые limit + 1 после слияния
+    pages = await asyncio.gather(*[read_users(session_factory, query.limit(limit + 1))
+                                   for session_factory in router.read_session_factories])
+    users = list(heapq.merge(*pages, key=lambda user: user.nickname))[:limit + 1]
+    if len(users) > limit:
+        users = users[:limit]
+        response.headers["X-Next-Cursor"] = users[-1].nickname
+    return users
+
+
+async def read_users(session_factory: async_sessionmaker, query) -> List[UserModel]:
+    async with session_factory() as session:
+        return (await session.scalars(query)).all()
+
+
+async def stream_users(query, limit: Optional[int]):
+    # limit применяется и к каждому шарду, и к результату слияния
+    sources = [stream_shard_users(session_factory, query) for session_factory in router.read_session_factories]
+    async for users in merge_batches(sources, key=lambda user: user.nickname, batch_size=STREAM_CHUNK_SIZE):
+        if limit is not None:
+            users = users[:limit]
+            limit -= len(users)
+        yield "".join(
+            json.dumps(UserGetSchema.model_validate(user, from_attributes=True).model_dump(),
+                       ensure_ascii=False) + "\n"
+            for user in users
+        )
+        if limit == 0:
+            break
+
+
+async def stream_shard_users(session_factory: async_sessionmaker, query):
+    # Сессия открывается внутри генератора: сессии зависимостей закрываются до отправки тела ответа
+    async with session_factory() as session:
+        result = await session.stream_scalars(query.execution_options(yield_per=STREAM_CHUNK_SIZE))
+        async for users in result.partitions():
+            yield users
 
 
 @app.get("/users/{nickname}", response_model=UserGetSchema, tags=["Users"],
          summary="Получение конкретного пользователя",
-         description="Этот эндпоинт возвращает данные о конкретном пользователе",
-         response_description="Успешный ответ. Возвращает конкретного пользователя")
-async def get_user(nickname: str, session: SessionDep):
+         description="Этот эндпоинт возвращает данные о конкретном пользователе. Ответ содержит заголовок ETag, "
+                     "с If-None-Match и неизменившимся пользователем возвращается 304",
+         response_description="Успешный ответ. Возвращает конкретного пользователя",
+         responses={
+             304: {
+                 "description": "Пользователь не изменился с версии из If-None-Match"
+             }
+         })
+async def get_user(nickname: str, session: ReadSessionDep, response: Response,
+                   if_none_match: Annotated[Optional[str], Header()] = None):
+    cached = await get_cached_user(session, nickname)
+
+    if not cached:
+        raise HTTPException(status_code=404, detail="User not found")
+
+    # Версия читается вместе с пользователем. Из кэша она может отставать от других процессов не дольше
+    # USER_CACHE_TTL, как и сами данные
+    etag = version_etag(cached.version)
+    if etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers={"ETag": etag})
+
+    response.headers["ETag"] = etag
+    return cached.user
+
+
+async def get_cached_user(session: AsyncSession, nickname: str) -> Optional[CachedUser]:
+    # Кэшируются только найденные пользователи: новый пользователь виден сразу без инвалидации
+    cached = user_cache.get(nickname)
+    if cached is not None:
+        return cached
+
+    token = user_cache.token()
     user = await session.execute(select(UserModel).where(UserModel.nickname == nickname))
     user = user.scalar_one_or_none()
+    if user is None:
+        return None
+
+    cached = CachedUser(UserGetSchema.model_validate(user, from_attributes=True), user.version)
+    user_cache.set(nickname, cached, token)
+    return cached
 
-    if not user:
-        raise HTTPException(status_code=404, detail="User not found")
 
-    return user
+@app.post("/users:batch-get", response_model=UsersBatchGetResultSchema, tags=["Users"],
+          summary="Получение нескольких пользователей",
+          description="Этот эндпоинт возвращает пользователей по списку никнеймов, а с include_information=true "
+                      "и их информацию. Пользователи и информация читаются запросами IN по "
+                      f"{BATCH_GET_CHUNK_SIZE} никнеймов. Ненайденные никнеймы возвращаются списком missing",
+          responses={
+              400: validation_error("body", "nicknames")
+          })
+async def batch_get_users(body: UsersBatchGetSchema):
+    nicknames = list(dict.fromkeys(body.nicknames))
+    users, uncached = {}, []
+    for nickname in nicknames:
+        cached = user_cache.get(nickname)
+        if cached is None:
+            uncached.append(nickname)
+        else:
+            users[nickname] = cached.user
+
+    token = user_cache.token()
+    # Шарды читаются одновременно, каждый своей сессией
+    sessions = router.read_session_factories
+    await asyncio.gather(*[batch_get_shard_users(sessions[shard], shard_nicknames, users, token)
+                           for shard, shard_nicknames in router.group(uncached, str).items()])
+
+    found = [nickname for nickname in nicknames if nickname in users]
+    content = {"users": [users[nickname].model_dump() for nickname in found],
+               "missing": [nickname for nickname in nicknames if nickname not in users]}
+
+    if body.include_information:
+        information = {nickname: [] for nickname in found}
+        await asyncio.gather(*[batch_get_shard_information(sessions[shard], shard_nicknames, information)
+                               for shard, shard_nicknames in router.group(found, str).items()])
+        for user in content["users"]:
+            user["information"] = information[user["nickname"]]
+
+    return ORJSONResponse(content)
+
+
+async def batch_get_shard_users(session_factory: async_sessionmaker, nicknames: List[str], users: dict, token):
+    async with session_factory() as session:
+        for start in range(0, len(nicknames), BATCH_GET_CHUNK_SIZE):
+            result = await session.execute(
+                select(*UserModel.__table__.c)
+                .where(UserModel.nickname.in_(nicknames[start:start + BATCH_GET_CHUNK_SIZE])))
+            for row in result:
+                user = users[row.nickname] = UserGetSchema(**row._mapping)
+                user_cache.set(row.nickname, CachedUser(user, row.version), token)
+
+
+async def batch_get_shard_information(session_factory: async_sessionmaker, nicknames: List[str], information: dict):
+    columns = [INFORMATION_GET_COLUMNS[name] for name in INFORMATION_GET_FIELDS]
+    async with session_factory() as session:
+        for start in range(0, len(nicknames), BATCH_GET_CHUNK_SIZE):
+            # Порядок совпадает с индексом (user_nickname, id), поэтому SQLite не сортирует результат отдельно
+            result = await session.execute(
+                select(*columns)
+                .where(InformationalModel.user_nickname.in_(nicknames[start:start + BATCH_GET_CHUNK_SIZE]))
+                .order_by(InformationalModel.user_nickname, InformationalModel.id)
+            )
+            for row in result:
+                item = dict(zip(INFORMATION_GET_FIELDS, row))
+                information[item["user_nickname"]].append(item)
 
 
 @app.put("/users/{nickname}", tags=["Users"], summary="Обновление данных о пользователе",
          description="Этот эндпоинт обновляет возраст и работу конкретного пользователя",
          responses={
-             200: {
-                 "description": "Успешный ответ. Возвращает статус 'успех'",
-                 "model": Status,
-                 "content": {
-                     "application/json": {
-                         "example": {"status": "success"}
-                     }
-                 }
-             },
-             400: {
-                 "description": "Ошибка валидации",
-                 "content": {
-                     "application/json": {
-                         "example": {
-                             "detail": [
-                                 {
-                                     "loc": [
-                                         "body",
-                                         "field"
-                                     ],
-                                     "msg": "string"
-                                 }
-                             ]
-                         }
-                     }
-                 }
-             },
-             404: {
-                 "detail": "User not found"
-             }
+             200: SUCCESS,
+             400: validation_error("body", "field"),
+             404: error_response("User not found")
          })
-async def update_user(nickname: str, data: UserPutSchema, session: SessionDep):
-    user = await session.execute(select(UserModel).where(UserModel.nickname == nickname))
-    user = user.scalar_one_or_none()
-
-    if not user:
-        raise HTTPException(status_code=404, detail="User not found")
+async def update_user(nickname: str, data: UserPutSchema, writer: WriterDep):
+    async def update_age_and_job(session: AsyncSession):
+        updated = await session.execute(
+            update(UserModel)
+            .where(UserModel.nickname == nickname)
+            .values(age=data.age, job=data.job, version=UserModel.version + 1)
+            .returning(UserModel.nickname)
+        )
+        return updated.scalar_one_or_none()
 
     try:
-        user.age = data.age
-        user.job = data.job
-        await session.commit()
-        return {"status": "success"}
+        updated = await writer.submit(update_age_and_job)
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
 
+    user_cache.invalidate(nickname)
+    if updated is None:
+        raise HTTPException(status_code=404, detail="User not found")
+
+    return {"status": "success"}
+
 
 @app.delete("/users/{nickname}", tags=["Users"], summary="Удаление пользователя",
             description="Этот эндпоинт удаляет конкретного пользователя из базы данных",
             responses={
-                200: {
-                    "description": "Успешный ответ. Возвращает статус 'успех'",
-                    "model": Status,
-                    "content": {
-                        "application/json": {
-                            "example": {"status": "success"}
-                        }
-                    }
-                },
-                400: {
-                    "description": "Ошибка валидации",
-                    "content": {
-                        "application/json": {
-                            "example": {
-                                "detail": [
-                                    {
-                                        "loc": [
-                                            "body",
-                                            "field"
-                                        ],
-                                        "msg": "string"
-                                    }
-                                ]
-                            }
-                        }
-                    }
-                },
-                404: {
-                    "detail": "User not found"
-                }
+                200: SUCCESS,
+                400: validation_error("body", "field"),
+                404: error_response("User not found")
             })
 async def delete_user(nickname: str, session: SessionDep):
     user = await session.execute(select(UserModel).where(UserModel.nickname == nickname))
@@ -238,6 +635,7 @@ async def delete_user(nickname: str, session: SessionDep):
 
     await session.delete(user)
     await session.commit()
+    user_cache.invalidate(nickname)
     return {"status": "success"}
 
 
@@ -245,176 +643,349 @@ async def delete_user(nickname: str, session: SessionDep):
           summary="Создание информации для конкретного пользователя",
           description="Этот эндпоинт создает тезис и объяснение для конкретного пользователя",
           responses={
-              200: {
-                  "description": "Успешный ответ. Возвращает статус 'успех'",
-                  "model": Status,
-                  "content": {
-                      "application/json": {
-                          "example": {"status": "success"}
-                      }
-                  }
-              },
-              400: {
-                  "description": "Ошибка валидации",
-                  "content": {
-                      "application/json": {
-                          "example": {
-                              "detail": [
-                                  {
-                                      "loc": [
-                                          "body",
-                                          "field"
-                                      ],
-                                      "msg": "string"
-                                  }
-                              ]
-                          }
-                      }
-                  }
-              },
-              404: {
-                  "detail": "User not found"
-              }
+              200: SUCCESS,
+              400: validation_error("body", "field"),
+              404: error_response("User not found")
           })
-async def create_information(nickname: str, data: InformationPostSchema, session: SessionDep):
-    user = await session.execute(select(UserModel).where(UserModel.nickname == nickname))
-    user = user.scalar_one_or_none()
+async def create_information(nickname: str, data: InformationPostSchema, writer: WriterDep):
+    async def insert_information(session: AsyncSession):
+        session.add(build_information(nickname, data))
+        await session.execute(bump_version(nickname))
 
-    if not user:
+    try:
+        # Существование пользователя проверяет внешний ключ при вставке
+        await writer.submit(insert_information)
+    except IntegrityError:
         raise HTTPException(status_code=404, detail="User not found")
+    return {"status": "success"}
+
 
+def get_repeat_dates() -> List[date]:
     today = date.today()
-    new_information = InformationalModel(
+    return [today + interval for interval in REPEAT_INTERVALS]
+
+
+def build_information(nickname: str, data: InformationPostSchema) -> InformationalModel:
+    repeat_dates = get_repeat_dates()
+    return InformationalModel(
         information=data.information,
         explanation=data.explanation,
-        repeat_date_1=today + timedelta(hours=1),
-        repeat_date_2=today + timedelta(days=1),
-        repeat_date_3=today + timedelta(days=4),
-        repeat_date_4=today + timedelta(days=15),
-        repeat_date_5=today + timedelta(days=30),
-        user_nickname=nickname
+        repeat_date_1=repeat_dates[0],
+        repeat_date_2=repeat_dates[1],
+        repeat_date_3=repeat_dates[2],
+        repeat_date_4=repeat_dates[3],
+        repeat_date_5=repeat_dates[4],
+        user_nickname=nickname,
+        review_schedule=[
+            ReviewScheduleModel(user_nickname=nickname, repetition=repetition, due_date=due_date)
+            for repetition, due_date in enumerate(repeat_dates, start=1)
+        ]
     )
-    session.add(new_information)
-    await session.commit()
-    return {"status": "success"}
+
+
+@app.post("/users/{nickname}/information:bulk", response_model=BulkResultSchema, tags=["Users information"],
+          summary="Массовое создание информации для конкретного пользователя",
+          description="Этот эндпоинт создает информацию из JSON-массива или потока NDJSON "
+                      "(Content-Type: application/x-ndjson). Каждая строка проверяется отдельно, "
+                      f"строки добавляются транзакциями по {BULK_CHUNK_SIZE}",
+          openapi_extra=bulk_openapi(InformationPostSchema),
+          responses={
+              404: error_response("User not found")
+          })
+async def create_information_bulk(nickname: str, request: Request, session: SessionDep, writer: WriterDep):
+    user_exists = await get_cached_user(session, nickname)
+    await session.rollback()
+    if not user_exists:
+        raise HTTPException(status_code=404, detail="User not found")
+
+    inserted, errors = 0, []
+    async for rows, row_errors in validate_chunks(request, InformationPostSchema, BULK_CHUNK_SIZE):
+        errors += row_errors
+        if not rows:
+            continue
+        try:
+            inserted += await writer.submit(insert_information(nickname, rows))
+        except IntegrityError:
+            # Пользователь удален во время импорта
+            errors += [row_error(row, "User not found") for row, _ in rows]
+    errors.sort(key=lambda error: error["row"])
+    return {"inserted": inserted, "failed": len(errors), "errors": errors}
+
+
+def insert_information(nickname: str, rows: List[Tuple[int, InformationPostSchema]]):
+    async def operation(session: AsyncSession):
+        repeat_dates = get_repeat_dates()
+        await session.execute(insert(InformationalModel.__table__), [
+            {
+                "information": data.information,
+                "explanation": data.explanation,
+                "repeat_date_1": repeat_dates[0],
+                "repeat_date_2": repeat_dates[1],
+                "repeat_date_3": repeat_dates[2],
+                "repeat_date_4": repeat_dates[3],
+                "repeat_date_5": repeat_dates[4],
+                "user_nickname": nickname
+            }
+            for _, data in rows
+        ])
+        # Транзакция держит блокировку записи, поэтому только что вставленные строки - это последние len(rows) id:
+        # rowid без AUTOINCREMENT выдается подряд как max(id) + 1. Так не нужен медленный RETURNING на пачку
+        last_id = await session.scalar(select(func.max(InformationalModel.id)))
+        await session.execute(insert_review_schedule(InformationalModel.id > last_id - len(rows)))
+        await session.execute(bump_version(nickname))
+        return len(rows)
+
+    return operation
 
 
 @app.get("/users/{nickname}/information", response_model=List[InformationGetSchema], tags=["Users information"],
          summary="Получение списка информации у пользователя",
-         description="Этот эндпоинт возвращает список всей информации у конкретного пользователя",
+         description="Этот эндпоинт возвращает список информации у конкретного пользователя. "
+                     "Список можно отфильтровать по датам повторения (due_from, due_to), отсортировать (sort), "
+                     "ограничить (limit, offset) и оставить в ответе только нужные поля (fields). "
+                     "Ответ содержит заголовок ETag, с If-None-Match и неизменившейся информацией возвращается 304",
          responses={
-             200: {
-                 "description": "Успешный ответ. Возвращает статус 'успех'",
-                 "model": Status,
-                 "content": {
-                     "application/json": {
-                         "example": {"status": "success"}
-                     }
-                 }
-             },
-             400: {
-                 "description": "Ошибка валидации",
-                 "content": {
-                     "application/json": {
-                         "example": {
-                             "detail": [
-                                 {
-                                     "loc": [
-                                         "body",
-                                         "field"
-                                     ],
-                                     "msg": "string"
-                                 }
-                             ]
-                         }
-                     }
-                 }
+             200: SUCCESS,
+             400: validation_error("body", "field"),
+             304: {
+                 "description": "Информация не изменилась с версии из If-None-Match"
              },
-             404: {
-                 "detail": "User not found"
-             }
+             404: error_response("User not found")
          })
-async def get_user_information(nickname: str, session: SessionDep):
-    user = await session.execute(select(UserModel).where(UserModel.nickname == nickname))
-    user = user.scalar_one_or_none()
+async def get_user_information(nickname: str, session: ReadSessionDep,
+                               if_none_match: Annotated[Optional[str], Header()] = None,
+                               due_from: Annotated[Optional[date], Query(
+                                   description="Только информация с повторением не раньше этой даты (YYYY-MM-DD)")] = None,
+                               due_to: Annotated[Optional[date], Query(
+                                   description="Только информация с повторением не позже этой даты (YYYY-MM-DD)")] = None,
+                               sort: Annotated[Literal["id", "-id", "information", "-information"], Query(
+                                   description="Поле сортировки, с минусом - по убыванию")] = "id",
+                               limit: Annotated[Optional[int], Query(
+                                   ge=1, le=INFORMATION_PAGE_SIZE_MAX,
+                                   description="Количество элементов (по умолчанию все)")] = None,
+                               offset: Annotated[int, Query(ge=0, description="Количество пропускаемых элементов")] = 0,
+                               fields: Annotated[Optional[str], Query(
+                                   description="Поля ответа через запятую (по умолчанию все)",
+                                   examples=["id,information"])] = None):
+    version_query = select(UserModel.version).where(UserModel.nickname == nickname)
+    if if_none_match is not None:
+        # Дешевая проверка версии до выборки списка; у несуществующего пользователя версии нет
+        version = await session.scalar(version_query)
+        if version is not None and etag_matches(if_none_match, version_etag(version)):
+            return Response(status_code=304, headers={"ETag": version_etag(version)})
+
+    selected = INFORMATION_GET_FIELDS
+    if fields is not None:
+        selected = [name.strip() for name in fields.split(",") if name.strip()]
+        if not selected:
+            raise HTTPException(status_code=400, detail=[{"loc": ["query", "fields"],
+                                                          "msg": "fields must name at least one field"}])
+        unknown = [name for name in selected if name not in INFORMATION_GET_COLUMNS]
+        if unknown:
+            raise HTTPException(status_code=400, detail=[{"loc": ["query", "fields"],
+                                                          "msg": f"Unknown fields: {', '.join(unknown)}"}])
+
+    # Фильтры стоят в условии LEFT JOIN от пользователя: нет строк - нет пользователя, строка с NULL - нет информации
+    condition = InformationalModel.user_nickname == UserModel.nickname
+    if due_from is not None or due_to is not None:
+        due_information_ids = select(ReviewScheduleModel.information_id).where(
+            ReviewScheduleModel.user_nickname == nickname)
+        if due_from is not None:
+            due_information_ids = due_information_ids.where(ReviewScheduleModel.due_date >= due_from)
+        if due_to is not None:
+            due_information_ids = due_information_ids.where(ReviewScheduleModel.due_date <= due_to)
+        condition &= InformationalModel.id.in_(due_information_ids)
+
+    sort_column = INFORMATION_SORT_COLUMNS[sort.lstrip("-")]
+    query = (
+        select(InformationalModel.id.label("present"), UserModel.version.label("version"),
+               *[INFORMATION_GET_COLUMNS[name] for name in selected])
+        .select_from(UserModel)
+        .outerjoin(InformationalModel, condition)
+        .where(UserModel.nickname == nickname)
+        .order_by(sort_column.desc() if sort.startswith("-") else sort_column, InformationalModel.id)
+        .limit(limit)
+        .offset(offset)
+    )
+    result = await session.execute(query)
+    rows = result.all()
+
+    if rows:
+        # Версия читается тем же запросом, что и список, поэтому ETag соответствует отданным данным
+        version = rows[0].version
+    else:
+        # Смещение могло пропустить и строку с NULL, тогда пользователь проверяется отдельно
+        version = await session.scalar(version_query) if offset else None
+        if version is None:
+            raise HTTPException(status_code=404, detail="User not found")
+
+    # Строки берутся кортежами из колонок схемы и отдаются без ORM-объектов и повторной валидации response_model
+    content = [dict(zip(selected, row[2:])) for row in rows if row.present is not None]
+    return ORJSONResponse(content, headers={"ETag": version_etag(version)})
+
+
+@app.get("/users/{nickname}/information/search", response_model=List[InformationSearchSchema],
+         tags=["Users information"],
+         summary="Поиск по информации пользователя",
+         description="Этот эндпоинт ищет слова из q в тезисах и объяснениях пользователя по полнотекстовому индексу. "
+                     "Все слова обязательны, последнее ищется по началу слова. Результаты отсортированы "
+                     "по релевантности и содержат фрагмент текста с найденными словами",
+         responses={
+             400: validation_error("query", "q"),
+             404: error_response("User not found")
+         })
+async def search_user_information(nickname: str, session: ReadSessionDep,
+                                  q: Annotated[str, Query(min_length=1, max_length=200,
+                                                          description="Слова для поиска")],
+                                  limit: Annotated[int, Query(ge=1, le=SEARCH_LIMIT_MAX,
+                                                              description="Количество результатов")] = SEARCH_LIMIT):
+    match = match_query(q)
+    if match is None:
+        raise HTTPException(status_code=400, detail=[{"loc": ["query", "q"], "msg": "Query has no words"}])
+
+    query = (
+        select(*INFORMATION_GET_COLUMNS.values(), RANK.label("rank"), SNIPPET.label("snippet"))
+        .select_from(information_fts)
+        .join(InformationalModel, InformationalModel.id == information_fts.c.rowid)
+        .where(information_fts.c.information_fts.op("MATCH")(match))
+        .where(InformationalModel.user_nickname == nickname)
+        .order_by(RANK)
+        .limit(limit)
+    )
+    result = await session.execute(query)
+    rows = result.mappings().all()
 
-    if not user:
+    if not rows and not await get_cached_user(session, nickname):
         raise HTTPException(status_code=404, detail="User not found")
 
-    query = select(InformationalModel).where(InformationalModel.user_nickname == nickname)
-    result = await session.execute(query)
+    return ORJSONResponse([dict(row) for row in rows])
+
+
+@app.get("/users/{nickname}/due", response_model=List[InformationGetSchema], tags=["Users information"],
+         summary="Получение информации для повторения",
+         description="Этот эндпоинт возвращает информацию пользователя, которую нужно повторить в указанную дату "
+                     "(по умолчанию сегодня)",
+         responses={
+             200: {
+                 "description": "Успешный ответ. Возвращает список информации для повторения"
+             },
+             400: validation_error("query", "on"),
+             404: error_response("User not found")
+         })
+async def get_due_information(nickname: str, session: ReadSessionDep,
+                              on: Annotated[Optional[date], Query(
+                                  description="Дата повторения в формате YYYY-MM-DD")] = None):
+    due_information_ids = (
+        select(ReviewScheduleModel.information_id)
+        .where(ReviewScheduleModel.user_nickname == nickname)
+        .where(ReviewScheduleModel.due_date == (on or date.today()))
+    )
+    result = await session.execute(
+        select(InformationalModel)
+        .select_from(UserModel)
+        .outerjoin(InformationalModel, (InformationalModel.user_nickname == UserModel.nickname)
+                   & InformationalModel.id.in_(due_information_ids))
+        .where(UserModel.nickname == nickname)
+        .order_by(InformationalModel.id)
+    )
     information_items = result.scalars().all()
 
-    information_get_schemas = [
-        InformationGetSchema(
-            id=item.id,
-            information=item.information,
-            explanation=item.explanation,
-            repeat_date_1=item.repeat_date_1,
-            repeat_date_2=item.repeat_date_2,
-            repeat_date_3=item.repeat_date_3,
-            repeat_date_4=item.repeat_date_4,
-            repeat_date_5=item.repeat_date_5,
-            user_nickname=item.user_nickname
+    if not information_items:
+        raise HTTPException(status_code=404, detail="User not found")
+
+    return [item for item in information_items if item is not None]
+
+
+@app.post("/users/{nickname}/information/{information_id}/review", response_model=ReviewStateSchema,
+          tags=["Users information"], summary="Оценка повторения информации",
+          description="Этот эндпоинт записывает результат повторения и по алгоритму SM-2 рассчитывает следующее "
+                      "повторение. После первой оценки оставшиеся даты начального расписания заменяются "
+                      "датой из SM-2, ее возвращает /due и получает рассылка повторений",
+          responses={
+              400: validation_error("body", "grade"),
+              404: error_response("Information not found")
+          })
+async def review_information(nickname: str, information_id: int, data: ReviewPostSchema, session: SessionDep,
+                             writer: WriterDep):
+    async def record_review(session: AsyncSession):
+        result = await session.execute(
+            select(InformationalModel.id, ReviewStateModel)
+            .outerjoin(ReviewStateModel, ReviewStateModel.information_id == InformationalModel.id)
+            .where(InformationalModel.user_nickname == nickname)
+            .where(InformationalModel.id == information_id)
+        )
+        row = result.first()
+        if row is None:
+            return None
+
+        state_model = row.ReviewStateModel
+        state = new_state() if state_model is None else ReviewState(
+            ease=state_model.ease, interval=state_model.interval, repetitions=state_model.repetitions,
+            lapses=state_model.lapses, reviews=state_model.reviews
+        )
+        state = review(state, data.grade, date.today())
+
+        # Будущие повторения прежнего расписания заменяются одним следующим, прошедшие остаются историей
+        await session.execute(
+            delete(ReviewScheduleModel)
+            .where(ReviewScheduleModel.information_id == information_id)
+            .where(ReviewScheduleModel.due_date > state.last_review)
         )
-        for item in information_items
-    ]
+        schedule = ReviewScheduleModel(information_id=information_id, user_nickname=nickname,
+                                       repetition=state.reviews + 1, due_date=state.due_date)
+        session.add(schedule)
+        await session.flush()
+
+        if state_model is None:
+            state_model = ReviewStateModel(information_id=information_id)
+            session.add(state_model)
+        for name, value in vars(state).items():
+            setattr(state_model, name, value)
+        state_model.schedule_id = schedule.id
+        # Новая дата повторения меняет список информации с фильтром due_from/due_to
+        await session.execute(bump_version(nickname))
+        return ReviewStateSchema(information_id=information_id, **vars(state))
+
+    try:
+        result = await writer.submit(record_review)
+    except IntegrityError:
+        # Информация удалена между чтением и записью
+        result = None
+
+    if result is None:
+        user_exists = await get_cached_user(session, nickname)
+        if not user_exists:
+            raise HTTPException(status_code=404, detail="User not found")
+        raise HTTPException(status_code=404, detail="Information not found")
 
-    return information_get_schemas
+    return result
 
 
 @app.delete("/users/{nickname}/information/{information_id}", tags=["Users information"],
             summary="Удаление информации у пользователя",
             description="Этот эндпоинт удаляет конкретную информацию у конкретного пользователя",
             responses={
-                200: {
-                    "description": "Успешный ответ. Возвращает статус 'успех'",
-                    "model": Status,
-                    "content": {
-                        "application/json": {
-                            "example": {"status": "success"}
-                        }
-                    }
-                },
-                400: {
-                    "description": "Ошибка валидации",
-                    "content": {
-                        "application/json": {
-                            "example": {
-                                "detail": [
-                                    {
-                                        "loc": [
-                                            "body",
-                                            "field"
-                                        ],
-                                        "msg": "string"
-                                    }
-                                ]
-                            }
-                        }
-                    }
-                },
-                404: {
-                    "detail": "User not found"
-                }
+                200: SUCCESS,
+                400: validation_error("body", "field"),
+                404: error_response("User not found")
             })
 async def delete_information(nickname: str, information_id: int, session: SessionDep):
-    user = await session.execute(select(UserModel).where(UserModel.nickname == nickname))
-    user = user.scalar_one_or_none()
-
-    if not user:
-        raise HTTPException(status_code=404, detail="User not found")
-
-    information = await session.execute(
-        select(InformationalModel)
+    deleted = await session.execute(
+        delete(InformationalModel)
         .where(InformationalModel.user_nickname == nickname)
         .where(InformationalModel.id == information_id)
+        .returning(InformationalModel.id)
     )
-    information = information.scalar_one_or_none()
+    deleted = deleted.scalar_one_or_none()
+    if deleted is not None:
+        await session.execute(bump_version(nickname))
+    await session.commit()
 
-    if not information:
+    if deleted is None:
+        # Второй запрос только на пути ошибки, чтобы отличить отсутствие пользователя от отсутствия информации
+        user_exists = await get_cached_user(session, nickname)
+        if not user_exists:
+            raise HTTPException(status_code=404, detail="User not found")
         raise HTTPException(status_code=404, detail="Information not found")
 
-    await session.delete(information)
-    await session.commit()
     return {"status": "success"}
@@ -0,0 +1,192 @@
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+from typing import Dict, List, Optional, Sequence, Tuple
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 21, 50, 100)
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+Labels = Tuple[str, ...]
+
+
+class Counter:
+    def __init__(self, name: str, documentation: str, label_names: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(label_names)
+        self.values: Dict[Labels, float] = {}
+
+    def inc(self, labels: Labels = (), value: float = 1):
+        self.values[labels] = self.values.get(labels, 0) + value
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        for labels, value in sorted(self.values.items()):
+            lines.append(f"{self.name}{format_labels(self.label_names, labels)} {value}")
+        return lines
+
+
+class Histogram:
+    """
+    Гистограмма в формате Prometheus. observe - один bisect и три сложения без блокировок: все обработчики
+    выполняются в потоке event loop. Накопительные значения бакетов считаются только при выдаче /metrics
+    """
+
+    def __init__(self, name: str, documentation: str, label_names: Sequence[str] = (),
+                 buckets: Sequence[float] = LATENCY_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(label_names)
+        self.buckets = tuple(buckets)
+        # labels -> [счетчики по бакетам (последний - +Inf), сумма, количество]
+        self.values: Dict[Labels, list] = {}
+
+    def observe(self, value: float, labels: Labels = ()):
+        series = self.values.get(labels)
+        if series is None:
+            series = self.values[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+        series[0][bisect_left(self.buckets, value)] += 1
+        series[1] += value
+        series[2] += 1
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        names = self.label_names + ("le",)
+        for labels, (counts, total, count) in sorted(self.values.items()):
+            cumulative = 0
+            for bound, bucket_count in zip((*map(format_value, self.buckets), "+Inf"), counts):
+                cumulative += bucket_count
+                lines.append(f"{self.name}_bucket{format_labels(names, labels + (bound,))} {cumulative}")
+            lines.append(f"{self.name}_sum{format_labels(self.label_names, labels)} {total}")
+            lines.append(f"{self.name}_count{format_labels(self.label_names, labels)} {count}")
+        return lines
+
+
+def format_value(value: float) -> str:
+    return repr(float(value))
+
+
+def format_labels(names: Sequence[str], values: Labels) -> str:
+    if not names:
+        return ""
+    escaped = (value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for value in values)
+    return "{" + ",".join(f'{name}="{value}"' for name, value in zip(names, escaped)) + "}"
+
+
+ROUTE_LABELS = ("method", "route")
+
+REQUESTS = Counter("http_requests_total", "Количество запросов", ROUTE_LABELS + ("status",))
+REQUEST_SECONDS = Histogram("http_request_duration_seconds", "Время обработки запроса", ROUTE_LABELS)
+REQUEST_DB_SECONDS = Histogram("http_request_db_seconds", "Время SQL-запросов внутри запроса", ROUTE_LABELS)
+REQUEST_APP_SECONDS = Histogram("http_request_app_seconds",
+                                "Время запроса без SQL: валидация, сериализация, ожидание пула", ROUTE_LABELS)
+REQUEST_QUERIES = Histogram("http_request_db_queries", "Количество SQL-запросов на запрос", ROUTE_LABELS,
+                            buckets=QUERY_COUNT_BUCKETS)
+DB_QUERY_SECONDS = Histogram("db_query_duration_seconds", "Время одного SQL-запроса, включая фоновые задачи")
+POOL_CHECKOUT_SECONDS = Histogram("db_pool_checkout_seconds",
+                                  "Время получения соединения из пула, включая ожидание и открытие нового",
+                                  ("pool",))
+
+REGISTRY = [REQUESTS, REQUEST_SECONDS, REQUEST_DB_SECONDS, REQUEST_APP_SECONDS, REQUEST_QUERIES,
+            DB_QUERY_SECONDS, POOL_CHECKOUT_SECONDS]
+
+
+class RequestStats:
+    __slots__ = ("queries", "db_seconds")
+
+    def __init__(self):
+        self.queries = 0
+        self.db_seconds = 0.0
+
+
+# Задается middleware на время запроса. SQLAlchemy выполняет события в greenlet того же контекста
+current_request: ContextVar[Optional[RequestStats]] = ContextVar("current_request", default=None)
+
+
+def render() -> str:
+    return "\n".join(line for metric in REGISTRY for line in metric.render()) + "\n"
+
+
+def reset():
+    for metric in REGISTRY:
+        metric.values.clear()
+
+
+class MetricsMiddleware:
+    """
+    ASGI middleware: время запроса до последнего байта ответа (в том числе потокового), код ответа,
+    количество и время SQL-запросов по шаблону маршрута, например /users/{nickname}
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestStats()
+        token = current_request.set(stats)
+        status = "500"
+        started = time.perf_counter()
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = str(message["status"])
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            elapsed = time.perf_counter() - started
+            current_request.reset(token)
+            route = scope.get("route")
+            labels = (scope["method"], route.path if route is not None else "unmatched")
+            REQUESTS.inc(labels + (status,))
+            REQUEST_SECONDS.observe(elapsed, labels)
+            REQUEST_DB_SECONDS.observe(stats.db_seconds, labels)
+            REQUEST_APP_SECONDS.observe(max(elapsed - stats.db_seconds, 0.0), labels)
+            REQUEST_QUERIES.observe(stats.queries, labels)
+
+
+class TimedQueuePool(AsyncAdaptedQueuePool):
+    """Пул, который измеряет время выдачи соединения: ожидание свободного соединения или открытие нового"""
+    # Метка pool в метрике. Задается классом, а не экземпляром: пул пересоздается при dispose движка
+    name = "write"
+
+    def connect(self):
+        started = time.perf_counter()
+        try:
+            return super().connect()
+        finally:
+            POOL_CHECKOUT_SECONDS.observe(time.perf_counter() - started, (self.name,))
+
+
+class TimedReadQueuePool(TimedQueuePool):
+    name = "read"
+
+
+def instrument_engine(engine: AsyncEngine):
+    @event.listens_for(engine.sync_engine, "before_cursor_execute")
+    def start_query(connection, cursor, statement, parameters, context, executemany):
+        connection.info.setdefault("query_started", []).append(time.perf_counter())
+
+    @event.listens_for(engine.sync_engine, "after_cursor_execute")
+    def finish_query(connection, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - connection.info["query_started"].pop()
+        DB_QUERY_SECONDS.observe(elapsed)
+        stats = current_request.get()
+        if stats is not None:
+            stats.queries += 1
+            stats.db_seconds += elapsed
+
+    @event.listens_for(engine.sync_engine, "handle_error")
+    def fail_query(context):
+        if context.connection is not None and context.connection.info.get("query_started"):
+            context.connection.info["query_started"].pop()
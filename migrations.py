@@ -0,0 +1,90 @@
+import asyncio
+from sqlalchemy import Connection, Insert, select, insert, exists, literal, union_all
+from sqlalchemy.ext.asyncio import AsyncConnection
+from database import create_engine, shard_urls
+from schemas import Base, InformationalModel, ReviewScheduleModel
+from search import create_search_index, rebuild_search_index
+
+REPEAT_DATE_COLUMNS = [
+    InformationalModel.repeat_date_1,
+    InformationalModel.repeat_date_2,
+    InformationalModel.repeat_date_3,
+    InformationalModel.repeat_date_4,
+    InformationalModel.repeat_date_5,
+]
+
+
+def insert_review_schedule(where) -> Insert:
+    """INSERT ... SELECT строк review_schedule из repeat_date_1..5 информации, подходящей под условие where"""
+    query = union_all(*[
+        select(InformationalModel.id, InformationalModel.user_nickname, literal(repetition), column)
+        .where(where)
+        for repetition, column in enumerate(REPEAT_DATE_COLUMNS, start=1)
+    ])
+    return insert(ReviewScheduleModel).from_select(
+        ["information_id", "user_nickname", "repetition", "due_date"], query
+    )
+
+
+async def migrate_review_schedule(connection: AsyncConnection) -> int:
+    """Переносит даты repeat_date_1..5 в review_schedule для информации, у которой еще нет расписания"""
+    not_migrated = ~exists().where(ReviewScheduleModel.information_id == InformationalModel.id)
+    result = await connection.execute(insert_review_schedule(not_migrated))
+    return result.rowcount
+
+
+def add_user_version(connection: Connection) -> bool:
+    """Добавляет колонку version в users, созданную до появления ETag из базы"""
+    columns = {row[1] for row in connection.exec_driver_sql("PRAGMA table_info(users)")}
+    if "version" in columns:
+        return False
+    connection.exec_driver_sql("ALTER TABLE users ADD COLUMN version INTEGER NOT NULL DEFAULT 0")
+    return True
+
+
+def enable_schedule_autoincrement(connection: Connection) -> bool:
+    """Пересоздает review_schedule, созданную без AUTOINCREMENT, с сохранением id строк"""
+    sql = connection.exec_driver_sql(
+        "SELECT sql FROM sqlite_master WHERE type = 'table' AND name = 'review_schedule'").scalar()
+    if sql is None or "AUTOINCREMENT" in sql.upper():
+        return False
+    table = ReviewScheduleModel.__table__
+    columns = ", ".join(column.name for column in table.columns)
+    connection.exec_driver_sql("ALTER TABLE review_schedule RENAME TO review_schedule_old")
+    # Индексы переходят к переименованной таблице, их имена нужны новой
+    for index in table.indexes:
+        connection.exec_driver_sql(f"DROP INDEX IF EXISTS {index.name}")
+    table.create(connection)
+    connection.exec_driver_sql(f"INSERT INTO review_schedule ({columns}) SELECT {columns} FROM review_schedule_old")
+    connection.exec_driver_sql("DROP TABLE review_schedule_old")
+    return True
+
+
+def create_missing_indexes(connection: Connection):
+    """create_all не добавляет новые индексы в уже существующие таблицы"""
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(connection, checkfirst=True)
+
+
+async def migrate(connection: AsyncConnection):
+    await connection.run_sync(Base.metadata.create_all)
+    await connection.run_sync(add_user_version)
+    await connection.run_sync(enable_schedule_autoincrement)
+    await connection.run_sync(create_missing_indexes)
+    await migrate_review_schedule(connection)
+    if await connection.run_sync(create_search_index):
+        # Индекс добавлен в базу, где уже есть информация
+        await connection.run_sync(rebuild_search_index)
+
+
+async def main():
+    for url in shard_urls():
+        engine = create_engine(url)
+        async with engine.begin() as connection:
+            await migrate(connection)
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
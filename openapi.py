@@ -0,0 +1,75 @@
+import gzip
+import hashlib
+import json
+from typing import Optional
+from fastapi import FastAPI, Response
+from fastapi.openapi.utils import get_openapi
+from compression import choose_encoding
+from schemas import Status
+from versions import etag_matches
+
+# Общие описания ответов для responses= эндпоинтов
+SUCCESS = {
+    "description": "Успешный ответ. Возвращает статус 'успех'",
+    "model": Status,
+    "content": {
+        "application/json": {
+            "example": {"status": "success"}
+        }
+    }
+}
+
+
+def validation_error(*loc: str) -> dict:
+    """Ответ 400 с примером ошибки валидации поля loc, например validation_error("query", "on")"""
+    return {
+        "description": "Ошибка валидации",
+        "content": {
+            "application/json": {
+                "example": {"detail": [{"loc": list(loc), "msg": "string"}]}
+            }
+        }
+    }
+
+
+def error_response(detail: str) -> dict:
+    """Ответ с ошибкой из HTTPException(detail=detail)"""
+    return {
+        "description": detail,
+        "content": {
+            "application/json": {
+                "example": {"detail": detail}
+            }
+        }
+    }
+
+
+def build_openapi(app: FastAPI) -> dict:
+    schema = get_openapi(title=app.title, version=app.version, description=app.description,
+                         tags=app.openapi_tags, routes=app.routes)
+    # Ошибки валидации возвращаются с кодом 400, поэтому 422 из схемы убираются
+    for path in schema["paths"].values():
+        for method in path.values():
+            method["responses"].pop("422", None)
+    return schema
+
+
+class OpenAPIDocument:
+    """
+    Схема OpenAPI, один раз сериализованная в JSON и сжатая gzip. Ответ отдается готовыми байтами
+    с ETag, повторные запросы с If-None-Match получают 304
+    """
+
+    def __init__(self, schema: dict):
+        self.body = json.dumps(schema, ensure_ascii=False, separators=(",", ":")).encode()
+        self.gzipped = gzip.compress(self.body, compresslevel=9, mtime=0)
+        self.etag = f'W/"{hashlib.sha256(self.body).hexdigest()[:16]}"'
+
+    def response(self, accept_encoding: Optional[str], if_none_match: Optional[str]) -> Response:
+        headers = {"ETag": self.etag, "Vary": "Accept-Encoding"}
+        if etag_matches(if_none_match, self.etag):
+            return Response(status_code=304, headers=headers)
+        if choose_encoding(accept_encoding, ["gzip"]) == "gzip":
+            return Response(self.gzipped, media_type="application/json",
+                            headers={**headers, "Content-Encoding": "gzip"})
+        return Response(self.body, media_type="application/json", headers=headers)
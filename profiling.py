@@ -0,0 +1,127 @@
+import asyncio
+import cProfile
+import io
+import json
+import os
+import pstats
+import time
+import uuid
+from contextvars import ContextVar
+from typing import List, Optional
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+from headers import header_value
+
+PROFILE_HEADER = b"x-profile"
+PROFILE_STATEMENT_LIMIT = 2000
+PROFILE_TOP_FUNCTIONS = 40
+
+
+class RequestProfile:
+    __slots__ = ("statements",)
+
+    def __init__(self):
+        self.statements: List[dict] = []
+
+
+# Задается middleware только на время профилируемого запроса
+current_profile: ContextVar[Optional[RequestProfile]] = ContextVar("current_profile", default=None)
+
+
+class ProfilingMiddleware:
+    """
+    ASGI middleware: запрос с заголовком X-Profile (равным token, если он задан) выполняется под cProfile,
+    а профиль и список SQL-запросов с временем записываются в directory. Имя файлов возвращается
+    в заголовке ответа X-Profile-Id. Профилируемые запросы идут по одному: cProfile работает на весь поток,
+    поэтому в профиль попадают и задачи event loop, которые выполнялись одновременно с запросом
+    """
+
+    def __init__(self, app, directory: str, token: Optional[str] = None):
+        self.app = app
+        self.directory = directory
+        self.token = token
+        self.lock = asyncio.Lock()
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        value = header_value(scope, PROFILE_HEADER)
+        if value is None or (self.token is not None and value != self.token):
+            await self.app(scope, receive, send)
+            return
+
+        profile_id = f"{time.strftime('%Y%m%d-%H%M%S')}-{uuid.uuid4().hex[:8]}"
+        status = 500
+
+        async def send_with_id(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                message["headers"] = [*message.get("headers", []), (b"x-profile-id", profile_id.encode())]
+            await send(message)
+
+        async with self.lock:
+            request_profile = RequestProfile()
+            token = current_profile.set(request_profile)
+            profiler = cProfile.Profile()
+            started = time.perf_counter()
+            profiler.enable()
+            try:
+                await self.app(scope, receive, send_with_id)
+            finally:
+                profiler.disable()
+                elapsed = time.perf_counter() - started
+                current_profile.reset(token)
+                route = scope.get("route")
+                # Запись на диск и форматирование pstats идут в потоке, чтобы не останавливать event loop
+                # с другими запросами
+                await asyncio.to_thread(self.write, profile_id, profiler, {
+                    "method": scope["method"],
+                    "path": scope["path"],
+                    "query": scope["query_string"].decode("latin-1"),
+                    "route": route.path if route is not None else None,
+                    "status": status,
+                    "seconds": round(elapsed, 6),
+                    "db_seconds": round(sum(item["seconds"] for item in request_profile.statements), 6),
+                    "statements": request_profile.statements,
+                })
+
+    def write(self, profile_id: str, profiler: cProfile.Profile, report: dict):
+        """<id>.prof открывается pstats или snakeviz, <id>.json содержит SQL-запросы и самые дорогие функции"""
+        os.makedirs(self.directory, exist_ok=True)
+        path = os.path.join(self.directory, profile_id)
+        profiler.dump_stats(f"{path}.prof")
+        output = io.StringIO()
+        pstats.Stats(profiler, stream=output).sort_stats("cumulative").print_stats(PROFILE_TOP_FUNCTIONS)
+        report["functions"] = output.getvalue()
+        with open(f"{path}.json", "w", encoding="utf-8") as file:
+            json.dump(report, file, ensure_ascii=False, indent=2)
+
+
+def instrument_engine(engine: AsyncEngine):
+    """Записывает SQL-запросы профилируемого запроса. Для остальных запросов события сводятся к чтению ContextVar"""
+
+    @event.listens_for(engine.sync_engine, "before_cursor_execute")
+    def start_statement(connection, cursor, statement, parameters, context, executemany):
+        if current_profile.get() is not None:
+            connection.info.setdefault("profile_started", []).append(time.perf_counter())
+
+    @event.listens_for(engine.sync_engine, "after_cursor_execute")
+    def finish_statement(connection, cursor, statement, parameters, context, executemany):
+        request_profile = current_profile.get()
+        if request_profile is None or not connection.info.get("profile_started"):
+            return
+        elapsed = time.perf_counter() - connection.info["profile_started"].pop()
+        if len(request_profile.statements) < PROFILE_STATEMENT_LIMIT:
+            request_profile.statements.append({
+                "statement": statement,
+                # executemany передает список наборов параметров, в отчет попадает только их количество
+                "parameters": f"{len(parameters)} rows" if executemany else repr(parameters),
+                "seconds": round(elapsed, 6),
+            })
+
+    @event.listens_for(engine.sync_engine, "handle_error")
+    def fail_statement(context):
+        if context.connection is not None and context.connection.info.get("profile_started"):
+            context.connection.info["profile_started"].pop()
@@ -0,0 +1,156 @@
+import argparse
+import asyncio
+import json
+import os
+import time
+from dataclasses import dataclass, replace
+from datetime import date, timedelta
+from typing import Optional, TYPE_CHECKING
+from sqlalchemy import select, type_coerce, String
+from sqlalchemy.ext.asyncio import async_sessionmaker
+from database import create_engine, shard_urls
+from schemas import ReviewStateModel, ReviewScheduleModel, InformationalModel, UserModel
+
+if TYPE_CHECKING:
+    import numpy as np
+
+REVIEW_INTERVAL_MODIFIER = float(os.getenv("REVIEW_INTERVAL_MODIFIER", "1.0"))
+REVIEW_MAX_INTERVAL = int(os.getenv("REVIEW_MAX_INTERVAL", "36500"))
+RESCHEDULE_CHUNK_SIZE = 50000
+
+
+@dataclass(frozen=True)
+class SM2Parameters:
+    initial_ease: float = 2.5
+    min_ease: float = 1.3
+    first_interval: int = 1
+    second_interval: int = 6
+    # Применяются к интервалу SM-2 при расчете даты, поэтому их изменение пересчитывает reschedule
+    interval_modifier: float = REVIEW_INTERVAL_MODIFIER
+    max_interval: int = REVIEW_MAX_INTERVAL
+
+
+@dataclass(frozen=True)
+class ReviewState:
+    ease: float
+    interval: int = 0
+    repetitions: int = 0
+    lapses: int = 0
+    reviews: int = 0
+    last_review: Optional[date] = None
+    due_date: Optional[date] = None
+
+
+def new_state(parameters: SM2Parameters = SM2Parameters()) -> ReviewState:
+    return ReviewState(ease=parameters.initial_ease)
+
+
+def effective_interval(interval: int, parameters: SM2Parameters) -> int:
+    return min(max(round(interval * parameters.interval_modifier), 1), parameters.max_interval)
+
+
+def review(state: ReviewState, grade: int, today: date, parameters: SM2Parameters = SM2Parameters()) -> ReviewState:
+    """
+    Шаг SM-2 для оценки от 0 до 5. Оценка ниже 3 начинает повторения заново с первого интервала
+    и не меняет легкость, иначе интервал растет: first_interval, second_interval, затем интервал * легкость
+    """
+    if grade < 3:
+        repetitions, interval, lapses, ease = 0, parameters.first_interval, state.lapses + 1, state.ease
+    else:
+        if state.repetitions == 0:
+            interval = parameters.first_interval
+        elif state.repetitions == 1:
+            interval = parameters.second_interval
+        else:
+            interval = round(state.interval * state.ease)
+        repetitions, lapses = state.repetitions + 1, state.lapses
+        ease = max(parameters.min_ease, round(state.ease + 0.1 - (5 - grade) * (0.08 + (5 - grade) * 0.02), 4))
+
+    return replace(state, ease=ease, interval=interval, repetitions=repetitions, lapses=lapses,
+                   reviews=state.reviews + 1, last_review=today,
+                   due_date=today + timedelta(days=effective_interval(interval, parameters)))
+
+
+def due_dates(last_review: "np.ndarray", interval: "np.ndarray", parameters: SM2Parameters) -> "np.ndarray":
+    """Векторный расчет due_date = last_review + effective_interval(interval) для массивов datetime64[D]"""
+    # NumPy импортируется только для пересчета: API использует из модуля лишь review, а импорт NumPy
+    # заметно удлиняет запуск приложения
+    import numpy as np
+
+    days = np.clip(np.rint(interval * parameters.interval_modifier), 1, parameters.max_interval)
+    return last_review + days.astype("timedelta64[D]")
+
+
+async def reschedule(session_factory: async_sessionmaker, parameters: SM2Parameters = SM2Parameters(),
+                     today: Optional[date] = None, chunk_size: int = RESCHEDULE_CHUNK_SIZE) -> int:
+    """
+    Пересчитывает даты будущих повторений после изменения interval_modifier или max_interval.
+    Состояния читаются пачками по information_id, даты считаются массивами NumPy, а записываются
+    одним executemany на пачку и только для изменившихся дат. Уже наступившие повторения не трогаются,
+    а перенесенные не уходят раньше завтрашнего дня, поэтому рассылка не пропускает их за своим чекпоинтом.
+    Возвращает количество перенесенных повторений
+    """
+    import numpy as np
+
+    today = today or date.today()
+    table = ReviewStateModel.__table__
+    # SQLite хранит даты строками YYYY-MM-DD, NumPy разбирает их сам быстрее, чем тип Date SQLAlchemy
+    query = (
+        select(table.c.information_id, table.c.schedule_id, table.c.interval,
+               type_coerce(table.c.last_review, String), type_coerce(table.c.due_date, String))
+        .where(table.c.due_date > today)
+        .order_by(table.c.information_id)
+        .limit(chunk_size)
+    )
+    # Обновления идут напрямую в драйвер кортежами: на миллионах строк подготовка параметров SQLAlchemy
+    # занимает больше времени, чем сам UPDATE по первичному ключу
+    update_states = f"UPDATE {table.name} SET due_date = ? WHERE information_id = ?"
+    update_schedule = f"UPDATE {ReviewScheduleModel.__tablename__} SET due_date = ? WHERE id = ?"
+    # Новые даты меняют списки информации с фильтром по датам, поэтому версии их владельцев растут в той же
+    # транзакции. id передаются одним JSON-массивом: в пачке их больше, чем допускает число параметров SQLite
+    bump_versions = (
+        f"UPDATE {UserModel.__tablename__} SET version = version + 1 WHERE nickname IN "
+        f"(SELECT user_nickname FROM {InformationalModel.__tablename__} WHERE id IN (SELECT value FROM json_each(?)))"
+    )
+
+    moved, last_id = 0, 0
+    while True:
+        async with session_factory() as session:
+            rows = (await session.execute(query.where(table.c.information_id > last_id))).all()
+            if not rows:
+                break
+            columns = (np.array(column) for column in zip(*rows))
+            information_ids, schedule_ids, intervals, last_reviews, current = columns
+            due = np.maximum(
+                due_dates(last_reviews.astype("datetime64[D]"), intervals.astype(np.int64), parameters),
+                np.datetime64(today + timedelta(days=1), "D")
+            )
+            changed = due != current.astype("datetime64[D]")
+            due = due[changed].astype(str).tolist()
+            if due:
+                connection = await session.connection()
+                await connection.exec_driver_sql(update_states, list(zip(due, information_ids[changed].tolist())))
+                await connection.exec_driver_sql(update_schedule, list(zip(due, schedule_ids[changed].tolist())))
+                await connection.exec_driver_sql(bump_versions, (json.dumps(information_ids[changed].tolist()),))
+                await session.commit()
+            moved += len(due)
+            last_id = int(information_ids[-1])
+    return moved
+
+
+async def main(args):
+    parameters = SM2Parameters(interval_modifier=args.interval_modifier, max_interval=args.max_interval)
+    started = time.perf_counter()
+    moved = 0
+    for url in shard_urls():
+        engine = create_engine(url)
+        moved += await reschedule(async_sessionmaker(engine, expire_on_commit=False), parameters)
+        await engine.dispose()
+    print(f"Rescheduled {moved} reviews in {time.perf_counter() - started:.2f}s")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Пересчет дат повторений после изменения параметров")
+    parser.add_argument("--interval-modifier", type=float, default=REVIEW_INTERVAL_MODIFIER)
+    parser.add_argument("--max-interval", type=int, default=REVIEW_MAX_INTERVAL)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,190 @@
+import asyncio
+import json
+import logging
+import os
+import threading
+import time
+from abc import ABC, abstractmethod
+from contextlib import suppress
+from dataclasses import dataclass
+from datetime import date, datetime
+from typing import List, Optional, Tuple
+from sqlalchemy import select, tuple_
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.ext.asyncio import async_sessionmaker
+from schemas import InformationalModel, ReviewScheduleModel, DispatchCheckpointModel
+
+logger = logging.getLogger(__name__)
+
+Checkpoint = Tuple[date, int]
+
+
+class ReviewSink(ABC):
+    """Получатель повторений, которые пора отправить пользователям"""
+
+    @abstractmethod
+    async def send(self, items: List[dict]):
+        ...
+
+
+class FileSink(ReviewSink):
+    """
+    Дописывает повторения в файл в формате NDJSON. Один sink пишут рассылки всех шардов из разных потоков,
+    поэтому пачка целиком пишется одним write в режиме O_APPEND под блокировкой и строки пачек не перемешиваются
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+
+    async def send(self, items: List[dict]):
+        await asyncio.to_thread(self._write, items)
+
+    def _write(self, items: List[dict]):
+        data = "".join(json.dumps(item, ensure_ascii=False, default=str) + "\n" for item in items).encode()
+        with self._lock:
+            descriptor = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+            try:
+                view = memoryview(data)
+                while view:
+                    view = view[os.write(descriptor, view):]
+            finally:
+                os.close(descriptor)
+
+
+class QueueSink(ReviewSink):
+    """Складывает повторения в asyncio.Queue"""
+
+    def __init__(self, queue: Optional[asyncio.Queue] = None):
+        self.queue = queue or asyncio.Queue()
+
+    async def send(self, items: List[dict]):
+        for item in items:
+            await self.queue.put(item)
+
+
+@dataclass
+class DispatchStats:
+    dispatched: int = 0
+    batches: int = 0
+    throughput: float = 0.0
+    # Наибольшая задержка последнего прохода, 0 - если отправлять было нечего
+    lag_seconds: float = 0.0
+    checkpoint: Optional[Checkpoint] = None
+
+
+def due_lag(due_date: date) -> float:
+    """Сколько секунд прошло с наступления даты повторения"""
+    return max((datetime.now() - datetime.combine(due_date, datetime.min.time())).total_seconds(), 0.0)
+
+
+class ReviewDispatcher:
+    """
+    Обходит review_schedule всех пользователей в порядке (due_date, id) пачками по batch_size
+    и передает повторения в sink. После каждой пачки позиция сохраняется в dispatch_checkpoint,
+    поэтому после перезапуска обход продолжается с того же места (доставка at-least-once).
+    Чтение пачки и запись позиции идут в отдельных коротких транзакциях, чтобы не держать блокировку SQLite.
+    """
+
+    def __init__(self, session_factory: async_sessionmaker, sink: ReviewSink, batch_size: int = 500,
+                 interval: float = 60.0, name: str = "review_dispatch"):
+        self.session_factory = session_factory
+        self.sink = sink
+        self.batch_size = batch_size
+        self.interval = interval
+        self.name = name
+        self.stats = DispatchStats()
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    async def load_checkpoint(self) -> Checkpoint:
+        async with self.session_factory() as session:
+            checkpoint = await session.get(DispatchCheckpointModel, self.name)
+        if checkpoint is None:
+            # При первом запуске отправляются только повторения начиная с сегодняшнего дня
+            return date.today(), 0
+        return checkpoint.due_date, checkpoint.schedule_id
+
+    async def save_checkpoint(self, checkpoint: Checkpoint):
+        due_date, schedule_id = checkpoint
+        statement = sqlite_insert(DispatchCheckpointModel).values(
+            name=self.name, due_date=due_date, schedule_id=schedule_id
+        )
+        statement = statement.on_conflict_do_update(
+            index_elements=[DispatchCheckpointModel.name],
+            set_={"due_date": due_date, "schedule_id": schedule_id}
+        )
+        async with self.session_factory() as session:
+            await session.execute(statement)
+            await session.commit()
+
+    async def fetch_batch(self, checkpoint: Checkpoint, until: date) -> List[dict]:
+        query = (
+            select(ReviewScheduleModel.id, ReviewScheduleModel.information_id, ReviewScheduleModel.user_nickname,
+                   ReviewScheduleModel.repetition, ReviewScheduleModel.due_date, InformationalModel.information)
+            .join(InformationalModel, InformationalModel.id == ReviewScheduleModel.information_id)
+            .where(tuple_(ReviewScheduleModel.due_date, ReviewScheduleModel.id) > tuple_(*checkpoint))
+            .where(ReviewScheduleModel.due_date <= until)
+            .order_by(ReviewScheduleModel.due_date, ReviewScheduleModel.id)
+            .limit(self.batch_size)
+        )
+        async with self.session_factory() as session:
+            result = await session.execute(query)
+            return [dict(row) for row in result.mappings()]
+
+    async def run_once(self) -> int:
+        """Отправляет все повторения до сегодняшнего дня включительно и возвращает их количество"""
+        today = date.today()
+        checkpoint = await self.load_checkpoint()
+        started = time.perf_counter()
+        dispatched = 0
+        lag = 0.0
+
+        while True:
+            items = await self.fetch_batch(checkpoint, today)
+            if not items:
+                break
+            await self.sink.send(items)
+            # Задержка фиксируется в момент отправки по самому старому повторению пачки
+            lag = max(lag, due_lag(items[0]["due_date"]))
+            checkpoint = (items[-1]["due_date"], items[-1]["id"])
+            await self.save_checkpoint(checkpoint)
+
+            dispatched += len(items)
+            self.stats.dispatched += len(items)
+            self.stats.batches += 1
+            self.stats.lag_seconds = lag
+            if len(items) < self.batch_size:
+                break
+            await asyncio.sleep(0)
+
+        elapsed = time.perf_counter() - started
+        self.stats.checkpoint = checkpoint
+        self.stats.lag_seconds = lag
+        if dispatched:
+            self.stats.throughput = dispatched / elapsed
+            logger.info("Review dispatch: %d items in %.3fs (%.1f items/s), lag %.0fs",
+                        dispatched, elapsed, self.stats.throughput, self.stats.lag_seconds)
+        return dispatched
+
+    async def run_forever(self):
+        while True:
+            try:
+                await self.run_once()
+            except Exception:
+                logger.exception("Review dispatch failed")
+            await asyncio.sleep(self.interval)
+
+    def start(self):
+        if not self.running:
+            self._task = asyncio.create_task(self.run_forever())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            with suppress(asyncio.CancelledError):
+                await self._task
+            self._task = None
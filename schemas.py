@@ -1,8 +1,9 @@
 from pydantic import BaseModel, Field
 from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column, relationship
-from sqlalchemy import String, Integer, Date, ForeignKey
-from typing import List
+from sqlalchemy import String, Integer, Float, Date, ForeignKey, Index
+from typing import List, Optional, Union
 from datetime import date
+from versions import new_version
 
 
 class Base(DeclarativeBase):
@@ -17,7 +18,10 @@ class UserModel(Base):
     last_name: Mapped[str] = mapped_column(String)
     age: Mapped[int] = mapped_column(Integer)
     job: Mapped[str] = mapped_column(String)
-    information_items: Mapped[List["InformationalModel"]] = relationship(back_populates="user")
+    # Версия для ETag. Увеличивается в той же транзакции, что и любое изменение пользователя или его информации,
+    # поэтому ее видят все процессы
+    version: Mapped[int] = mapped_column(Integer, default=new_version, server_default="0")
+    information_items: Mapped[List["InformationalModel"]] = relationship(back_populates="user", passive_deletes=True)
 
 
 class UserPostSchema(BaseModel):
@@ -50,6 +54,10 @@ class UserPutSchema(BaseModel):
 
 class InformationalModel(Base):
     __tablename__ = "information"
+    __table_args__ = (
+        # Поиск информации пользователя и ON DELETE CASCADE при удалении пользователя
+        Index("ix_information_user_id", "user_nickname", "id"),
+    )
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True)
     information: Mapped[str] = mapped_column(String)
@@ -61,6 +69,51 @@ class InformationalModel(Base):
     repeat_date_5: Mapped[date] = mapped_column(Date)
     user_nickname: Mapped[str] = mapped_column(ForeignKey("users.nickname", ondelete="CASCADE"))
     user: Mapped["UserModel"] = relationship(back_populates="information_items")
+    review_schedule: Mapped[List["ReviewScheduleModel"]] = relationship(back_populates="information",
+                                                                        passive_deletes=True)
+
+
+class ReviewScheduleModel(Base):
+    __tablename__ = "review_schedule"
+    __table_args__ = (
+        Index("ix_review_schedule_user_due", "user_nickname", "due_date"),
+        Index("ix_review_schedule_due", "due_date"),
+        Index("ix_review_schedule_information", "information_id"),
+        # Без AUTOINCREMENT SQLite снова выдает id удаленных последних строк, и новая строка оказывается
+        # позади позиции рассылки (due_date, id). С ним id только растут
+        {"sqlite_autoincrement": True},
+    )
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    information_id: Mapped[int] = mapped_column(ForeignKey("information.id", ondelete="CASCADE"))
+    user_nickname: Mapped[str] = mapped_column(ForeignKey("users.nickname", ondelete="CASCADE"))
+    repetition: Mapped[int] = mapped_column(Integer)
+    due_date: Mapped[date] = mapped_column(Date)
+    information: Mapped["InformationalModel"] = relationship(back_populates="review_schedule")
+
+
+class ReviewStateModel(Base):
+    """Состояние SM-2 информации после первой оценки. До нее действует начальное расписание из repeat_date_1..5"""
+    __tablename__ = "review_state"
+
+    information_id: Mapped[int] = mapped_column(ForeignKey("information.id", ondelete="CASCADE"), primary_key=True)
+    ease: Mapped[float] = mapped_column(Float)
+    interval: Mapped[int] = mapped_column(Integer)
+    repetitions: Mapped[int] = mapped_column(Integer)
+    lapses: Mapped[int] = mapped_column(Integer)
+    reviews: Mapped[int] = mapped_column(Integer)
+    last_review: Mapped[date] = mapped_column(Date)
+    due_date: Mapped[date] = mapped_column(Date)
+    # Строка review_schedule со следующим повторением
+    schedule_id: Mapped[int] = mapped_column(Integer)
+
+
+class DispatchCheckpointModel(Base):
+    __tablename__ = "dispatch_checkpoint"
+
+    name: Mapped[str] = mapped_column(String, primary_key=True)
+    due_date: Mapped[date] = mapped_column(Date)
+    schedule_id: Mapped[int] = mapped_column(Integer)
 
 
 class InformationPostSchema(BaseModel):
@@ -83,5 +136,75 @@ class InformationGetSchema(BaseModel):
     user_nickname: str
 
 
+class InformationSearchSchema(InformationGetSchema):
+    rank: float = Field(..., description="Релевантность BM25, чем меньше, тем выше в выдаче")
+    snippet: str = Field(..., description="Фрагмент текста с найденными словами, выделенными <b></b>")
+
+
+class UsersBatchGetSchema(BaseModel):
+    nicknames: List[str] = Field(..., title="Никнеймы", description="Никнеймы пользователей (от 1 до 1000)",
+                                 min_length=1, max_length=1000, examples=[["Nickname", "Other"]])
+    include_information: bool = Field(False, title="С информацией",
+                                      description="Вернуть вместе с пользователями их информацию")
+
+
+class UserWithInformationSchema(UserGetSchema):
+    information: Optional[List[InformationGetSchema]] = Field(
+        None, description="Информация пользователя, только с include_information=true")
+
+
+class UsersBatchGetResultSchema(BaseModel):
+    users: List[UserWithInformationSchema] = Field(..., description="Найденные пользователи в порядке запроса")
+    missing: List[str] = Field(..., description="Никнеймы, которых нет в базе")
+
+
+class ReviewPostSchema(BaseModel):
+    grade: int = Field(..., title="Оценка", description="Качество ответа от 0 (не вспомнил) до 5 (вспомнил сразу), "
+                                                        "оценка ниже 3 начинает повторения заново",
+                       ge=0, le=5, examples=[4])
+
+
+class ReviewStateSchema(BaseModel):
+    information_id: int
+    ease: float = Field(..., description="Легкость SM-2, множитель интервала")
+    interval: int = Field(..., description="Текущий интервал в днях")
+    repetitions: int = Field(..., description="Успешные повторения подряд")
+    lapses: int = Field(..., description="Сколько раз информация была забыта")
+    reviews: int
+    last_review: date
+    due_date: date = Field(..., description="Дата следующего повторения")
+
+
 class Status(BaseModel):
     status: str = Field(..., examples=["success"], title="Status")
+
+
+class DispatchStatsSchema(BaseModel):
+    running: bool
+    dispatched: int = Field(..., description="Количество отправленных повторений с момента запуска")
+    batches: int
+    throughput: float = Field(..., description="Скорость последнего прохода, повторений в секунду")
+    lag_seconds: float = Field(..., description="Сколько самое старое повторение последнего прохода ждало отправки "
+                                                "от начала своей даты, 0 - если отправлять было нечего")
+    checkpoint_date: Optional[date]
+    checkpoint_id: Optional[int]
+
+
+class BulkRowErrorSchema(BaseModel):
+    row: int = Field(..., description="Номер строки во входных данных, начиная с 0")
+    detail: Union[str, List[dict]]
+
+
+class BulkResultSchema(BaseModel):
+    inserted: int
+    failed: int
+    errors: List[BulkRowErrorSchema] = Field(..., description="Ошибки по строкам. Строки, которых здесь нет, "
+                                                              "успешно добавлены")
+
+
+class CacheStatsSchema(BaseModel):
+    size: int
+    maxsize: int
+    hits: int
+    misses: int
+    evictions: int
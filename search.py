@@ -0,0 +1,75 @@
+import asyncio
+import re
+from typing import Optional
+from sqlalchemy import Connection, DDL, event, text, table, column, func, literal_column
+from database import create_engine, shard_urls
+from schemas import InformationalModel
+
+# Внешняя FTS5-таблица: хранит только индекс, текст читается из information по rowid = information.id
+information_fts = table("information_fts", column("rowid"), column("information_fts"))
+
+CREATE_SEARCH_INDEX = [
+    "CREATE VIRTUAL TABLE IF NOT EXISTS information_fts USING fts5("
+    "information, explanation, content='information', content_rowid='id', "
+    "tokenize='unicode61 remove_diacritics 2')",
+    "CREATE TRIGGER IF NOT EXISTS information_fts_insert AFTER INSERT ON information BEGIN "
+    "INSERT INTO information_fts(rowid, information, explanation) "
+    "VALUES (new.id, new.information, new.explanation); END",
+    "CREATE TRIGGER IF NOT EXISTS information_fts_delete AFTER DELETE ON information BEGIN "
+    "INSERT INTO information_fts(information_fts, rowid, information, explanation) "
+    "VALUES ('delete', old.id, old.information, old.explanation); END",
+    "CREATE TRIGGER IF NOT EXISTS information_fts_update AFTER UPDATE OF information, explanation ON information "
+    "BEGIN "
+    "INSERT INTO information_fts(information_fts, rowid, information, explanation) "
+    "VALUES ('delete', old.id, old.information, old.explanation); "
+    "INSERT INTO information_fts(rowid, information, explanation) "
+    "VALUES (new.id, new.information, new.explanation); END",
+]
+
+# create_all и drop_all (в том числе в /setup_database) создают и удаляют индекс вместе с таблицей information.
+# Триггеры удаляются самим SQLite вместе с таблицей
+for statement in CREATE_SEARCH_INDEX:
+    event.listen(InformationalModel.__table__, "after_create", DDL(statement))
+event.listen(InformationalModel.__table__, "before_drop", DDL("DROP TABLE IF EXISTS information_fts"))
+
+# Заголовок весит больше объяснения
+RANK = func.bm25(literal_column("information_fts"), 2.0, 1.0)
+SNIPPET = func.snippet(literal_column("information_fts"), -1, "<b>", "</b>", "…", 12)
+
+
+def create_search_index(connection: Connection) -> bool:
+    """Создает индекс и триггеры в существующей базе, возвращает True, если индекса еще не было"""
+    exists = connection.execute(text(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'information_fts'")).first()
+    for statement in CREATE_SEARCH_INDEX:
+        connection.execute(text(statement))
+    return exists is None
+
+
+def rebuild_search_index(connection: Connection):
+    """Перестраивает индекс по всей таблице information"""
+    connection.execute(text("INSERT INTO information_fts(information_fts) VALUES ('rebuild')"))
+
+
+def match_query(q: str) -> Optional[str]:
+    """
+    Переводит пользовательский запрос в запрос FTS5: каждое слово берется в кавычки, чтобы операторы
+    и спецсимволы FTS5 не ломали синтаксис, все слова обязательны, последнее ищется по префиксу
+    """
+    terms = re.findall(r"\w+", q)
+    if not terms:
+        return None
+    return " ".join(f'"{term}"' for term in terms) + "*"
+
+
+async def main():
+    for url in shard_urls():
+        engine = create_engine(url)
+        async with engine.begin() as connection:
+            await connection.run_sync(create_search_index)
+            await connection.run_sync(rebuild_search_index)
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,88 @@
+import asyncio
+import heapq
+import zlib
+from typing import AsyncIterator, Callable, Dict, Iterable, List, Optional, TypeVar
+from sqlalchemy.ext.asyncio import AsyncEngine, async_sessionmaker
+
+T = TypeVar("T")
+END = object()
+
+
+class ShardRouter:
+    """
+    Распределяет пользователей и их информацию между базами по crc32 никнейма. Хэш не зависит
+    от процесса и PYTHONHASHSEED, поэтому все воркеры направляют никнейм в один и тот же шард.
+    Количество шардов нельзя поменять без переноса данных: у части никнеймов изменится шард
+    """
+
+    def __init__(self, engines: List[AsyncEngine], read_engines: Optional[List[AsyncEngine]] = None):
+        self.engines = engines
+        self.session_factories = [async_sessionmaker(engine, expire_on_commit=False) for engine in engines]
+        # Сессии только для чтения. Без read_engines чтение идет через пишущие движки
+        self.read_session_factories = self.session_factories
+        if read_engines is not None:
+            self.read_session_factories = [async_sessionmaker(engine, expire_on_commit=False)
+                                           for engine in read_engines]
+
+    def __len__(self) -> int:
+        return len(self.engines)
+
+    def shard(self, nickname: str) -> int:
+        if len(self.engines) == 1:
+            return 0
+        return zlib.crc32(nickname.encode()) % len(self.engines)
+
+    def session_factory(self, nickname: str) -> async_sessionmaker:
+        return self.session_factories[self.shard(nickname)]
+
+    def read_session_factory(self, nickname: str) -> async_sessionmaker:
+        return self.read_session_factories[self.shard(nickname)]
+
+    def group(self, items: Iterable[T], nickname: Callable[[T], str]) -> Dict[int, List[T]]:
+        """Раскладывает элементы по шардам с сохранением порядка внутри шарда"""
+        groups: Dict[int, List[T]] = {}
+        for item in items:
+            groups.setdefault(self.shard(nickname(item)), []).append(item)
+        return groups
+
+
+async def merge_sorted(sources: List[AsyncIterator[T]], key: Callable[[T], str]) -> AsyncIterator[T]:
+    """k-way merge отсортированных по key источников. Первые элементы всех источников запрашиваются одновременно"""
+    heads = await asyncio.gather(*[anext(source, END) for source in sources])
+    heap = [(key(item), index, item) for index, item in enumerate(heads) if item is not END]
+    heapq.heapify(heap)
+    while heap:
+        _, index, item = heap[0]
+        yield item
+        item = await anext(sources[index], END)
+        if item is END:
+            heapq.heappop(heap)
+        else:
+            heapq.heapreplace(heap, (key(item), index, item))
+
+
+async def flatten(batches: AsyncIterator[List[T]]) -> AsyncIterator[T]:
+    async for batch in batches:
+        for item in batch:
+            yield item
+
+
+async def merge_batches(sources: List[AsyncIterator[List[T]]], key: Callable[[T], str],
+                        batch_size: int) -> AsyncIterator[List[T]]:
+    """
+    Слияние источников, которые отдают отсортированные пачки. С одним источником пачки передаются как есть,
+    иначе элементы сливаются по key и снова собираются в пачки по batch_size
+    """
+    if len(sources) == 1:
+        async for batch in sources[0]:
+            yield batch
+        return
+
+    batch = []
+    async for item in merge_sorted([flatten(source) for source in sources], key):
+        batch.append(item)
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
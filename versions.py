@@ -0,0 +1,24 @@
+import secrets
+from typing import Optional
+
+
+def new_version() -> int:
+    """
+    Начальная версия пользователя. Она случайная, поэтому пользователь, созданный заново с тем же никнеймом
+    (в том числе после /setup_database), не совпадет по ETag с прежним
+    """
+    return secrets.randbits(62)
+
+
+def version_etag(version: int) -> str:
+    # Слабый ETag: тело может отдаваться сжатым, а версия описывает данные, а не байты ответа
+    return f'W/"{version}"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Слабое сравнение из RFC 9110: префикс W/ не учитывается"""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    return etag.removeprefix("W/") in {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
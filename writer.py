@@ -0,0 +1,111 @@
+import asyncio
+import logging
+from contextlib import suppress
+from typing import Awaitable, Callable, List, Optional, Tuple, TypeVar
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+Operation = Callable[[AsyncSession], Awaitable[T]]
+
+
+class DirectWriter:
+    """Выполняет изменение в сессии запроса и сразу фиксирует его"""
+
+    def __init__(self, session: AsyncSession):
+        self.session = session
+
+    async def submit(self, operation: Operation) -> T:
+        result = await operation(self.session)
+        await self.session.commit()
+        return result
+
+
+class WriteQueue:
+    """
+    Очередь изменений с одной задачей-писателем. Писатель забирает из очереди до max_batch операций
+    и выполняет их в одной транзакции (group commit): один захват блокировки записи SQLite и один fsync
+    на пачку. Результат каждой операции возвращается вызывающему только после фиксации транзакции.
+    Если пачка падает, операции повторяются по одной, чтобы ошибка досталась только своему вызывающему.
+    """
+
+    def __init__(self, session_factory: async_sessionmaker, max_batch: int = 256, max_delay: float = 0.0):
+        self.session_factory = session_factory
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self.queue: asyncio.Queue = asyncio.Queue()
+        self.batches = 0
+        self.operations = 0
+        self._task: Optional[asyncio.Task] = None
+
+    async def submit(self, operation: Operation) -> T:
+        future = asyncio.get_running_loop().create_future()
+        await self.queue.put((operation, future))
+        return await future
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Дожидается выполнения уже поставленных операций и останавливает писателя"""
+        if self._task is not None:
+            await self.queue.join()
+            self._task.cancel()
+            with suppress(asyncio.CancelledError):
+                await self._task
+            self._task = None
+
+    async def _next_batch(self) -> List[Tuple[Operation, asyncio.Future]]:
+        batch = [await self.queue.get()]
+        if self.max_delay:
+            await asyncio.sleep(self.max_delay)
+        while len(batch) < self.max_batch and not self.queue.empty():
+            batch.append(self.queue.get_nowait())
+        return batch
+
+    async def _run(self):
+        while True:
+            batch = await self._next_batch()
+            try:
+                await self._execute(batch)
+            except Exception:
+                logger.exception("Write queue batch failed")
+            finally:
+                for _ in batch:
+                    self.queue.task_done()
+
+    async def _execute(self, batch: List[Tuple[Operation, asyncio.Future]]):
+        try:
+            results = await self._commit(batch)
+        except Exception as error:
+            if len(batch) == 1:
+                self._resolve(batch[0][1], exception=error)
+            else:
+                for item in batch:
+                    await self._execute([item])
+            return
+
+        self.batches += 1
+        self.operations += len(batch)
+        for (_, future), result in zip(batch, results):
+            self._resolve(future, result=result)
+
+    async def _commit(self, batch: List[Tuple[Operation, asyncio.Future]]) -> list:
+        async with self.session_factory() as session:
+            results = []
+            for operation, _ in batch:
+                results.append(await operation(session))
+                await session.flush()
+            await session.commit()
+        return results
+
+    @staticmethod
+    def _resolve(future: asyncio.Future, result=None, exception: Exception = None):
+        if future.done():
+            return
+        if exception is not None:
+            future.set_exception(exception)
+        else:
+            future.set_result(result)